@@ -0,0 +1,222 @@
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+"""
+acquisition_pipeline.py
+-----------------------
+Double-buffered acquisition loop for the Raspberry Pi scripts.
+
+A capture thread keeps triggering bursts and reading the SDR into a pool of
+preallocated frame buffers while a send thread packs and sends the filled
+buffers over ZeroMQ. The two threads only exchange buffer indices through
+bounded queues, so the radio is re-armed as soon as a buffer is free instead
+of waiting for the previous frame to be serialised and sent.
+
+Buffers are sent zero-copy; if the send callback returns a ZMQ
+MessageTracker, the buffer goes back to the pool only once ZMQ is done with
+it. The send thread does not wait for that: buffers still in flight are
+returned as their trackers complete, and the send thread only blocks on the
+oldest one ('wait_sent') when the pool has run out. The capture thread
+then waits for a buffer (the 'wait_buffer' stage), i.e. backpressure instead
+of dropped frames.
+
+Per-stage timing is collected in StageTimers; scripts can time their own
+sub-stages (trigger, rx, slicing, ...) with `pipeline.timers.stage(name)`.
+
+Only numpy and the standard library are needed, so this runs on the Pi.
+"""
+
+
+class StageTimer:
+    """Running count / mean / max of one pipeline stage (seconds)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class StageTimers:
+    """Named stage timers; each stage should be updated from a single thread"""
+
+    def __init__(self):
+        self._timers = {}
+
+    def __getitem__(self, name):
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = StageTimer()
+        return timer
+
+    def add(self, name, seconds):
+        self[name].add(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name].add(time.perf_counter() - t0)
+
+    def report(self):
+        """One line per stage: count, mean and max in ms"""
+        lines = []
+        for name, t in list(self._timers.items()):
+            lines.append(f"  {name:<12s} n={t.count:<7d} mean={t.mean*1e3:7.2f} ms  max={t.max*1e3:7.2f} ms")
+        return '\n'.join(lines)
+
+
+class AcquisitionPipeline:
+    """
+    Producer/consumer acquisition loop over a pool of frame buffers.
+
+    capture(out) fills `out` (one frame) and returns its metadata, e.g. the
+    capture timestamp in ns; send(frame, meta) sends it with that metadata and
+    may return a zmq.MessageTracker.
+    """
+
+    def __init__(self, capture, send, frame_shape, dtype=np.complex64, num_buffers=4):
+        if num_buffers < 2:
+            raise ValueError("num_buffers must be at least 2 to overlap capture and send")
+        self.capture = capture
+        self.send = send
+        self.buffers = np.zeros((num_buffers,) + tuple(frame_shape), dtype=dtype)
+        self._free = queue.Queue()
+        for i in range(num_buffers):
+            self._free.put(i)
+        self._filled = queue.Queue(maxsize=num_buffers)
+        self._in_flight = deque()   # (buffer index, tracker) of unfinished zero-copy sends
+
+        self.timers = StageTimers()
+        self.captured = 0
+        self.sent = 0
+        self.start_time = None
+
+        self._stop = threading.Event()
+        self._threads = []
+        self.error = None
+
+    # ─── Thread control ──────────────────────────────────────────
+    def start(self):
+        self._stop.clear()
+        self.start_time = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._guard, args=(self._capture_loop,), name="Capture", daemon=True),
+            threading.Thread(target=self._guard, args=(self._send_loop,), name="Send", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _guard(self, loop):
+        # An exception in either thread stops the whole pipeline
+        try:
+            loop()
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+
+    # ─── Stages ──────────────────────────────────────────────────
+    def _get(self, q, stage):
+        t0 = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.timers.add(stage, time.perf_counter() - t0)
+            return item
+        return None
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            i = self._get(self._free, 'wait_buffer')
+            if i is None:
+                break
+            t0 = time.perf_counter()
+            meta = self.capture(self.buffers[i])
+            t1 = time.perf_counter()
+            self.timers.add('capture', t1 - t0)
+            self.captured += 1
+            self._filled.put((i, meta, t1))
+
+    def _release(self):
+        """
+        Return the buffers whose zero-copy sends have completed to the pool, in
+        send order. Blocks on the oldest send only if no buffer is free.
+        """
+        while self._in_flight:
+            i, tracker = self._in_flight[0]
+            if not tracker.done:
+                if not self._free.empty():
+                    break
+                with self.timers.stage('wait_sent'):
+                    tracker.wait()
+            self._in_flight.popleft()
+            self._free.put(i)
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            self._release()
+            item = self._get(self._filled, 'wait_frame')
+            if item is None:
+                break
+            i, meta, t_captured = item
+            t0 = time.perf_counter()
+            self.timers.add('queued', t0 - t_captured)
+            tracker = self.send(self.buffers[i], meta)
+            self.timers.add('send', time.perf_counter() - t0)
+            self.sent += 1
+            if tracker is None or tracker.done:
+                self._free.put(i)
+            else:
+                # Zero-copy send: keep the buffer until ZMQ has released it
+                self._in_flight.append((i, tracker))
+
+    # ─── Reporting ───────────────────────────────────────────────
+    def report(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        return (f"captured {self.captured}, sent {self.sent} ({rate:.1f} frames/s)\n"
+                + self.timers.report())
+
+    def run(self, report_interval=5.0):
+        """Run until Ctrl-C (or a stage fails), printing the stage timers periodically"""
+        self.start()
+        try:
+            while self.running:
+                self._stop.wait(report_interval)
+                print(self.report())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        if self.error is not None:
+            raise self.error
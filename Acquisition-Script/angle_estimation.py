@@ -0,0 +1,128 @@
+import numpy as np
+
+"""
+angle_estimation.py
+-------------------
+Angle of arrival for all detections of a frame at once, beyond the
+single median phase difference of target_extraction.py.
+
+The CN0566 gives two digital channels, each the analog sum of one 4-element
+half of the array, so the digital "array" has two phase centres
+`element_spacing` wavelengths apart (about 2λ). Its response is periodic in
+sinθ with period 1/element_spacing, i.e. one phase difference matches
+several angles (grating lobes). Each half is itself a small array steered
+by the analog phase shifters, and only the candidate inside that sub-array
+beam is physical. Ambiguity is therefore resolved by searching one period
+of sinθ centred on the analog scan angle (`scan_angle_deg`); at 0° this is
+the usual ±arcsin(1/(2d)) sector.
+
+Estimators, evaluated over a precomputed steering-vector table (uniform in
+sinθ) for all detections in one batch, the snapshots being the RD cells of
+a patch around each peak:
+- 'phase':    median phase difference (as target_extraction.py)
+- 'bartlett': conventional beamformer, a^H R a
+- 'capon':    MVDR, 1 / (a^H R^-1 a), diagonally loaded
+- 'music':    1 / |a^H E_n|^2 with the noise subspace of R
+The pseudo-spectrum peak is refined with a parabolic fit between grid points.
+"""
+
+ANGLE_METHODS = ('phase', 'bartlett', 'capon', 'music')
+
+
+def steering_table(sin_grid, positions_wl):
+    """Steering vectors a = exp(j·2π·p·sinθ). Returns: [num_angles, num_channels] complex"""
+    return np.exp(2j * np.pi * np.asarray(sin_grid, dtype=np.float64)[:, None]
+                  * np.asarray(positions_wl, dtype=np.float64)[None, :])
+
+
+def patch_snapshots(RD1, RD2, doppler_idx, range_idx, span=2):
+    """
+    Gather the 2*span x 2*span RD cells around each peak as snapshots
+    Returns: [num_peaks, 2, (2*span)**2] complex
+    """
+    offsets = np.arange(-span, span)
+    rows = np.clip(doppler_idx[:, None, None] + offsets[None, :, None], 0, RD1.shape[0] - 1)
+    cols = np.clip(range_idx[:, None, None] + offsets[None, None, :], 0, RD1.shape[1] - 1)
+    n = (2 * span) ** 2
+    return np.stack([RD1[rows, cols].reshape(len(doppler_idx), n),
+                     RD2[rows, cols].reshape(len(doppler_idx), n)], axis=1)
+
+
+class AngleEstimator:
+    """Batched angle estimation over a fixed sinθ grid around the scan angle"""
+
+    def __init__(self, method='bartlett', element_spacing=2, num_channels=2, grid_size=256,
+                 scan_angle_deg=0.0, num_sources=1, diagonal_loading=1e-2):
+        if method not in ANGLE_METHODS:
+            raise ValueError(f"Unknown angle method: {method} (expected one of {ANGLE_METHODS})")
+        self.method = method
+        self.element_spacing = element_spacing
+        self.scan_angle_deg = scan_angle_deg
+        self.num_sources = num_sources
+        self.diagonal_loading = diagonal_loading
+
+        # One ambiguity period of sinθ centred on the analog scan direction
+        self.sin_scan = np.sin(np.deg2rad(scan_angle_deg))
+        self.period = 1 / element_spacing
+        half = min(self.period / 2, 1.0)
+        self.sin_grid = self.sin_scan + np.linspace(-half, half, grid_size)
+        self.sin_step = self.sin_grid[1] - self.sin_grid[0]
+
+        self.positions_wl = element_spacing * np.arange(num_channels)
+        self.A = steering_table(self.sin_grid, self.positions_wl)   # [G, M]
+        self._A_conj = self.A.conj()
+
+    # ─── Covariance and pseudo-spectra ──────────────────────────
+    def covariances(self, snapshots):
+        """Sample covariance per detection. snapshots: [K, M, N]. Returns: [K, M, M]"""
+        return np.einsum('kmn,kln->kml', snapshots, snapshots.conj()) / snapshots.shape[-1]
+
+    def spectrum(self, R):
+        """Pseudo-spectrum of every detection over the sinθ grid. Returns: [K, G]"""
+        if self.method == 'bartlett':
+            return np.einsum('gm,kml,gl->kg', self._A_conj, R, self.A).real
+        M = R.shape[-1]
+        if self.method == 'capon':
+            load = self.diagonal_loading * np.trace(R, axis1=1, axis2=2).real / M
+            Rinv = np.linalg.inv(R + load[:, None, None] * np.eye(M))
+            return 1 / np.maximum(np.einsum('gm,kml,gl->kg', self._A_conj, Rinv, self.A).real, 1e-12)
+        if self.method == 'music':
+            _, vecs = np.linalg.eigh(R)                  # ascending eigenvalues
+            En = vecs[:, :, :M - self.num_sources]       # noise subspace [K, M, M-d]
+            proj = np.einsum('gm,kmd->kgd', self._A_conj, En)
+            return 1 / np.maximum(np.sum(np.abs(proj) ** 2, axis=-1), 1e-12)
+        raise ValueError(f"No pseudo-spectrum for method {self.method}")
+
+    def _peak_sines(self, P):
+        """sinθ of each row's maximum with a parabolic refinement"""
+        i = np.argmax(P, axis=1)
+        inner = np.clip(i, 1, P.shape[1] - 2)
+        rows = np.arange(len(P))
+        left, mid, right = P[rows, inner - 1], P[rows, inner], P[rows, inner + 1]
+        denom = left - 2 * mid + right
+        delta = np.where(denom < 0, 0.5 * (left - right) / np.where(denom < 0, denom, -1), 0.0)
+        delta = np.where(i == inner, np.clip(delta, -0.5, 0.5), 0.0)
+        return self.sin_grid[i] + delta * self.sin_step
+
+    # ─── Estimation ──────────────────────────────────────────────
+    def phase_sines(self, snapshots):
+        """sinθ from the median phase difference, unwrapped towards the scan angle"""
+        phase_diff = np.angle(snapshots[:, 1]) - np.angle(snapshots[:, 0])
+        phase_diff = np.median(phase_diff, axis=1)
+        phase_diff = np.mod(phase_diff + np.pi, 2 * np.pi) - np.pi
+        sin_t = phase_diff / (2 * np.pi * self.element_spacing)
+        return sin_t + np.round((self.sin_scan - sin_t) / self.period) * self.period
+
+    def estimate(self, snapshots):
+        """Angles (degrees) of K detections from their snapshots [K, M, N]"""
+        if len(snapshots) == 0:
+            return np.empty(0)
+        if self.method == 'phase':
+            sin_t = self.phase_sines(snapshots)
+        else:
+            sin_t = self._peak_sines(self.spectrum(self.covariances(snapshots)))
+        return np.degrees(np.arcsin(np.clip(sin_t, -1, 1)))
+
+    def estimate_peaks(self, RD1, RD2, doppler_idx, range_idx, span=2):
+        """Angles of the peaks at (doppler_idx, range_idx) of the two RD maps"""
+        return self.estimate(patch_snapshots(RD1, RD2, doppler_idx, range_idx, span))
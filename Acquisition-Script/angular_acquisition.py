@@ -1,9 +1,13 @@
 import sys
 import time
+import itertools
 import numpy as np
 import matplotlib.pyplot as plt
 import zmq
 from matplotlib.animation import FuncAnimation
+from wire_protocol import FrameHeader, send_frame
+from acquisition_pipeline import AcquisitionPipeline
+from scan_engine import AzimuthScanner
 
 """
 angular_acquisition.py
@@ -12,7 +16,16 @@ Performs an azimuth scan with PlutoSDR + CN0566 by steering the
 8-element array across predefined angles. Streams a full data cube
 (angle × samples × channels) via ZeroMQ (`tcp://*:5555`).
 
-Output: byte stream of complex64 array, shape [numAngles, samples, 2].
+Output: framed messages (see wire_protocol.py), a header with sequence number,
+capture timestamp, radar parameters and the number of scan angles, followed
+by complex64 samples sent without copying:
+- STREAM_SLICES = True:  one [samples, 2] slice per angle as soon as it is
+  captured, with scan_index / scan_angle_deg in the header
+- STREAM_SLICES = False: the full cube, shape [numAngles, samples, 2], once per sweep
+
+Steering uses precomputed phase states and writes only the elements that
+change, with one latch per angle (see scan_engine.py). Capture and sending
+run in separate threads (see acquisition_pipeline.py).
 """
 
 import adi
@@ -20,6 +33,11 @@ print(adi.__version__)
 
 scanLimit=45
 numScanAngles=20
+SCAN_ORDER = 'linear'    # 'linear', 'interleaved' or 'coarse_to_fine'
+STREAM_SLICES = True     # send each angle as it is captured instead of whole cubes
+FLIP_ELEMENTS = ()       # elements given an extra 180° phase, e.g. (5, 6)
+NUM_BUFFERS = 3          # frame buffers shared by the capture and send threads
+REPORT_INTERVAL = 5.0    # seconds between stage timing reports
 
 '''Key Parameters'''
 sample_rate = 5e6
@@ -193,48 +211,73 @@ scan_angles = np.linspace(-scanLimit,scanLimit,numScanAngles)  # Azimuth scan an
 wavelength = 3e8 / frequency
 num_azimuth_angles = len(scan_angles)
 
-# Pre-calculate the phase values for all scan angles
-all_phase_values = np.zeros((num_azimuth_angles, num_elements))
-for i, angle_deg in enumerate(scan_angles):
-    angle_rad = np.deg2rad(angle_deg)
-    for n in range(num_elements):
-        # Phase shift for a linear array
-        phase = 2 * np.pi * element_spacing * n * np.sin(angle_rad) / wavelength
-        all_phase_values[i, n] = np.rad2deg(phase) # Convert to degrees for setting
-
-# Initialize the data cube to store the results for all azimuth angles
-azimuth_data_cube = np.zeros((num_azimuth_angles, good_ramp_samples, 2), dtype=np.complex64)
-
-while True:
-    for angle_index, angle_deg in enumerate(scan_angles):
-        # Get the pre-calculated phase values for the current angle
-        phase_values = all_phase_values[angle_index, :]
-
-        # Apply the phases to the analog phaser
-        for i in range(num_elements):
-            phaseVal=phase_values[i]
-            if i == num_elements-2 or i == num_elements-3: phaseVal=phaseVal+180
-            my_phaser.set_chan_phase(i, phase_values[i])
-
-        # Trigger a burst and grab the data
+# Pre-calculate the phase state (steering + calibration) for all scan angles
+scanner = AzimuthScanner(my_phaser, scan_angles, element_spacing, wavelength, num_elements,
+                         order=SCAN_ORDER, flip_elements=FLIP_ELEMENTS)
+scan_sequence = itertools.cycle(scanner.order)
+
+# Frame header, filled once; send_frame sets dtype/shape/timestamp per frame
+header = FrameHeader(
+    sample_rate=sample_rate,
+    center_freq=output_freq,
+    chirp_bw=default_chirp_bw,
+    ramp_time_us=ramp_time,
+    num_chirps=num_chirps,
+    good_ramp_samples=good_ramp_samples,
+    start_offset_samples=start_offset_samples,
+    num_samples_frame=num_samples_frame,
+    num_scan=num_azimuth_angles,
+)
+
+def capture_angle(angle_index, azScan):
+    """Steer to one angle, trigger a burst and write its (good_ramp_samples, 2) azScan"""
+    # Apply the pre-calculated phases (changed elements only, one latch)
+    with pipeline.timers.stage('steer'):
+        scanner.steer(angle_index)
+
+    # Trigger a burst and grab the data
+    with pipeline.timers.stage('rx'):
         my_phaser._gpios.gpio_burst = 0
         my_phaser._gpios.gpio_burst = 1
         my_phaser._gpios.gpio_burst = 0
         data = my_sdr.rx()
 
-        # Slice out each chirp for both channels
-        ch0 = data[0][idx]
-        ch1 = data[1][idx]
+    # Slice out each chirp for both channels and average over chirps
+    with pipeline.timers.stage('slice'):
+        for ch in range(2):
+            azScan[:, ch] = np.mean(data[ch][idx], axis=0)
+
+
+def capture_slice(azScan):
+    """Capture thread: the next angle of the scan order"""
+    angle_index = next(scan_sequence)
+    capture_angle(angle_index, azScan)
+    return time.time_ns(), angle_index
+
+
+def capture_cube(azimuth_data_cube):
+    """Capture thread: one full azimuth sweep into the [numAngles, samples, 2] cube"""
+    timestamp_ns = time.time_ns()  # start of the sweep
+    for angle_index in scanner.order:
+        capture_angle(angle_index, azimuth_data_cube[angle_index])
+    return timestamp_ns, -1
 
-        # Stack into a (num_chirps, good_ramp_samples, 2) cube
-        cube = np.stack((ch0, ch1), axis=2).astype(np.complex64)
 
-        # Average over chirps to get the azScan for the current azimuth angle
-        azScan = np.mean(cube, axis=0) # Shape: (good_ramp_samples, 2)
+def send(frame, meta):
+    """Send thread: one slice or cube with its header (not copied)"""
+    timestamp_ns, angle_index = meta
+    header.scan_index = angle_index
+    header.scan_angle_deg = scan_angles[angle_index] if angle_index >= 0 else 0.0
+    tracker = send_frame(push, frame, header, timestamp_ns, track=True)
+    header.seq += 1
+    return tracker
 
-        # Store the azScan for the current azimuth angle in the larger cube
-        azimuth_data_cube[angle_index, :, :] = azScan
 
-    # After iterating through all azimuth angles, send the entire azimuth_data_cube
+if STREAM_SLICES:
+    pipeline = AcquisitionPipeline(capture_slice, send, (good_ramp_samples, 2), num_buffers=NUM_BUFFERS)
+else:
+    pipeline = AcquisitionPipeline(capture_cube, send, (num_azimuth_angles, good_ramp_samples, 2),
+                                   num_buffers=NUM_BUFFERS)
+pipeline.run(REPORT_INTERVAL)
+print(f"Phase updates: {scanner.element_writes} element writes, {scanner.latches} latches")
 
-    push.send(azimuth_data_cube.tobytes())
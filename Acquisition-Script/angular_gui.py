@@ -0,0 +1,183 @@
+import numpy as np
+import pyqtgraph as pg
+from pyqtgraph.Qt import QtCore, QtWidgets
+import time
+from dataclasses import replace
+from frame_receiver import FrameReceiver, DROP_OLDEST
+from angular_processing import AngularConfig, AngularProcessor
+
+"""
+angular_gui.py
+--------------
+Real-time range–azimuth client for angular_acquisition.py.
+
+Receives the azimuth scan over ZeroMQ, either one [samples, 2] slice per
+steering angle (angle index in the frame header) or whole
+[numAngles, samples, 2] cubes, keeps the latest slice of every angle in a
+cube and redraws the range–azimuth map at a fixed display rate. The map is
+computed for the whole cube at once in `angular_processing.py` and drawn
+into one persistent ImageItem, straight from the processor's contiguous
+[range, angle] buffer (no transposed copy). Received slices are popped into
+one reused buffer.
+
+Features:
+- Range–azimuth map interpolated between scan angles, or sharpened with
+  sum/difference monopulse across the two channels (`monopulse=True` below)
+- History of the strongest return's angle
+- Radar and scan parameters taken from the frame headers
+"""
+
+# ─── Parameters ──────────────────────────────────────────────────
+RX_ADDRESS = 'tcp://phaser.local:5555'
+RX_BUFFER_SLOTS = 64           # slices queued between receiver and GUI
+DISPLAY_INTERVAL_MS = 50       # map redraw period
+HISTORY_LENGTH = 200           # peak angles kept in the history plot
+
+config = AngularConfig(
+    scan_limit_deg=45,
+    num_scan=20,
+    max_range_m=30.0,
+    angle_step_deg=1.0,
+    monopulse=False,
+    fft_workers=2,
+)
+processor = None               # built on the first frame, once the sample count is known
+cube = None                    # latest [num_scan, samples, 2] sweep
+scan_angles = None             # steering angle of each cube row
+dirty = False                  # new data since the last redraw
+slices_in_sweep = 0            # slices received since the last completed sweep
+rx_frame = None                # slice buffer reused across pops
+
+receiver = FrameReceiver(RX_ADDRESS, num_slots=RX_BUFFER_SLOTS, policy=DROP_OLDEST, num_channels=1).start()
+
+# PyQtGraph setup
+app = QtWidgets.QApplication([])
+win = pg.GraphicsLayoutWidget(show=True, title="Range-Azimuth Map")
+win.resize(1200, 600)
+
+# Range-Azimuth map (left)
+ra_plot = win.addPlot(row=0, col=0, title="Range-Azimuth Map")
+ra_plot.setLabel('bottom', 'Range (m)')
+ra_plot.setLabel('left', 'Angle (deg)')
+img_item = pg.ImageItem()
+ra_plot.addItem(img_item)
+lut = pg.colormap.get('inferno').getLookupTable(0.0, 1.0, 256)
+img_item.setLookupTable(lut)
+img_item.setLevels([-40, 0])
+peak_marker = pg.ScatterPlotItem(size=15, symbol='x', pen=pg.mkPen('c', width=2))
+ra_plot.addItem(peak_marker)
+text_item = pg.TextItem(text='', color='y', anchor=(0, 0))
+ra_plot.addItem(text_item)
+
+# Peak angle history (right)
+history_plot = win.addPlot(row=0, col=1, title="Peak Angle History")
+history_plot.setLabel('bottom', 'Sweep')
+history_plot.setLabel('left', 'Angle (deg)')
+history_curve = history_plot.plot(pen=pg.mkPen('y', width=2))
+peak_history = np.full(HISTORY_LENGTH, np.nan)
+
+
+def configure(header, num_samples):
+    """(Re)build the processor and plot axes for the incoming stream"""
+    global config, processor, cube, scan_angles
+    params = header.radar_params() if header is not None else {}
+    params = {k: v for k, v in params.items() if k in ('sample_rate', 'ramp_time_us', 'chirp_bw', 'center_freq')}
+    if header is not None and header.num_scan:
+        params['num_scan'] = header.num_scan
+    config = replace(config, **params)
+
+    if scan_angles is None or len(scan_angles) != config.num_scan:
+        scan_angles = config.scan_angles_deg
+    processor = AngularProcessor(config, num_samples, scan_angles)
+    cube = np.zeros((config.num_scan, num_samples, 2), dtype=np.complex64)
+
+    ranges_m, angles_deg = processor.ranges_m, processor.angles_deg
+    img_item.setRect(pg.QtCore.QRectF(
+        ranges_m[0], angles_deg[0],
+        ranges_m[-1] - ranges_m[0], angles_deg[-1] - angles_deg[0]
+    ))
+    ra_plot.setXRange(0, ranges_m[-1])
+    ra_plot.setYRange(angles_deg[0], angles_deg[-1])
+    text_item.setPos(ranges_m[0], angles_deg[-1])
+    history_plot.setYRange(angles_deg[0], angles_deg[-1])
+
+
+def ingest(frame, header):
+    """Store one received slice or cube. Returns: True if a sweep was completed"""
+    global scan_angles, processor, slices_in_sweep
+    if header is None:
+        # Legacy stream: flat bytes of one [num_scan, samples, 2] cube
+        frame = frame.reshape(config.num_scan, -1, 2)
+    num_samples = frame.shape[-2]
+    if (processor is None or processor.num_samples != num_samples
+            or (header is not None and header.num_scan and header.num_scan != config.num_scan)):
+        configure(header, num_samples)
+
+    if frame.ndim == 3:
+        cube[:] = frame
+        return True
+
+    i = header.scan_index
+    if not 0 <= i < len(cube):
+        return False
+    cube[i] = frame
+    if abs(scan_angles[i] - header.scan_angle_deg) > 1e-3:
+        # Steering angles differ from the assumed linear scan: rebuild the interpolation
+        scan_angles = scan_angles.copy()
+        scan_angles[i] = header.scan_angle_deg
+        if len(np.unique(scan_angles)) == len(scan_angles):
+            processor = AngularProcessor(config, num_samples, scan_angles)
+
+    # Any scan order: a sweep is complete once num_scan slices have arrived
+    slices_in_sweep += 1
+    if slices_in_sweep < len(cube):
+        return False
+    slices_in_sweep = 0
+    return True
+
+
+# Timer
+timer = QtCore.QTimer()
+t_process = 0.0
+
+
+def update():
+    global dirty, t_process, rx_frame
+
+    # Drain everything received since the last redraw
+    while True:
+        frame = receiver.pop(out=rx_frame)
+        if frame is None:
+            break
+        rx_frame = frame   # copied into the cube by ingest(), so the buffer can be reused
+        if ingest(frame, receiver.header):
+            # New sweep: scroll the history, the last entry follows the current sweep
+            peak_history[:-1] = peak_history[1:]
+        dirty = True
+
+    if not dirty or processor is None:
+        return
+    dirty = False
+
+    t0 = time.perf_counter()
+    map_db = processor.process(cube)
+    t_process = time.perf_counter() - t0
+
+    # Persistent image: only the data changes, the rect was set in configure()
+    img_item.setImage(processor.map_ra, autoLevels=False)
+
+    peak_range, peak_angle = processor.peak(map_db)
+    peak_marker.setData([peak_range], [peak_angle])
+    peak_history[-1] = peak_angle
+    history_curve.setData(peak_history, connect='finite')
+    text_item.setText(f"Peak: {peak_range:.1f} m, {peak_angle:.1f}°\n"
+                      f"Map: {t_process*1e3:.1f} ms")
+
+
+timer.timeout.connect(update)
+timer.start(DISPLAY_INTERVAL_MS)
+
+app.exec()
+receiver.stop()
+print(f"Frames received: {receiver.received}, processed: {receiver.processed}, "
+      f"dropped: {receiver.dropped}, lost in transit: {receiver.lost}")
@@ -0,0 +1,196 @@
+from dataclasses import dataclass, asdict
+import numpy as np
+import scipy.fft
+
+"""
+angular_processing.py
+---------------------
+Headless range–azimuth processing for the angular acquisition
+(angular_acquisition.py), used by angular_gui.py and bench_angular.py.
+
+One sweep is a cube [num_scan, samples, 2]: for every steering angle the
+chirp-averaged beat signal of both CN0566 channels (the two 4-element
+halves of the array). The whole cube is processed at once:
+1. DC removal and range window, written channel-major into a zero-padded
+   FFT buffer, then one batched range FFT over all angles and channels
+2. sum beam Σ = ch0 + ch1 (and difference beam Δ = ch0 - ch1)
+3. either linear interpolation from the scan angles onto a fine angle grid
+   (one precomputed [fine, num_scan] matrix product), or, with monopulse,
+   the Δ/Σ phase-comparison estimate moves each cell's power to its refined
+   angle within the beam (accumulated with np.bincount)
+4. normalised dB map in a reused buffer. The buffer is C-contiguous in the
+   [range_bins, num_angles_fine] layout an ImageItem draws with x = range
+   (`map_ra`); `map_db` is its [num_angles_fine, range_bins] transpose view
+"""
+
+C = 3e8  # Speed of light in m/s
+
+
+@dataclass
+class AngularConfig:
+    """Radar and display parameters for AngularProcessor"""
+    # Radar parameters (overridden from the frame headers by the GUI)
+    sample_rate: float = 5e6           # Hz
+    ramp_time_us: float = 50           # µs
+    chirp_bw: float = 500e6            # Hz
+    center_freq: float = 10e9          # Hz
+
+    # Scan
+    scan_limit_deg: float = 45         # scan from -limit to +limit
+    num_scan: int = 20                 # steering angles per sweep
+    element_spacing_m: float = 0.014   # CN0566 element pitch
+    elements_per_channel: int = 4      # each Rx channel sums one half of the array
+
+    # Processing
+    range_pad_factor: int = 4          # zero-padding for the range FFT
+    max_range_m: float = 30.0          # range bins beyond this are dropped
+    angle_step_deg: float = 1.0        # interpolated angle grid
+    monopulse: bool = False            # refine angles with the channel Δ/Σ ratio
+    monopulse_sign: int = 1            # flips the Δ/Σ angle if the channels are swapped
+    fft_workers: int = 1
+
+    @property
+    def ramp_s(self):
+        return self.ramp_time_us * 1e-6
+
+    @property
+    def slope(self):
+        return self.chirp_bw / self.ramp_s
+
+    @property
+    def wavelength(self):
+        return C / self.center_freq
+
+    @property
+    def scan_angles_deg(self):
+        return np.linspace(-self.scan_limit_deg, self.scan_limit_deg, self.num_scan)
+
+    @property
+    def subarray_spacing_m(self):
+        """Distance between the phase centres of the two channel halves"""
+        return self.elements_per_channel * self.element_spacing_m
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def interpolation_matrix(coarse, fine):
+    """
+    Linear interpolation as a matrix: fine_values = W @ coarse_values
+    Returns: W, shape [len(fine), len(coarse)]
+    """
+    coarse = np.asarray(coarse, dtype=np.float64)
+    fine = np.clip(np.asarray(fine, dtype=np.float64), coarse[0], coarse[-1])
+    W = np.zeros((len(fine), len(coarse)), dtype=np.float32)
+    if len(coarse) == 1:
+        W[:, 0] = 1
+        return W
+    hi = np.clip(np.searchsorted(coarse, fine, side='right'), 1, len(coarse) - 1)
+    lo = hi - 1
+    frac = (fine - coarse[lo]) / (coarse[hi] - coarse[lo])
+    rows = np.arange(len(fine))
+    W[rows, lo] = 1 - frac
+    W[rows, hi] += frac
+    return W
+
+
+class AngularProcessor:
+    """Vectorized range–azimuth map for one sweep cube"""
+
+    def __init__(self, config=None, num_samples=None, scan_angles_deg=None):
+        self.config = config if config is not None else AngularConfig()
+        cfg = self.config
+        self.num_samples = num_samples or int(cfg.ramp_s * cfg.sample_rate)
+        self.range_fft_size = self.num_samples * cfg.range_pad_factor
+
+        # Axes
+        beat_freqs = np.fft.fftfreq(self.range_fft_size, 1/cfg.sample_rate)[:self.range_fft_size//2]
+        ranges_m = beat_freqs * C / (2 * cfg.slope)
+        self.num_range_bins = max(int(np.searchsorted(ranges_m, cfg.max_range_m, side='right')), 1)
+        self.ranges_m = ranges_m[:self.num_range_bins]
+        if scan_angles_deg is None:
+            scan_angles_deg = cfg.scan_angles_deg
+        self.scan_angles_deg = np.asarray(scan_angles_deg, dtype=np.float64)
+        self.num_scan = len(self.scan_angles_deg)
+        lo, hi = self.scan_angles_deg.min(), self.scan_angles_deg.max()
+        self.angles_deg = np.arange(lo, hi + cfg.angle_step_deg / 2, cfg.angle_step_deg)
+
+        # Range window and zero-padded, channel-major FFT input [2, num_scan, range_fft_size]
+        self.window = np.hanning(self.num_samples).astype(np.float32)
+        self._fft_in = np.zeros((2, self.num_scan, self.range_fft_size), dtype=np.complex64)
+
+        # Angle interpolation (scan angles may arrive in any order). The sort is
+        # folded into the matrix, transposed for the [range, angle] product
+        self.interp = interpolation_matrix(np.sort(self.scan_angles_deg), self.angles_deg)
+        self._scan_sort = np.argsort(self.scan_angles_deg)
+        interp_t = np.empty((self.num_scan, len(self.angles_deg)), dtype=np.float32)
+        interp_t[self._scan_sort] = self.interp.T
+        self._interp_t = interp_t
+
+        # Monopulse: Δ/Σ phase -> offset in sin(angle), limited to half the scan step
+        self._sin_scan = np.sin(np.deg2rad(self.scan_angles_deg))[:, None]
+        self._psi_to_sin = cfg.monopulse_sign * cfg.wavelength / (2 * np.pi * cfg.subarray_spacing_m)
+        step = np.deg2rad(np.median(np.diff(np.sort(self.scan_angles_deg)))) if self.num_scan > 1 else np.pi
+        self._max_offset = 0.5 * step
+        self._range_offset = (np.arange(self.num_range_bins) * len(self.angles_deg))[None, :]
+
+        # Output buffers
+        self._power = np.empty((self.num_scan, self.num_range_bins), dtype=np.float32)
+        self.map_ra = np.empty((self.num_range_bins, len(self.angles_deg)), dtype=np.float32)
+        self.map_db = self.map_ra.T   # [angle, range] view
+
+    def range_profiles(self, cube):
+        """
+        Batched windowed range FFT of a [num_scan, samples, 2] cube
+        Returns: sum and difference beams, each [num_scan, range_bins]
+        """
+        x = np.moveaxis(cube, -1, 0)                  # [2, num_scan, samples] view
+        fft_in = self._fft_in[..., :self.num_samples]
+        np.subtract(x, np.mean(x, axis=-1, keepdims=True), out=fft_in)
+        fft_in *= self.window
+        R = scipy.fft.fft(self._fft_in, axis=-1, workers=self.config.fft_workers)
+        R = R[..., :self.num_range_bins]
+        return R[0] + R[1], R[0] - R[1]
+
+    def monopulse_angles(self, sigma, delta):
+        """Refined angle (deg) of every cell from the Δ/Σ ratio. Returns: [num_scan, range_bins]"""
+        # For two co-phased halves with phase difference ψ: Δ/Σ = -j tan(ψ/2)
+        ratio = delta / np.where(sigma == 0, 1, sigma)
+        psi = -2 * np.arctan(ratio.imag)
+        offset = np.clip(psi * self._psi_to_sin, -self._max_offset, self._max_offset)
+        return np.rad2deg(np.arcsin(np.clip(self._sin_scan + offset, -1, 1)))
+
+    def process(self, cube):
+        """
+        Range–azimuth map of one sweep
+        Returns: map in dB (0 dB = strongest cell), [num_angles_fine, range_bins]
+        (a transposed view of `map_ra`). The array is reused by the next call.
+        """
+        sigma, delta = self.range_profiles(cube)
+        power = np.abs(sigma, out=self._power)
+
+        if self.config.monopulse:
+            # Move each cell's power to its refined angle on the fine grid
+            angles = self.monopulse_angles(sigma, delta)
+            step = self.config.angle_step_deg
+            fine = np.clip(np.rint((angles - self.angles_deg[0]) / step).astype(np.intp),
+                           0, len(self.angles_deg) - 1)
+            flat = fine + self._range_offset
+            acc = np.bincount(flat.ravel(), weights=power.ravel(), minlength=self.map_ra.size)
+            self.map_ra[:] = acc.reshape(self.map_ra.shape)
+        else:
+            np.matmul(power.T, self._interp_t, out=self.map_ra)
+
+        # Normalised dB, in place
+        m = self.map_ra
+        peak = m.max()
+        m *= 1 / peak if peak > 0 else 1
+        m += 1e-12
+        np.log10(m, out=m)
+        m *= 20
+        return self.map_db
+
+    def peak(self, map_db):
+        """Returns: (range_m, angle_deg) of the strongest cell"""
+        a, r = np.unravel_index(np.argmax(map_db), map_db.shape)
+        return self.ranges_m[r], self.angles_deg[a]
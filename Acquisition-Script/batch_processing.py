@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+import numpy as np
+from radar_processing import RadarProcessor
+from recorder import load_recording
+from replay import REPLAY_DTYPE, detect_frames
+
+"""
+batch_processing.py
+-------------------
+Multi-process detection over a recorded session.
+
+Frames are independent up to the tracker, so the recording is split into
+contiguous frame ranges that are processed (range–Doppler, CFAR, target
+extraction and DOA) in a `ProcessPoolExecutor`. Every worker opens the
+recording itself with `np.load(mmap_mode='r')`, so raw IQ is shared through
+the OS page cache and never pickled; only the small per-chunk detection
+arrays travel back. Tracking then runs sequentially over the merged
+detections (see replay.run_tracker).
+
+This needs frames that are independent of each other: a stateful
+configuration (sliding CPI, MTI / high-pass / background clutter filter, RD
+background map, see RadarConfig.stateful) would carry state between
+unrelated chunks, so it is rejected and must be replayed sequentially.
+"""
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(recording, config, timestamps):
+    frames, _, _ = load_recording(recording)
+    _worker['frames'] = frames
+    _worker['timestamps'] = timestamps
+    _worker['processor'] = RadarProcessor(config)
+
+
+def _process_chunk(bounds):
+    start, stop = bounds
+    return detect_frames(_worker['processor'], _worker['frames'], _worker['timestamps'], start, stop)
+
+
+def frame_chunks(start, stop, num_chunks):
+    """Split [start, stop) into at most `num_chunks` contiguous (start, stop) ranges"""
+    edges = np.linspace(start, stop, num_chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def detect_recording_parallel(recording, config, timestamps, start=0, stop=None,
+                              workers=None, chunks_per_worker=4):
+    """
+    Detect targets in frames[start:stop] of a recording across `workers` processes
+    Returns: REPLAY_DTYPE array ordered by frame (track_id = -1)
+    """
+    if config.stateful:
+        raise ValueError("Stateful processing (sliding CPI, clutter filter state or RD background map) "
+                         "needs the frames in order; replay it with a single worker")
+    workers = workers or os.cpu_count()
+    if stop is None:
+        stop = len(load_recording(recording)[0])
+
+    # One FFT thread per process; FFTW wisdom is not written concurrently
+    worker_config = replace(config, fft_workers=1, fft_wisdom_path=None)
+
+    chunks = frame_chunks(start, stop, workers * chunks_per_worker)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(recording, worker_config, timestamps)) as pool:
+        results = list(pool.map(_process_chunk, chunks))
+
+    if not results:
+        return np.empty(0, dtype=REPLAY_DTYPE)
+    return np.concatenate(results)
@@ -0,0 +1,329 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+from dataclasses import replace
+import numpy as np
+from radar_processing import RadarConfig, RadarProcessor
+from tracking import make_tracker
+from simulator import FMCWSimulator, SimConfig
+from clutter import CLUTTER_METHODS, RD_BACKGROUND_MODES
+
+"""
+bench_pipeline.py
+-----------------
+End-to-end benchmark of the radar_gui.py processing chain, stage by stage.
+
+Replays synthetic frames (simulator.py) or a recording (recorder.py)
+through the same steps as the GUI, timed separately:
+    slice        chirp slicing of the raw buffer with the index matrix
+    clutter      clutter filter fused with the range window (into the range FFT input)
+    range_fft    range FFT
+    doppler_fft  Doppler window and FFT
+    cfar         channel-averaged magnitude, CFAR and RD background map
+    doa          target extraction and angle estimation
+    tracking     track update
+    render       RD image preparation (display.RDHeatmap, needs pyqtgraph)
+
+For every combination of the swept parameters (num_chirps, range/Doppler
+padding, CFAR training/guard cells, clutter filter) it reports p50/p99 latency per stage
+and for the whole frame, and the throughput in frames/s. Results go to a
+JSON file with the git revision and environment, and --compare flags
+stages whose p50 got slower than in an earlier result file.
+
+Stateless configurations cycle a small pool of synthetic frames. A stateful
+one (MTI/HPF/background clutter filter, RD background map) would learn the
+repeating pool as clutter, so its frames are generated continuously by the
+simulator instead; a cycled recording restarts slow time at every wrap.
+
+Usage:
+    python3 bench_pipeline.py
+    python3 bench_pipeline.py --num-chirps 32 64 128 --range-pad 1 2 4 -o bench.json
+    python3 bench_pipeline.py --cfar-train 4 8 16 --compare bench.json
+    python3 bench_pipeline.py --clutter mean mti2 mti3 hpf background
+    python3 bench_pipeline.py --recording radar_data_20250915_120000.npy --doppler-pad 1 2
+"""
+
+STAGES = ('slice', 'clutter', 'range_fft', 'doppler_fft', 'cfar', 'doa', 'tracking', 'render')
+
+# Radar parameters of radar_gui.py
+GUI_CONFIG = RadarConfig(num_chirps=64, ramp_time_us=500, sample_rate=0.6e6, chirp_bw=300e6,
+                         center_freq=10e9, element_spacing=2)
+
+
+class _NullImage:
+    """Stands in for the ImageItem: rendering prep is timed, not drawing"""
+
+    def setImage(self, *args, **kwargs):
+        pass
+
+    def setRect(self, *args, **kwargs):
+        pass
+
+
+def make_heatmap(processor):
+    """RDHeatmap on a null image, or None if pyqtgraph is not installed"""
+    try:
+        from display import RDHeatmap
+    except ImportError:
+        return None
+    heatmap = RDHeatmap(_NullImage())
+    heatmap.set_axes(processor.ranges_m, processor.velocities_ms)
+    return heatmap
+
+
+def synthetic_frames(config, num_frames, seed=0):
+    """Raw [num_frames, 2, buffer_size] frames of the default simulator scene"""
+    sim = FMCWSimulator(SimConfig(sample_rate=config.sample_rate, center_freq=config.center_freq,
+                                  chirp_bw=config.chirp_bw, ramp_time_us=config.ramp_time_us,
+                                  num_chirps=config.num_chirps), seed=seed)
+    period = config.num_chirps * config.ramp_s
+    frames = np.empty((num_frames, 2, sim.config.buffer_size), dtype=np.complex64)
+    for frame in frames:
+        sim.step(period)
+        sim.raw_frame(frame)
+    timestamps = np.arange(num_frames) * period
+    return frames, timestamps
+
+
+def synthetic_stream(config, seed=0):
+    """Endless raw [2, buffer_size] frames of the default simulator scene, rendered into one reused buffer"""
+    sim = FMCWSimulator(SimConfig(sample_rate=config.sample_rate, center_freq=config.center_freq,
+                                  chirp_bw=config.chirp_bw, ramp_time_us=config.ramp_time_us,
+                                  num_chirps=config.num_chirps), seed=seed)
+    period = config.num_chirps * config.ramp_s
+    frame = np.empty((2, sim.config.buffer_size), dtype=np.complex64)
+    for i in itertools.count():
+        sim.step(period)
+        yield sim.raw_frame(frame), i * period
+
+
+def cycled(frames, timestamps, processor):
+    """
+    Frames cycled endlessly, timestamps continued across the wrap. Slow time
+    jumps back at the wrap, so a stateful processor is reset there.
+    """
+    step = timestamps[-1] - timestamps[-2] if len(timestamps) > 1 else 0.0
+    span = timestamps[-1] - timestamps[0] + step
+    for cycle in itertools.count():
+        if cycle and processor.stateful:
+            processor.reset_slow_time()
+        for frame, t in zip(frames, timestamps):
+            yield frame, t + cycle * span
+
+
+def run_stages(processor, tracker, heatmap, source, num_iters, warmup=10):
+    """
+    Run the GUI chain stage by stage over the (frame, timestamp) pairs of source
+    Returns: [num_iters, len(STAGES)] stage times in seconds
+    """
+    fft = processor.fft
+    half = processor.range_fft_size // 2
+    times = np.zeros((num_iters, len(STAGES)))
+    marks = np.empty(len(STAGES) + 1)
+    for it, (frame, timestamp) in zip(range(-warmup, num_iters), source):
+        marks[0] = time.perf_counter()
+
+        bursts = frame if frame.ndim == 3 else processor.slice_chirps(frame)
+        marks[1] = time.perf_counter()
+
+        processor.clutter.apply(bursts, fft.range_input[..., :processor.good_ramp_samples])
+        marks[2] = time.perf_counter()
+
+        R = fft.execute_range()[..., :half]
+        marks[3] = time.perf_counter()
+
+        np.multiply(R, processor._doppler_window_col, out=fft.doppler_input[:, :processor.cpi_length, :])
+        RD = processor._execute_doppler()
+        marks[4] = time.perf_counter()
+
+        mag = processor.magnitude(RD)
+        hits = processor.detect(mag)
+        marks[5] = time.perf_counter()
+
+        detections = processor.extract(RD, mag, hits)
+        marks[6] = time.perf_counter()
+
+        tracker.update_detections(detections, timestamp)
+        marks[7] = time.perf_counter()
+
+        if heatmap is not None:
+            heatmap.update(RD[0])
+        marks[8] = time.perf_counter()
+
+        if it >= 0:
+            times[it] = np.diff(marks)
+    return times
+
+
+def summarize(times, skip=()):
+    """p50/p99/mean per stage and for the whole frame (ms), and frames/s"""
+    ms = times * 1e3
+    stages = {}
+    for k, name in enumerate(STAGES):
+        if name in skip:
+            continue
+        stages[name] = {
+            'p50_ms': float(np.percentile(ms[:, k], 50)),
+            'p99_ms': float(np.percentile(ms[:, k], 99)),
+            'mean_ms': float(np.mean(ms[:, k])),
+        }
+    total = ms.sum(axis=1)
+    return {
+        'stages': stages,
+        'total': {
+            'p50_ms': float(np.percentile(total, 50)),
+            'p99_ms': float(np.percentile(total, 99)),
+            'mean_ms': float(np.mean(total)),
+        },
+        'frames_per_s': float(len(total) / (total.sum() / 1e3)),
+    }
+
+
+def check_equivalence(config, frame):
+    """The staged chain must detect the same targets as RadarProcessor.process()"""
+    staged, reference = RadarProcessor(config), RadarProcessor(config)
+    bursts = frame if frame.ndim == 3 else staged.slice_chirps(frame)
+    detections_ref, _ = reference.process_bursts(bursts)
+    RD = staged.range_doppler(bursts)
+    mag = staged.magnitude(RD)
+    detections = staged.extract(RD, mag, staged.detect(mag))
+    if not (np.array_equal(detections['range_idx'], detections_ref['range_idx'])
+            and np.array_equal(detections['doppler_idx'], detections_ref['doppler_idx'])):
+        raise RuntimeError("Staged benchmark chain differs from RadarProcessor.process()")
+
+
+def environment():
+    """Revision and platform, stored with the results"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        'revision': revision,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print stages whose p50 grew by more than `tolerance` vs a previous result file. Returns: count"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {json.dumps(r['params'], sort_keys=True): r for r in baseline['results']}
+    regressions = 0
+    print(f"\nComparison with {baseline_path} (revision {baseline['environment'].get('revision')}):")
+    for result in results:
+        ref = old.get(json.dumps(result['params'], sort_keys=True))
+        if ref is None:
+            continue
+        pairs = [(name, s, ref['stages'].get(name)) for name, s in result['stages'].items()]
+        pairs.append(('total', result['total'], ref['total']))
+        for name, s, r in pairs:
+            if r is None or r['p50_ms'] <= 0:
+                continue
+            ratio = s['p50_ms'] / r['p50_ms']
+            if ratio > 1 + tolerance:
+                regressions += 1
+                print(f"  REGRESSION {result['params']} {name}: p50 {r['p50_ms']:.3f} -> {s['p50_ms']:.3f} ms "
+                      f"({ratio:.2f}x)")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the radar_gui.py processing chain")
+    parser.add_argument('--recording', help="recording .npy to replay instead of synthetic frames")
+    parser.add_argument('--frames', type=int, default=200, help="timed frames per configuration")
+    parser.add_argument('--pool', type=int, default=16,
+                        help="distinct synthetic frames, cycled (stateless configurations only)")
+    parser.add_argument('--num-chirps', type=int, nargs='+', default=[64])
+    parser.add_argument('--range-pad', type=int, nargs='+', default=[2])
+    parser.add_argument('--doppler-pad', type=int, nargs='+', default=[2])
+    parser.add_argument('--cfar-train', type=int, nargs='+', default=[8], help="training cells (range and Doppler)")
+    parser.add_argument('--cfar-guard', type=int, nargs='+', default=[4], help="guard cells (range and Doppler)")
+    parser.add_argument('--cfar-method', choices=['ca', 'go', 'so', 'os'], default='ca')
+    parser.add_argument('--clutter', nargs='+', choices=CLUTTER_METHODS, default=['mean'],
+                        help="clutter filters to sweep (see clutter.py)")
+    parser.add_argument('--rd-background', choices=RD_BACKGROUND_MODES, help="adaptive RD background map")
+    parser.add_argument('--angle-method', choices=['phase', 'bartlett', 'capon', 'music'], default='phase')
+    parser.add_argument('--tracker', choices=['nn', 'kalman'], default='nn')
+    parser.add_argument('--fft-backend', default='auto')
+    parser.add_argument('--fft-workers', type=int, default=2)
+    parser.add_argument('-o', '--output', default='bench_pipeline.json', help="JSON results")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    base = replace(GUI_CONFIG, cfar_method=args.cfar_method, angle_method=args.angle_method,
+                   rd_background=args.rd_background, fft_backend=args.fft_backend, fft_workers=args.fft_workers)
+    recorded = None
+    if args.recording:
+        from recorder import load_recording
+        from replay import config_from_header, frame_timestamps
+        frames, timestamps, header = load_recording(args.recording)
+        base = config_from_header(header, cfar_method=args.cfar_method, angle_method=args.angle_method,
+                                  rd_background=args.rd_background,
+                                  fft_backend=args.fft_backend, fft_workers=args.fft_workers)
+        recorded = (frames, frame_timestamps(timestamps, len(frames)))
+        if args.num_chirps != [base.num_chirps]:
+            print(f"num_chirps is fixed by the recording ({base.num_chirps}), sweep ignored")
+        args.num_chirps = [base.num_chirps]
+
+    results = []
+    sweep = itertools.product(args.num_chirps, args.range_pad, args.doppler_pad, args.cfar_train, args.cfar_guard,
+                              args.clutter)
+    for num_chirps, range_pad, doppler_pad, train, guard, clutter in sweep:
+        params = {'num_chirps': num_chirps, 'range_pad_factor': range_pad, 'doppler_pad_factor': doppler_pad,
+                  'training_cells': train, 'guard_cells': guard}
+        if clutter != 'mean':
+            params['clutter_method'] = clutter   # keeps results comparable with files from before the option
+        config = replace(base, clutter_method=clutter, num_chirps=num_chirps, range_pad_factor=range_pad,
+                         doppler_pad_factor=doppler_pad,
+                         training_cells_range=train, training_cells_doppler=train,
+                         guard_cells_range=guard, guard_cells_doppler=guard)
+        processor = RadarProcessor(config)
+        if recorded is None and config.stateful:
+            source = synthetic_stream(config)
+            check_equivalence(config, synthetic_frames(config, 1)[0][0])
+        else:
+            frames, timestamps = recorded or synthetic_frames(config, args.pool)
+            source = cycled(frames, timestamps, processor)
+            check_equivalence(config, frames[0])
+
+        heatmap = make_heatmap(processor)
+        if heatmap is None and not results:
+            print("pyqtgraph not installed: 'render' stage skipped")
+        times = run_stages(processor, make_tracker(args.tracker), heatmap, source, args.frames)
+        result = {'params': params, **summarize(times, skip=() if heatmap else ('render',))}
+        results.append(result)
+
+        print(f"\n{params}  RD {processor.doppler_fft_size}x{processor.range_fft_size // 2}: "
+              f"{result['frames_per_s']:.1f} frames/s")
+        for name, s in list(result['stages'].items()) + [('total', result['total'])]:
+            print(f"  {name:<12s} p50={s['p50_ms']:8.3f} ms  p99={s['p99_ms']:8.3f} ms")
+
+    output = {
+        'environment': environment(),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        raise SystemExit(1 if compare(results, args.compare, args.tolerance) else 0)
+
+
+if __name__ == '__main__':
+    main()
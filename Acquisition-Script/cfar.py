@@ -0,0 +1,174 @@
+import numpy as np
+from scipy.ndimage import rank_filter
+
+"""
+cfar.py
+-------
+2-D CFAR detectors for range–Doppler magnitude maps.
+
+Training-cell sums come from a summed-area table (integral image) built
+over the symmetrically padded map, so every cell costs a handful of
+lookups regardless of window size: O(N) instead of the O(N·K) direct
+`convolve2d` with the training kernel. Boundary handling matches
+`convolve2d(..., boundary='symm')`, so CA-CFAR detections are identical
+to the original detector in `radar_gui.py`.
+
+Variants:
+- 'ca': cell averaging over the full training ring
+- 'go': greatest-of the lagging / leading range half-windows
+- 'so': smallest-of the lagging / leading range half-windows
+- 'os': ordered statistic (k-th smallest training cell)
+
+A rank filter over the whole map is O(N·K log K) and far too slow for live
+use (~300 ms for a 128x270 map with the default window). OS-CFAR therefore
+screens the map with CA-CFAR first and tests only the candidate cells,
+mag > os_prescreen * threshold_factor * CA noise, by counting their training
+cells below mag / threshold_factor (~20 ms). OS-CFAR is meant for targets
+close to each other, whose echoes inflate the CA estimate; a prescreen
+factor of 0.5 still passes a cell whose CA noise is twice its OS noise.
+The noise map holds the order statistic at the detections (and at the cells
+CA-CFAR alone would detect) and the CA estimate elsewhere. With
+os_prescreen=0 the full rank filter is used: exact, but offline only.
+
+For 'go'/'so' each half-window spans all training Doppler rows and the
+training range cells on one side of the guard band.
+"""
+
+CFAR_METHODS = ('ca', 'go', 'so', 'os')
+
+
+def cfar_kernel(guard_cells_range, guard_cells_doppler, training_cells_range, training_cells_doppler):
+    """Training kernel: ones everywhere except guard + cell-under-test (central region)"""
+    kr = training_cells_range + guard_cells_range
+    kd = training_cells_doppler + guard_cells_doppler
+    kernel = np.ones((2*kd + 1, 2*kr + 1), dtype=np.float32)
+    kernel[kd - guard_cells_doppler : kd + guard_cells_doppler + 1,
+           kr - guard_cells_range : kr + guard_cells_range + 1] = 0
+    return kernel
+
+
+class CFAR:
+    """CFAR detector with precomputed kernel and preallocated buffers for one map shape"""
+
+    def __init__(self, shape, guard_cells_range=4, guard_cells_doppler=4,
+                 training_cells_range=8, training_cells_doppler=8,
+                 threshold_factor=2.5, method='ca', os_rank=None, os_prescreen=0.5):
+        if method not in CFAR_METHODS:
+            raise ValueError(f"Unknown CFAR method: {method} (expected one of {', '.join(CFAR_METHODS)})")
+
+        self.shape = tuple(shape)
+        self.method = method
+        self.threshold_factor = threshold_factor
+        self.gr, self.gd = guard_cells_range, guard_cells_doppler
+        self.kr = training_cells_range + guard_cells_range
+        self.kd = training_cells_doppler + guard_cells_doppler
+
+        self.kernel = cfar_kernel(guard_cells_range, guard_cells_doppler,
+                                  training_cells_range, training_cells_doppler)
+        self.n_training = int(self.kernel.sum())
+        self.n_half = (2*self.kd + 1) * training_cells_range  # cells per range half-window
+
+        # OS-CFAR: rank of the order statistic, 3/4 of the training cells by default
+        self.os_rank = int(0.75 * self.n_training) if os_rank is None else os_rank
+        self.os_prescreen = os_prescreen
+        self._footprint = self.kernel.astype(bool)
+        # Footprint as flat offsets from the cell under test, for gathering the training cells
+        rows_off, cols_off = np.nonzero(self._footprint)
+        self._offsets = (rows_off - self.kd) * self.shape[1] + (cols_off - self.kr)
+
+        # Only cells with a full training window are valid
+        rows, cols = self.shape
+        self.valid_mask = np.zeros(self.shape, dtype=bool)
+        self.valid_mask[self.kd:-self.kd, self.kr:-self.kr] = True
+
+        # Summed-area table with a leading zero row/column over the padded map
+        self._sat = np.zeros((rows + 2*self.kd + 1, cols + 2*self.kr + 1), dtype=np.float64)
+        self.noise = np.empty(self.shape, dtype=np.float64)  # noise map of the last call
+        self._tmp = np.empty(self.shape, dtype=np.float64)
+
+    # ─── Summed-area table ───────────────────────────────────────
+    def _build_sat(self, mag):
+        padded = np.pad(mag, ((self.kd, self.kd), (self.kr, self.kr)), mode='symmetric')
+        sat = self._sat[1:, 1:]
+        np.cumsum(padded, axis=0, out=sat)
+        np.cumsum(sat, axis=1, out=sat)
+
+    def _box_sum(self, r0, r1, c0, c1, out):
+        """
+        Sum over the window rows [r0, r1] x cols [c0, c1] (offsets from the
+        cell under test, inclusive) for every cell of the map
+        """
+        rows, cols = self.shape
+        S = self._sat
+        # Offsets into the padded map, shifted by one for the zero row/column
+        r0, r1 = r0 + self.kd, r1 + self.kd + 1
+        c0, c1 = c0 + self.kr, c1 + self.kr + 1
+        np.subtract(S[r1:r1 + rows, c1:c1 + cols], S[r0:r0 + rows, c1:c1 + cols], out=out)
+        out -= S[r1:r1 + rows, c0:c0 + cols]
+        out += S[r0:r0 + rows, c0:c0 + cols]
+        return out
+
+    # ─── Noise estimates ─────────────────────────────────────────
+    def noise_map(self, mag):
+        """
+        Per-cell noise level estimated from the training cells
+        Returns: array of map shape (reused across calls)
+        """
+        if self.method == 'os':
+            if not self.os_prescreen:
+                rank_filter(mag, self.os_rank, footprint=self._footprint, mode='reflect', output=self.noise)
+                return self.noise
+            return self._os_noise(mag)
+        if self.method == 'ca':
+            return self._ca_noise(mag)
+
+        self._build_sat(mag)
+        kd, kr, gr = self.kd, self.kr, self.gr
+        noise, tmp = self.noise, self._tmp
+
+        # GO/SO: lagging and leading range half-windows
+        self._box_sum(-kd, kd, -kr, -gr - 1, noise)
+        self._box_sum(-kd, kd, gr + 1, kr, tmp)
+        if self.method == 'go':
+            np.maximum(noise, tmp, out=noise)
+        else:
+            np.minimum(noise, tmp, out=noise)
+        noise /= self.n_half
+        return noise
+
+    def _ca_noise(self, mag):
+        """Mean of the full training ring"""
+        self._build_sat(mag)
+        kd, kr = self.kd, self.kr
+        noise = self._box_sum(-kd, kd, -kr, kr, self.noise)
+        noise -= self._box_sum(-self.gd, self.gd, -self.gr, self.gr, self._tmp)
+        noise /= self.n_training
+        return noise
+
+    def _os_noise(self, mag):
+        """
+        CA noise everywhere, replaced by the order statistic at the prescreened
+        cells that OS-CFAR detects or CA-CFAR would have detected
+        """
+        tf = self.threshold_factor
+        noise = self._ca_noise(mag)
+        candidates = mag > (self.os_prescreen * tf) * noise
+        candidates &= self.valid_mask
+        cells = np.flatnonzero(candidates)
+        if not cells.size:
+            return noise
+        # Valid cells have their whole window inside the map, so no padding is needed
+        flat = mag.reshape(-1)
+        training = np.take(flat, cells[:, None] + self._offsets)
+        level = flat[cells] / tf
+        # mag > tf * (k-th smallest) <=> more than k training cells lie below mag / tf
+        hit = np.count_nonzero(training < level[:, None], axis=1) > self.os_rank
+        # The order statistic itself is only needed where the decision depends on it
+        hit |= level > noise.reshape(-1)[cells]
+        noise.reshape(-1)[cells[hit]] = np.partition(training[hit], self.os_rank, axis=1)[:, self.os_rank]
+        return noise
+
+    def detect(self, mag):
+        """Returns: boolean detection mask, False outside the valid region"""
+        noise = self.noise_map(mag)
+        return (mag > self.threshold_factor * noise) & self.valid_mask
@@ -0,0 +1,233 @@
+import numpy as np
+from scipy.signal import butter, lfilter, lfilter_zi
+
+"""
+clutter.py
+----------
+Slow-time clutter suppression fused with the range window.
+
+ClutterFilter takes sliced bursts [2, num_chirps, samples] and writes the
+filtered, range-windowed chirps of both channels straight into a
+preallocated buffer (normally the zero-padded range FFT input), using
+in-place ufuncs on persistent scratch buffers. The range window only depends
+on the fast-time sample and the filters only act along slow time, so the
+window can be applied before or after filtering, whichever saves a pass.
+
+Methods (the options of `clutterRemoval.m`, plus two stateful ones):
+- 'none'       range window only
+- 'mean'       subtract the mean over the burst's chirps (the original
+               apply_clutter_cancellation)
+- 'mti2'       two-pulse canceller, y[n] = x[n] - x[n-1]
+- 'mti3'       three-pulse canceller, y[n] = x[n] - 2x[n-1] + x[n-2]
+- 'hpf'        Butterworth high-pass along slow time (scipy lfilter), cutoff
+               given as a velocity
+- 'background' exponentially updated background (complex mean chirp),
+               bg += alpha * (burst mean - bg)
+
+The MTI, HPF and background filters keep state across bursts (previous
+chirps, lfilter delay line, background), so the first chirps of a burst are
+filtered against the end of the previous one. Call `reset()` when slow time
+is no longer contiguous (lost frames, new parameters).
+
+RDBackgroundMap works after the Doppler FFT instead: an exponentially
+weighted mean and variance of the magnitude of every range–Doppler cell,
+learnt over many CPIs. A burst-mean filter only removes what is static
+within one burst; slowly moving clutter with residual Doppler stays put
+across CPIs and is learnt here. CFAR (and the SNR check of the extraction)
+always runs on |RD|; the map only gates its hits:
+- 'subtract': a hit is kept if the cell still passes the CFAR threshold after
+              its background is removed, |RD| - mean > factor * noise
+- 'mask':     a hit is kept if the cell exceeds its own history,
+              |RD| > mean + k * std
+Running CFAR on the background-subtracted map itself would not work: the
+rectified residual is mostly zeros, so the training cells underestimate
+the noise and the false alarm rate explodes.
+Every cell is then updated in place with the forgetting factor `alpha`
+(memory of about 1/alpha CPIs), cells holding a detection with the slower
+`hit_alpha` so slow targets are not learnt as clutter while they linger:
+constant memory (a few map-sized buffers) and O(1) work per cell per CPI.
+"""
+
+CLUTTER_METHODS = ('none', 'mean', 'mti2', 'mti3', 'hpf', 'background')
+STATEFUL_CLUTTER_METHODS = ('mti2', 'mti3', 'hpf', 'background')   # state carried across bursts
+RD_BACKGROUND_MODES = ('subtract', 'mask')
+
+
+class ClutterFilter:
+    """Slow-time clutter filter and range window for two-channel bursts"""
+
+    def __init__(self, method, shape, window, chirp_period_s=None, wavelength=None,
+                 cutoff_ms=0.5, hpf_order=2, alpha=0.1, dtype=np.complex64):
+        if method not in CLUTTER_METHODS:
+            raise ValueError(f"Unknown clutter method: {method}")
+        self.method = method
+        self.shape = tuple(shape)                 # [channels, chirps, samples]
+        self.window = np.asarray(window, dtype=np.float32)
+        self.alpha = alpha
+        channels, chirps, samples = self.shape
+
+        # Per-method state and scratch buffers
+        self._mean = np.empty((channels, 1, samples), dtype=dtype)
+        if method in ('mti2', 'mti3'):
+            # Windowed chirps with the last `taps` chirps of the previous burst in front
+            self.taps = 1 if method == 'mti2' else 2
+            self._x = np.empty((channels, chirps + self.taps, samples), dtype=dtype)
+        elif method == 'hpf':
+            if chirp_period_s is None or wavelength is None:
+                raise ValueError("The 'hpf' clutter filter needs chirp_period_s and wavelength")
+            # Velocity cutoff -> Doppler frequency, relative to the slow-time Nyquist rate
+            cutoff = (2 * cutoff_ms / wavelength) * (2 * chirp_period_s)
+            if not 0 < cutoff < 1:
+                raise ValueError(f"HPF cutoff {cutoff_ms} m/s is outside the unambiguous velocity range")
+            b, a = butter(hpf_order, cutoff, btype='high')
+            real = np.empty(0, dtype=dtype).real.dtype
+            self.b, self.a = b.astype(real), a.astype(real)
+            self._zi_step = lfilter_zi(b, a).astype(real)[None, :, None]
+            self._zi = None
+        elif method == 'background':
+            self._background = np.empty((channels, 1, samples), dtype=dtype)
+        self.stateful = method in STATEFUL_CLUTTER_METHODS
+        self.reset()
+
+    def reset(self):
+        """Forget the state carried over from previous bursts"""
+        self._primed = False
+        if self.method == 'hpf':
+            self._zi = None
+
+    def apply(self, bursts, out):
+        """
+        Filter bursts [2, num_chirps, samples] along slow time and apply the range window
+        Returns: out, filled in place
+        """
+        method = self.method
+        if method == 'hpf':
+            self._highpass(bursts, out)
+        else:
+            np.multiply(bursts, self.window, out=out)
+            if method == 'mean':
+                out -= self._chirp_mean(out)
+            elif method in ('mti2', 'mti3'):
+                self._mti(out)
+            elif method == 'background':
+                self._subtract_background(out)
+        self._primed = True
+        return out
+
+    def _chirp_mean(self, x):
+        """Mean over the chirps into the scratch buffer. Returns: [2, 1, samples]"""
+        np.sum(x, axis=-2, keepdims=True, out=self._mean)
+        self._mean *= 1 / x.shape[-2]
+        return self._mean
+
+    def _mti(self, out):
+        # Windowed chirps go after the carried-over ones, then the canceller
+        # differences are written back into `out`
+        x, k = self._x, self.taps
+        x[:, k:] = out
+        if not self._primed:
+            x[:, :k] = out[:, :1]   # start as if the first chirp had always been there
+        if k == 1:
+            np.subtract(x[:, 1:], x[:, :-1], out=out)
+        else:
+            np.subtract(x[:, 2:], x[:, 1:-1], out=out)
+            out -= x[:, 1:-1]
+            out += x[:, :-2]
+        x[:, :k] = x[:, -k:]
+
+    def _highpass(self, bursts, out):
+        # Steady-state initial conditions for the first chirp, so static clutter
+        # does not ring through the first bursts
+        if self._zi is None:
+            self._zi = self._zi_step * bursts[:, :1, :]
+        # lfilter allocates its output; the window is applied while copying it into `out`
+        y, self._zi = lfilter(self.b, self.a, bursts, axis=-2, zi=self._zi)
+        np.multiply(y, self.window, out=out)
+
+    def _subtract_background(self, out):
+        mean = self._chirp_mean(out)
+        bg = self._background
+        if not self._primed:
+            bg[:] = mean
+        else:
+            mean -= bg
+            mean *= self.alpha
+            bg += mean
+        out -= bg
+
+
+class RDBackgroundMap:
+    """Per-cell exponential clutter statistics of range–Doppler magnitude maps"""
+
+    def __init__(self, shape, mode='mask', alpha=0.05, k_sigma=3.0, warmup=20, hit_alpha=None):
+        if mode not in RD_BACKGROUND_MODES:
+            raise ValueError(f"Unknown RD background mode: {mode}")
+        self.mode = mode
+        self.alpha = alpha
+        self.hit_alpha = alpha * 0.1 if hit_alpha is None else hit_alpha   # cells with a detection
+        self.k_sigma = k_sigma
+        self.warmup = warmup      # CPIs learnt before the map is applied
+        self.mean = np.zeros(shape, dtype=np.float32)
+        self.var = np.zeros(shape, dtype=np.float32)
+        self._work = np.empty(shape, dtype=np.float32)
+        self._step = np.empty(shape, dtype=np.float32)
+        self._rate = np.empty(shape, dtype=np.float32)
+        self._above = np.empty(shape, dtype=bool)
+        self.reset()
+
+    def reset(self):
+        self.mean[:] = 0
+        self.var[:] = 0
+        self.updates = 0
+        self.suppressed = 0       # CFAR hits removed by the map in the last CPI
+
+    @property
+    def ready(self):
+        return self.updates >= self.warmup
+
+    def mask(self, hits, mag, noise, threshold_factor):
+        """
+        Drop CFAR hits explained by the background: cells whose excess over their
+        mean does not pass the CFAR threshold ('subtract') or that do not exceed
+        their mean + k * std ('mask'). noise is the CFAR noise map of mag.
+        Returns: hits, modified in place
+        """
+        if not self.ready:
+            self.suppressed = 0
+            return hits
+        threshold = self._work
+        if self.mode == 'subtract':
+            np.multiply(noise, threshold_factor, out=threshold)
+        else:
+            np.sqrt(self.var, out=threshold)
+            threshold *= self.k_sigma
+        threshold += self.mean
+        np.greater(mag, threshold, out=self._above)
+        before = np.count_nonzero(hits)
+        hits &= self._above
+        self.suppressed = before - np.count_nonzero(hits)
+        return hits
+
+    def update(self, mag, hits=None):
+        """
+        Exponentially weighted mean and variance of every cell, updated in place with this CPI.
+        Cells with a (surviving) detection learn at hit_alpha, so a target that
+        lingers in a cell is not absorbed as fast as clutter, but a new static
+        object still is eventually.
+        """
+        if self.updates == 0:
+            self.mean[:] = mag
+        else:
+            # d = mag - mean;  mean += a*d;  var = (1 - a) * (var + a*d^2)
+            a = self._rate
+            a.fill(self.alpha)
+            if hits is not None and self.ready:
+                np.copyto(a, self.hit_alpha, where=hits)
+            d = np.subtract(mag, self.mean, out=self._work)
+            step = np.multiply(d, a, out=self._step)
+            self.mean += step
+            step *= d
+            self.var += step
+            np.subtract(1, a, out=a)
+            self.var *= a
+        self.updates += 1
@@ -0,0 +1,195 @@
+import colorsys
+import time
+import numpy as np
+import pyqtgraph as pg
+from tracking import TIMESTAMP, smooth_track
+
+"""
+display.py
+----------
+Rendering helpers for the PyQtGraph GUIs.
+
+RDHeatmap draws a range–Doppler map through one persistent ImageItem: the
+normalised dB magnitude is written with in-place ufuncs into a
+preallocated, C-contiguous [range, doppler] buffer (the layout ImageItem
+expects for x = range, y = velocity), so no arrays are allocated per frame
+and no transposed copy is made. The image rectangle is only set when the
+axes change.
+
+RateLimiter decouples the display rate from the processing rate: the GUI
+processes every frame but only redraws when the limiter allows it.
+
+TrackLayer draws the tracks of a TrackStore incrementally: only tracks that
+gained a point since the last draw are smoothed and re-set, pens and
+per-track brush arrays are created once, plot items of dead tracks are
+removed from the plot, and the HTML legend is rebuilt at a lower rate and
+only pushed when its text changes. The cost of a redraw therefore depends on
+the number of live, changing tracks, not on how long the session has run.
+"""
+
+
+def generate_track_color(track_id):
+    """Generate distinct colors for different tracks using golden ratio"""
+    golden_ratio = 0.618033988749895
+    hue = (track_id * golden_ratio) % 1.0
+    rgb = colorsys.hsv_to_rgb(hue, 0.9, 0.9)
+    return [int(255*x) for x in rgb]
+
+
+def rgb_to_hex(rgb):
+    """Convert RGB values to hex color string"""
+    return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+
+
+class RateLimiter:
+    """Allows an action at most `max_hz` times per second (0 or None = always)"""
+
+    def __init__(self, max_hz):
+        self.min_interval = 1.0 / max_hz if max_hz else 0.0
+        self._last = -np.inf
+
+    def ready(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if now - self._last < self.min_interval:
+            return False
+        self._last = now
+        return True
+
+
+class RDHeatmap:
+    """Range–Doppler dB image with preallocated buffers and fixed geometry"""
+
+    def __init__(self, img_item, floor=1e-12):
+        self.img_item = img_item
+        self.floor = floor
+        self._db = None
+        self._axes = None
+
+    def set_axes(self, ranges_m, velocities_ms):
+        """Size the buffer and place the image; only needed when the axes change"""
+        axes = (len(ranges_m), len(velocities_ms), ranges_m[0], ranges_m[-1], velocities_ms[0], velocities_ms[-1])
+        if axes == self._axes:
+            return
+        self._axes = axes
+        self._db = np.empty((len(ranges_m), len(velocities_ms)), dtype=np.float32)
+        self.img_item.setRect(pg.QtCore.QRectF(
+            ranges_m[0],                          # xmin
+            velocities_ms[0],                     # ymin
+            ranges_m[-1] - ranges_m[0],           # width
+            velocities_ms[-1] - velocities_ms[0]  # height
+        ))
+
+    def update(self, RD):
+        """Draw one complex RD map [doppler, range] as 20*log10(|RD| / max)"""
+        db = self._db
+        np.abs(RD.T, out=db)
+        peak = db.max()
+        db *= 1 / peak if peak > 0 else 1
+        db += self.floor
+        np.log10(db, out=db)
+        db *= 20
+        self.img_item.setImage(db, autoLevels=False)
+        return db
+
+
+class TrackLayer:
+    """Incremental drawing of tracks and their legend on a range–angle plot"""
+
+    def __init__(self, plot, legend_item, smoothing_window=5, smooth=True,
+                 legend_interval_s=0.5, brush_levels=16):
+        self.plot = plot
+        self.legend_item = legend_item
+        self.smoothing_window = smoothing_window
+        self.smooth = smooth
+        self.brush_levels = brush_levels
+        self._legend_limiter = RateLimiter(1.0 / legend_interval_s if legend_interval_s else 0)
+        self._legend_html = None
+
+        # Per track ID
+        self.items = {}       # PlotDataItem
+        self.colors = {}      # [r, g, b]
+        self._brushes = {}    # object array of brushes, one per alpha level
+        self._versions = {}   # (length, last timestamp) when last drawn
+        self._info = {}       # legend values of the last drawn state
+        self._levels = {}     # track length -> alpha level index per point
+
+    def _create(self, track_id):
+        color = generate_track_color(track_id)
+        item = pg.PlotDataItem(pen=pg.mkPen(color, width=2), symbol='o', symbolSize=6, symbolPen=None)
+        self.plot.addItem(item)
+        alphas = np.linspace(0.2, 1.0, self.brush_levels)
+        brushes = np.empty(self.brush_levels, dtype=object)
+        brushes[:] = [pg.mkBrush(*color, int(a*255)) for a in alphas]
+        self.items[track_id] = item
+        self.colors[track_id] = color
+        self._brushes[track_id] = brushes
+        return item
+
+    def _remove(self, track_id):
+        self.plot.removeItem(self.items.pop(track_id))
+        for d in (self.colors, self._brushes, self._versions, self._info):
+            d.pop(track_id, None)
+
+    def _alpha_levels(self, n):
+        """Older points fade: brush level index for each of n points (cached per length)"""
+        levels = self._levels.get(n)
+        if levels is None:
+            levels = np.rint(np.linspace(0, self.brush_levels - 1, n)).astype(np.intp)
+            self._levels[n] = levels
+        return levels
+
+    def clear(self):
+        for track_id in list(self.items):
+            self._remove(track_id)
+        self._legend_html = None
+        self.legend_item.setHtml('')
+
+    def update(self, tracker, now=None):
+        """Redraw tracks that changed, drop dead ones and refresh the legend when due"""
+        slots = np.flatnonzero(tracker.active)
+        ids = tracker.ids[slots]
+
+        # Remove plot items of tracks that no longer exist
+        live = set(ids.tolist())
+        for track_id in [t for t in self.items if t not in live]:
+            self._remove(track_id)
+
+        for track_id, slot in zip(ids.tolist(), slots):
+            version = (int(tracker.lengths[slot]), float(tracker.last[slot, TIMESTAMP]))
+            if self._versions.get(track_id) == version:
+                continue
+            self._versions[track_id] = version
+            item = self.items.get(track_id) or self._create(track_id)
+
+            track_array = tracker.track(track_id)
+            if self.smooth:
+                track_array = smooth_track(track_array, self.smoothing_window)
+            item.setData(
+                x=track_array[:, 0],
+                y=track_array[:, 1],
+                symbolBrush=self._brushes[track_id][self._alpha_levels(len(track_array))],
+            )
+            self._info[track_id] = (track_array[-1, 0], track_array[-1, 1],
+                                    float(np.mean(np.abs(track_array[:, 2]))))
+
+        if self._legend_limiter.ready(now):
+            self._update_legend(ids)
+
+    def _update_legend(self, ids):
+        html = ''
+        if len(ids):
+            html = '<div style="background-color: rgba(0, 0, 0, 0.7); padding: 10px; border-radius: 5px;">'
+            for track_id in ids.tolist():
+                range_m, angle, velocity = self._info[track_id]
+                html += (
+                    f'<div style="color: {rgb_to_hex(self.colors[track_id])}; margin-bottom: 5px;">'
+                    f'Track {track_id + 1}: '
+                    f'R={range_m:.1f}m, '
+                    f'θ={angle:.1f}°, '
+                    f'v={velocity:.1f}m/s'
+                    f'</div>'
+                )
+            html += '</div>'
+        if html != self._legend_html:
+            self._legend_html = html
+            self.legend_item.setHtml(html)
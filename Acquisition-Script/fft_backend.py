@@ -0,0 +1,144 @@
+import os
+import pickle
+import numpy as np
+import scipy.fft
+
+try:
+    import pyfftw
+except ImportError:  # pyFFTW is optional, fall back to numpy/scipy
+    pyfftw = None
+
+"""
+fft_backend.py
+--------------
+Pluggable, pre-planned FFTs for the range and Doppler transforms.
+
+A backend owns one zero-padded input buffer and one output buffer per
+transform, sized once for the whole two-channel frame:
+- range:   [2, num_chirps, range_fft_size],            FFT along the last axis
+- Doppler: [2, doppler_fft_size, range_fft_size // 2], FFT along slow time
+
+The caller writes samples into `range_input` / `doppler_input` (the padding
+stays zero) and calls `execute_range()` / `execute_doppler()`. Output
+buffers are reused across frames, so results must be copied if they are
+kept beyond the next call.
+
+Backends:
+- 'numpy':  numpy.fft writing into the preallocated outputs
+- 'scipy':  scipy.fft with `workers=` threads, transforming in place in the
+            preallocated outputs (input copied in, `overwrite_x=True`)
+- 'pyfftw': FFTW plans built once, with wisdom persisted to disk
+- 'auto':   pyfftw if installed, otherwise scipy
+"""
+
+FFT_DTYPE = np.complex64
+
+
+class FFTBackend:
+    """numpy.fft backend, also the base class for the other backends"""
+    name = 'numpy'
+
+    def __init__(self, range_shape, doppler_shape, workers=1):
+        self.workers = workers
+        self.range_input = self._empty(range_shape)
+        self.range_output = self._empty(range_shape)
+        self.doppler_input = self._empty(doppler_shape)
+        self.doppler_output = self._empty(doppler_shape)
+
+    def _empty(self, shape):
+        return np.zeros(shape, dtype=FFT_DTYPE)
+
+    def execute_range(self):
+        return np.fft.fft(self.range_input, axis=-1, out=self.range_output)
+
+    def execute_doppler(self):
+        return np.fft.fft(self.doppler_input, axis=-2, out=self.doppler_output)
+
+
+class ScipyFFTBackend(FFTBackend):
+    """scipy.fft backend, multithreaded over the batch with `workers`"""
+    name = 'scipy'
+
+    def _execute(self, x, out, axis):
+        # scipy.fft has no `out=`: the input is copied into the output buffer and
+        # transformed there in place, so no array is allocated per call (the
+        # input keeps its zero-padding)
+        np.copyto(out, x)
+        y = scipy.fft.fft(out, axis=axis, overwrite_x=True, workers=self.workers)
+        if not np.shares_memory(y, out):
+            np.copyto(out, y)
+        return out
+
+    def execute_range(self):
+        return self._execute(self.range_input, self.range_output, -1)
+
+    def execute_doppler(self):
+        return self._execute(self.doppler_input, self.doppler_output, -2)
+
+
+class PyFFTWBackend(FFTBackend):
+    """FFTW backend with plans created once over SIMD-aligned buffers"""
+    name = 'pyfftw'
+
+    def __init__(self, range_shape, doppler_shape, workers=1,
+                 wisdom_path=None, planner_effort='FFTW_MEASURE'):
+        if pyfftw is None:
+            raise ImportError("pyFFTW is not installed, use the 'numpy' or 'scipy' FFT backend")
+        self.wisdom_path = wisdom_path
+        load_wisdom(wisdom_path)
+        super().__init__(range_shape, doppler_shape, workers)
+
+        # Inputs must be preserved: the zero-padding is written only once
+        flags = (planner_effort,)
+        self._range_plan = pyfftw.FFTW(self.range_input, self.range_output, axes=(-1,),
+                                       flags=flags, threads=workers)
+        self._doppler_plan = pyfftw.FFTW(self.doppler_input, self.doppler_output, axes=(-2,),
+                                         flags=flags, threads=workers)
+        # FFTW_MEASURE scribbles over the buffers while planning
+        self.range_input[:] = 0
+        self.doppler_input[:] = 0
+        save_wisdom(wisdom_path)
+
+    def _empty(self, shape):
+        return pyfftw.zeros_aligned(shape, dtype=FFT_DTYPE)
+
+    def execute_range(self):
+        return self._range_plan()
+
+    def execute_doppler(self):
+        return self._doppler_plan()
+
+
+def load_wisdom(path):
+    """Import FFTW wisdom from `path` if it exists. Returns: True if loaded"""
+    if pyfftw is None or not path or not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        pyfftw.import_wisdom(pickle.load(f))
+    return True
+
+
+def save_wisdom(path):
+    """Export the accumulated FFTW wisdom to `path`"""
+    if pyfftw is None or not path:
+        return
+    with open(path, 'wb') as f:
+        pickle.dump(pyfftw.export_wisdom(), f)
+
+
+FFT_BACKENDS = {
+    'numpy': FFTBackend,
+    'scipy': ScipyFFTBackend,
+    'pyfftw': PyFFTWBackend,
+}
+
+
+def make_fft_backend(name, range_shape, doppler_shape, workers=1, wisdom_path=None):
+    """Create the FFT backend `name` for the given range and Doppler buffer shapes"""
+    if name == 'auto':
+        name = 'pyfftw' if pyfftw is not None else 'scipy'
+    if name not in FFT_BACKENDS:
+        raise ValueError(f"Unknown FFT backend: {name} (expected one of {', '.join(FFT_BACKENDS)} or auto)")
+    if name == 'pyfftw':
+        return PyFFTWBackend(range_shape, doppler_shape, workers, wisdom_path)
+    return FFT_BACKENDS[name](range_shape, doppler_shape, workers)
@@ -0,0 +1,212 @@
+import threading
+import time
+import numpy as np
+import zmq
+from wire_protocol import recv_frame, decode_iq, SequenceTracker
+
+"""
+frame_receiver.py
+-----------------
+Background ZeroMQ receiver for the host GUIs.
+
+A dedicated thread drains the PULL socket as fast as frames arrive and
+copies each one into a preallocated ring buffer of complex64 slots
+(`[2, total_samples]` for raw acquisition). The GUI thread only ever pops
+from the ring, so a slow frame on the display side never blocks the socket
+and the PUSH side on the Raspberry Pi never stalls on backpressure.
+
+Frames are read with `wire_protocol.recv_frame`: the payload is wrapped
+zero-copy and copied once, into its ring slot, where int16/float16 payloads
+are converted to complex64 on the way (`decode_iq`). The header of each frame is
+kept alongside its slot, and sequence gaps are counted as frames lost in
+transit.
+
+Malformed messages (bad header, payload size not matching the header's
+shape) are counted as dropped frames and skipped; they never stop the
+receiver thread.
+
+Overflow policy:
+- 'drop_oldest': overwrite the oldest queued frame (lowest latency)
+- 'drop_newest': discard the incoming frame (keeps contiguous history)
+
+With an `instrumentation.Metrics`, the time spent in the receiver thread is
+recorded per frame as 'rx_recv' (socket read) and 'rx_copy' (decode into
+the ring).
+"""
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+
+class FrameReceiver:
+    """Threaded PULL receiver writing into a bounded frame ring buffer"""
+
+    def __init__(self, address, num_slots=4, policy=DROP_OLDEST,
+                 dtype=np.complex64, num_channels=2, poll_ms=100, metrics=None):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        if num_slots < 1:
+            raise ValueError("num_slots must be at least 1")
+
+        self.address = address
+        self.num_slots = num_slots
+        self.policy = policy
+        self.dtype = np.dtype(dtype)
+        self.num_channels = num_channels  # used to shape header-less (legacy) frames
+        self.poll_ms = poll_ms
+        self.metrics = metrics            # optional instrumentation.Metrics
+
+        # Ring buffer is allocated on the first frame, once the frame shape is known
+        self._slots = None
+        self._headers = [None] * num_slots
+        self._head = 0      # index of oldest queued frame
+        self._count = 0     # number of queued frames
+        self.header = None  # header of the last popped frame
+
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.sequence = SequenceTracker()
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ─── Thread control ──────────────────────────────────────────
+    def start(self):
+        """Start the receiver thread"""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameReceiver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """Stop the receiver thread and close its socket"""
+        self._stop.set()
+        with self._ready:
+            self._ready.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        # ZMQ sockets are not thread-safe, so the socket lives entirely in this thread
+        ctx = zmq.Context.instance()
+        pull = ctx.socket(zmq.PULL)
+        pull.setsockopt(zmq.LINGER, 0)
+        pull.connect(self.address)
+        poller = zmq.Poller()
+        poller.register(pull, zmq.POLLIN)
+        try:
+            while not self._stop.is_set():
+                if not poller.poll(self.poll_ms):
+                    continue
+                try:
+                    if self.metrics is None:
+                        header, data = recv_frame(pull)
+                        self._push(header, data)
+                        continue
+                    t = time.perf_counter()
+                    header, data = recv_frame(pull)
+                    t = self.metrics.record('rx_recv', t)
+                    self._push(header, data)
+                    self.metrics.record('rx_copy', t)
+                except (ValueError, zmq.ZMQError):
+                    # Malformed message (bad header, payload not matching its shape)
+                    # or a failed read: drop it and keep receiving
+                    with self._lock:
+                        self.dropped += 1
+        finally:
+            pull.close()
+
+    # ─── Ring buffer ─────────────────────────────────────────────
+    def _allocate(self, shape):
+        self._slots = np.empty((self.num_slots,) + tuple(shape), dtype=self.dtype)
+        self._head = 0
+        self._count = 0
+
+    def _frame_shape(self, header, data):
+        if header is None:
+            if data.size % self.num_channels:
+                return None
+            return (self.num_channels, data.size // self.num_channels)
+        return header.frame_shape
+
+    def _push(self, header, data):
+        """Copy one received frame into the ring according to the overflow policy"""
+        with self._ready:
+            self.received += 1
+            if header is not None:
+                self.sequence.update(header.seq)
+            shape = self._frame_shape(header, data)
+            if shape is None:
+                self.dropped += 1
+                return
+            if self._slots is None or self._slots.shape[1:] != shape:
+                # First frame (or the stream was reconfigured): (re)allocate the slots
+                self.dropped += self._count
+                self._allocate(shape)
+
+            if self._count == self.num_slots:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                # DROP_OLDEST: overwrite the oldest slot and advance the head
+                self._head = (self._head + 1) % self.num_slots
+                self._count -= 1
+                self.dropped += 1
+
+            tail = (self._head + self._count) % self.num_slots
+            if header is None:
+                self._slots[tail].reshape(-1)[:] = data
+            else:
+                decode_iq(header, data, out=self._slots[tail])
+            self._headers[tail] = header
+            self._count += 1
+            self._ready.notify()
+
+    def pop(self, out=None, timeout=0.0):
+        """
+        Copy the oldest queued frame into `out` and release its slot.
+        The frame's header (None for legacy streams) is left in `self.header`.
+        Returns: the frame array, or None if no frame arrived within `timeout` seconds
+        """
+        with self._ready:
+            if self._count == 0 and timeout:
+                self._ready.wait_for(lambda: self._count > 0 or self._stop.is_set(), timeout)
+            if self._count == 0:
+                return None
+            slot = self._slots[self._head]
+            if out is None or out.shape != slot.shape:
+                out = np.empty_like(slot)
+            np.copyto(out, slot)
+            self.header = self._headers[self._head]
+            self._head = (self._head + 1) % self.num_slots
+            self._count -= 1
+            self.processed += 1
+            return out
+
+    @property
+    def depth(self):
+        """Number of frames currently queued"""
+        return self._count
+
+    @property
+    def lost(self):
+        """Frames missing from the sender's sequence numbers"""
+        return self.sequence.lost
+
+    def stats(self):
+        """Snapshot of the receive/processing counters"""
+        with self._lock:
+            return {
+                'received': self.received,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'lost': self.sequence.lost,
+                'queued': self._count,
+            }
@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+"""
+instrumentation.py
+------------------
+Lightweight runtime metrics for the GUIs: where does a frame's time go
+(network, DSP or rendering) during a long run in the field?
+
+- LatencyHistogram: fixed log-spaced buckets (10 µs ... 10 s). Recording a
+  sample is a bisect and a few scalar updates; no arrays are allocated per
+  frame and memory stays constant however long the run.
+- Metrics: named histograms and gauges (queue depth, dropped frames, ...)
+  plus a frame-rate estimate. `record(stage, t0)` takes time.perf_counter()
+  stamps, so stages can be chained without context managers. Each
+  histogram should be updated from a single thread; adding histograms or
+  gauges and reading them for output (e.g. from the MetricsServer thread)
+  is guarded by a lock.
+- Output: a short text block for an on-screen overlay, a JSON snapshot
+  appended to a metrics file, and the Prometheus text exposition format,
+  served by MetricsServer on a local port (GET /metrics).
+"""
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed log-spaced buckets"""
+
+    def __init__(self, min_s=1e-5, max_s=10.0, buckets_per_decade=10):
+        num = int(round(np.log10(max_s / min_s) * buckets_per_decade)) + 1
+        self.bounds = [float(b) for b in np.logspace(np.log10(min_s), np.log10(max_s), num)]
+        self.counts = [0] * (num + 1)   # one bucket per upper bound, plus overflow
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """q-quantile, interpolated within its bucket (seconds)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            if c and acc + c >= target:
+                if i == len(self.bounds):
+                    return self.max
+                lower = self.bounds[i - 1] if i else 0.0
+                return min(lower + (self.bounds[i] - lower) * (target - acc) / c, self.max)
+            acc += c
+        return self.max
+
+
+class Metrics:
+    """Stage latency histograms, gauges and frame rate of one process"""
+
+    def __init__(self, stages=(), namespace='radar', rate_alpha=0.1):
+        self.namespace = namespace
+        self._lock = threading.Lock()   # guards inserting into / iterating the dicts
+        self.histograms = {}
+        for name in stages:
+            self.histogram(name)
+        self.gauges = {}
+        self.frames = 0
+        self.fps = 0.0
+        self.rate_alpha = rate_alpha     # smoothing of the frame-rate estimate
+        self._last_frame = None
+        self.start_time = time.time()
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, LatencyHistogram())
+        return hist
+
+    # ─── Recording ───────────────────────────────────────────────
+    def record(self, stage, t0):
+        """Add the time since perf_counter() stamp t0 to `stage`. Returns: now, the next stage's t0"""
+        now = time.perf_counter()
+        self.histogram(stage).add(now - t0)
+        return now
+
+    def add(self, stage, seconds):
+        self.histogram(stage).add(seconds)
+
+    def set(self, gauge, value):
+        with self._lock:
+            self.gauges[gauge] = value
+
+    def frame(self, now=None):
+        """Count one processed frame and update the frame rate"""
+        now = time.perf_counter() if now is None else now
+        if self._last_frame is not None and now > self._last_frame:
+            fps = 1.0 / (now - self._last_frame)
+            self.fps = fps if not self.frames else self.fps + self.rate_alpha * (fps - self.fps)
+        self._last_frame = now
+        self.frames += 1
+
+    def _items(self):
+        """Copies of the histogram and gauge items, safe to iterate from any thread"""
+        with self._lock:
+            return list(self.histograms.items()), list(self.gauges.items())
+
+    def reset(self):
+        for _, hist in self._items()[0]:
+            hist.reset()
+
+    # ─── Output ──────────────────────────────────────────────────
+    def snapshot(self):
+        """Counters and per-stage latency summary (ms) as a JSON-friendly dict"""
+        histograms, gauges = self._items()
+        return {
+            'time': time.time(),
+            'uptime_s': time.time() - self.start_time,
+            'frames': self.frames,
+            'fps': self.fps,
+            'gauges': dict(gauges),
+            'stages': {
+                name: {
+                    'count': h.count,
+                    'mean_ms': h.mean * 1e3,
+                    'p50_ms': h.quantile(0.5) * 1e3,
+                    'p99_ms': h.quantile(0.99) * 1e3,
+                    'max_ms': h.max * 1e3,
+                }
+                for name, h in histograms
+            },
+        }
+
+    def overlay_text(self):
+        """Few lines for an on-screen overlay"""
+        histograms, gauges = self._items()
+        lines = [f"{self.fps:5.1f} frames/s"]
+        if gauges:
+            lines.append('  '.join(f"{k}={v:g}" for k, v in gauges))
+        for name, h in histograms:
+            if h.count:
+                lines.append(f"{name:<13s} p50 {h.quantile(0.5)*1e3:6.2f}  p99 {h.quantile(0.99)*1e3:6.2f} ms")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """Append one snapshot as a JSON line"""
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.snapshot()) + '\n')
+
+    def prometheus(self):
+        """Prometheus text exposition of the histograms, gauges and counters"""
+        ns = self.namespace
+        histograms, gauges = self._items()
+        lines = [
+            f"# TYPE {ns}_frames_total counter",
+            f"{ns}_frames_total {self.frames}",
+            f"# TYPE {ns}_frame_rate gauge",
+            f"{ns}_frame_rate {self.fps:.6g}",
+        ]
+        for name, value in gauges:
+            lines += [f"# TYPE {ns}_{name} gauge", f"{ns}_{name} {value:.6g}"]
+        lines.append(f"# TYPE {ns}_stage_seconds histogram")
+        for name, h in histograms:
+            acc = 0
+            for bound, c in zip(h.bounds, h.counts):
+                acc += c
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{name}",le="{bound:.6g}"}} {acc}')
+            lines.append(f'{ns}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{name}"}} {h.total:.9g}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{name}"}} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves Metrics.prometheus() at http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, metrics, port=9108, host='127.0.0.1'):
+        self.metrics = metrics
+        self.address = (host, port)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,114 @@
+import numpy as np
+
+"""
+micro_doppler.py
+----------------
+Streaming micro-Doppler spectrogram, the live counterpart of the
+micro-Doppler view in `RadarReplayGUI.m`.
+
+Works on the range profiles of each burst (the range FFT output of
+RadarProcessor, [2, num_chirps, range_bins]), so nothing is recomputed from
+history. Per burst:
+1. the range bin of the selected target (strongest detection, or the
+   strongest range bin) is smoothed exponentially, as `alpha_idx` in the
+   MATLAB GUI
+2. the two channels are summed and the ±r_win range bins around it are
+   Doppler-FFT'd over the burst's chirps (a short-time FFT, windowed and
+   zero-padded)
+3. the Doppler power spectra are averaged with Gaussian range weights and
+   normalised to the median (noise floor) in dB
+4. the column is written into a circular spectrogram buffer
+
+The buffer is stored twice back to back, so the last `history` columns in
+time order are always one contiguous view that can be drawn as a scrolling
+image without rolling or copying.
+"""
+
+
+class MicroDoppler:
+    """Circular micro-Doppler spectrogram, one column per burst"""
+
+    def __init__(self, num_chirps, num_range_bins, chirp_period_s, wavelength, history=256,
+                 pad_factor=2, r_win=10, alpha_idx=0.7, floor=1e-12):
+        self.num_chirps = num_chirps
+        self.num_range_bins = num_range_bins
+        self.history = history
+        self.fft_size = num_chirps * pad_factor
+        self.r_win = r_win
+        self.alpha_idx = alpha_idx
+        self.floor = floor
+
+        # Velocity axis of a spectrogram column
+        doppler_freqs = np.fft.fftshift(np.fft.fftfreq(self.fft_size, chirp_period_s))
+        self.velocities_ms = doppler_freqs * wavelength / 2
+
+        # Slow-time window; for an even FFT size the fftshift is folded into it
+        # as (-1)^n, as in RadarProcessor
+        window = np.hanning(num_chirps).astype(np.float32)
+        self._shift_in_window = self.fft_size % 2 == 0
+        if self._shift_in_window:
+            window[1::2] *= -1
+        self._window_col = window[:, None]
+
+        # Gaussian range weights over ±r_win bins (sigma as in RadarReplayGUI.m)
+        sigma = max(0.8, r_win / 1.5)
+        offsets = np.arange(-r_win, r_win + 1)
+        self._kernel = np.exp(-0.5 * (offsets / sigma) ** 2).astype(np.float32)
+
+        # Buffers
+        self._fft_in = np.zeros((self.fft_size, 2 * r_win + 1), dtype=np.complex64)
+        self._buffer = np.zeros((2 * history, self.fft_size), dtype=np.float32)
+        self._head = 0        # next column to write
+        self.columns = 0      # columns written since the start
+        self.range_idx = None # smoothed range bin of the last column
+
+    def select(self, R, range_idx=None):
+        """Smoothed range bin to follow: the given target bin, or the strongest bin of R"""
+        if range_idx is None:
+            power = np.sum(np.abs(R[0]) ** 2, axis=0) + np.sum(np.abs(R[1]) ** 2, axis=0)
+            range_idx = int(np.argmax(power))
+        if self.range_idx is not None:
+            range_idx = self.alpha_idx * range_idx + (1 - self.alpha_idx) * self.range_idx
+        self.range_idx = int(np.clip(round(range_idx), 0, self.num_range_bins - 1))
+        return self.range_idx
+
+    def column(self, R, range_idx):
+        """Doppler power spectrum (dB over the median) around range_idx. Returns: [fft_size]"""
+        r0 = max(range_idx - self.r_win, 0)
+        r1 = min(range_idx + self.r_win + 1, R.shape[-1])
+        k0 = r0 - (range_idx - self.r_win)
+        n = r1 - r0
+
+        # Channel sum of the range bins around the target, windowed over the chirps
+        fft_in = self._fft_in[:, :n]
+        np.add(R[0, :, r0:r1], R[1, :, r0:r1], out=fft_in[:self.num_chirps])
+        fft_in[:self.num_chirps] *= self._window_col
+        spectrum = np.fft.fft(fft_in, axis=0)
+        if not self._shift_in_window:
+            spectrum = np.fft.fftshift(spectrum, axes=0)
+
+        # Gaussian-weighted power over range, relative to the noise floor
+        weights = self._kernel[k0:k0 + n]
+        power = (spectrum.real ** 2 + spectrum.imag ** 2) @ (weights / weights.sum())
+        power /= max(np.median(power), self.floor)
+        return 10 * np.log10(power + self.floor)
+
+    def update(self, R, range_idx=None):
+        """Add the column of one burst's range profiles [2, num_chirps, range_bins]"""
+        col = self.column(R, self.select(R, range_idx))
+        h = self._head
+        self._buffer[h] = col
+        self._buffer[h + self.history] = col
+        self._head = (h + 1) % self.history
+        self.columns += 1
+        return col
+
+    def image(self):
+        """Last `history` columns, oldest first. Returns: [history, fft_size] view (no copy)"""
+        return self._buffer[self._head:self._head + self.history]
+
+    def reset(self):
+        self._buffer[:] = 0
+        self._head = 0
+        self.columns = 0
+        self.range_idx = None
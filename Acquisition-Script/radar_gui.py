@@ -1,13 +1,17 @@
-import zmq
 import numpy as np
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtCore, QtWidgets
-from scipy.signal import butter, lfilter
-from scipy.signal import convolve2d
-import colorsys
-import time
 from datetime import datetime
 import os
+import time
+from dataclasses import replace
+from frame_receiver import FrameReceiver, DROP_OLDEST
+from radar_processing import RadarConfig, RadarProcessor
+from tracking import make_tracker
+from recorder import StreamRecorder
+from display import RDHeatmap, RateLimiter, TrackLayer
+from micro_doppler import MicroDoppler
+from instrumentation import Metrics, MetricsServer
 
 """
 radar_gui.py
@@ -15,13 +19,24 @@ radar_gui.py
 Real-time radar processing and visualization client.
 
 Connects to a ZeroMQ PUSH stream of complex64 IQ data (from PlutoSDR + CN0566),
-performs range–Doppler and angle estimation, and displays results in a PyQtGraph GUI.
+framed as described in `wire_protocol.py`, performs range–Doppler and angle estimation, and displays results in a PyQtGraph GUI.
+All signal processing lives in `radar_processing.py` and `tracking.py`; this
+script only wires them to the socket and the plots.
 
 Features:
-- Range–Doppler map with CFAR-like thresholding
+- Range–Doppler map with CFAR thresholding and multi-target extraction
 - Angle estimation via phase difference between two channels
 - Real-time track management (range, angle, velocity) with smoothing and legend
-- Optional data acquisition and saving to .npy files
+- Scrolling micro-Doppler spectrogram of the strongest target (see micro_doppler.py)
+- Optional data acquisition streamed to .npy files (see recorder.py)
+- Radar parameters taken from the frame headers; axes follow the sender's settings
+- Every frame is processed and tracked; plots are redrawn at most DISPLAY_MAX_FPS
+- Optional sliding CPI across bursts (CPI_CHIRPS / CPI_HOP) for finer velocity
+  resolution and more RD updates, each chirp range-FFT'd only once
+- Selectable clutter suppression (mean, 2/3-pulse MTI, high-pass, background)
+  and an optional adaptive RD clutter map before CFAR (RD_BACKGROUND)
+- Per-stage latency histograms, queue depth and dropped frames (see
+  instrumentation.py): on-screen overlay, metrics file and /metrics endpoint
 """
 
 # ─── Radar parameters ────────────────────────────────────────────
@@ -32,68 +47,79 @@ sample_rate    = 0.6e6          # Hz
 # FFT parameters
 RANGE_PAD_FACTOR = 2    # Amount of zero-padding for range FFT
 DOPPLER_PAD_FACTOR = 2  # Amount of zero-padding for Doppler FFT
+FFT_BACKEND = 'auto'    # 'numpy', 'scipy', 'pyfftw' or 'auto' (pyfftw if installed)
+FFT_WORKERS = 2         # FFT threads (scipy/pyfftw)
+FFT_WISDOM_PATH = 'fftw_wisdom.pkl'  # FFTW plans are reused across runs
+
+# Sliding CPI (None: each burst is one CPI, see radar_processing.py)
+CPI_CHIRPS = None       # chirps per Doppler FFT, e.g. 256 for 4x finer velocity resolution
+CPI_HOP = None          # new chirps between RD updates, e.g. 32 for two updates per burst
+
+# Clutter suppression along slow time (see clutter.py)
+CLUTTER_METHOD = 'mean' # 'none', 'mean', 'mti2', 'mti3', 'hpf' or 'background'
+CLUTTER_CUTOFF_MS = 0.5 # 'hpf': velocity cutoff
+CLUTTER_ALPHA = 0.1     # 'background': forgetting factor per burst
+RD_BACKGROUND = None    # adaptive RD clutter map gating CFAR hits: None, 'subtract' or 'mask'
+RD_BACKGROUND_ALPHA = 0.05  # forgetting factor per CPI (memory of about 1/alpha CPIs)
 
 
 # Radar configuration
 CHIRP_BW = 300e6              # Hz (bandwidth)
-C = 3e8                       # Speed of light in m/s
 frequency = 10e9              # Hz (center frequency)
-wavelength = C / frequency    # m
 
 # Array parameters
-d = 2  # spacing between antennas in wavelengths 
-
-# Derived timing for windowing
-ramp_s = ramp_time_us * 1e-6
-SLOPE = CHIRP_BW / ramp_s     # Hz/s
-begin_offset_s = 0.1 * ramp_s
-valid_window_s = ramp_s - begin_offset_s
-good_ramp_samples = int(valid_window_s * sample_rate)-1
-
-range_fft_size = good_ramp_samples * RANGE_PAD_FACTOR
-doppler_fft_size = num_chirps * DOPPLER_PAD_FACTOR
-
-# Calculate range axis with zero-padding
-beat_freqs = np.fft.fftfreq(range_fft_size, 1/sample_rate)[:range_fft_size//2]
-ranges_m = beat_freqs * C / (2 * SLOPE)
-
-# Calculate velocity axis with zero-padding
-T_obs = num_chirps * ramp_s
-doppler_freqs = np.fft.fftshift(np.fft.fftfreq(doppler_fft_size, ramp_s))
-velocities_ms = doppler_freqs * wavelength / 2  # m/s
-
-# step between burst starts (half-sample corrected)
-step = int(np.floor(ramp_s * sample_rate))
-
-# compute index matrix
-n      = np.arange(num_chirps)
-starts = (begin_offset_s * sample_rate + n * step).astype(int)
-cols   = np.arange(good_ramp_samples)
-idx    = starts[:, None] + cols[None, :]
-
-# Low-pass filter design (optional)
-nyq = sample_rate / 2
-b_lpf, a_lpf = butter(4, 100e3/nyq, btype='low')
-def apply_lpf(x): return lfilter(b_lpf, a_lpf, x)
-
-# High-pass filter for clutter cancellation
-# Cut-off frequency: about 0.1 normalized frequency (adjust as needed)
-# This will suppress targets with very low Doppler frequencies
-b_hpf, a_hpf = butter(4, 0.25, btype='high')
-def apply_clutter_cancellation(data):
-    """Apply high-pass filter along slow-time (Doppler) dimension"""
-    #return lfilter(b_hpf, a_hpf, data, axis=0)
-    return data-np.mean(data, axis=0)
-
-# ZeroMQ pull socket
-ctx  = zmq.Context()
-pull = ctx.socket(zmq.PULL)
-pull.connect('tcp://phaser.local:5555')
+d = 2  # spacing between antennas in wavelengths
+ANGLE_METHOD = 'phase'  # 'phase', 'bartlett', 'capon' or 'music' (see angle_estimation.py)
+
+config = RadarConfig(
+    num_chirps=num_chirps,
+    ramp_time_us=ramp_time_us,
+    sample_rate=sample_rate,
+    chirp_bw=CHIRP_BW,
+    center_freq=frequency,
+    range_pad_factor=RANGE_PAD_FACTOR,
+    doppler_pad_factor=DOPPLER_PAD_FACTOR,
+    cpi_chirps=CPI_CHIRPS,
+    cpi_hop=CPI_HOP,
+    clutter_method=CLUTTER_METHOD,
+    clutter_cutoff_ms=CLUTTER_CUTOFF_MS,
+    clutter_alpha=CLUTTER_ALPHA,
+    rd_background=RD_BACKGROUND,
+    rd_background_alpha=RD_BACKGROUND_ALPHA,
+    element_spacing=d,
+    angle_method=ANGLE_METHOD,
+    fft_backend=FFT_BACKEND,
+    fft_workers=FFT_WORKERS,
+    fft_wisdom_path=FFT_WISDOM_PATH,
+)
+processor = RadarProcessor(config)
+ranges_m = processor.ranges_m
+velocities_ms = processor.velocities_ms
+
+# ZeroMQ receiver thread with a bounded frame ring buffer
+RX_ADDRESS = 'tcp://phaser.local:5555'
+RX_BUFFER_SLOTS = 4            # frames queued between receiver and GUI
+RX_OVERFLOW_POLICY = DROP_OLDEST
+RX_WAIT_S = 0.005              # max time update() waits for a frame
+
+# Runtime instrumentation (per-stage latency, frame rate, queue depth, drops)
+PERF_OVERLAY = False           # show the overlay at start (toggled with the "Perf Overlay" button)
+PERF_OVERLAY_FPS = 2           # overlay text refreshes per second
+METRICS_FILE = None            # e.g. 'radar_metrics.jsonl': one JSON snapshot appended per interval
+METRICS_INTERVAL_S = 10.0
+METRICS_PORT = None            # e.g. 9108: Prometheus text format at http://127.0.0.1:9108/metrics
+metrics = Metrics(['rx_recv', 'rx_copy', 'rx_pop', 'dsp', 'micro_doppler', 'tracking',
+                   'draw_tracks', 'draw_rd', 'frame'])
+metrics_server = MetricsServer(metrics, METRICS_PORT).start() if METRICS_PORT else None
+
+receiver = FrameReceiver(RX_ADDRESS, num_slots=RX_BUFFER_SLOTS, policy=RX_OVERFLOW_POLICY,
+                         metrics=metrics).start()
+raw = None  # frame buffer reused across updates
 
 # PyQtGraph setup
 app = QtWidgets.QApplication([])
 win = pg.GraphicsLayoutWidget(show=True, title="Radar Processing")
-win.resize(1200, 600)  # Make window wider for two plots
+win.resize(1200, 900)  # Wide for two plots, tall for the micro-Doppler spectrogram
 
 # Range-Doppler plot (left)
 rd_plot = win.addPlot(row=0, col=0, title="Range-Doppler Map")
@@ -113,65 +139,22 @@ MAX_TRACK_AGE = 100.0  # seconds before considering track as old
 SMOOTHING_WINDOW = 5  # Number of points for moving average
 SPATIAL_THRESHOLD = 2.0  # meters, threshold for spatial distance
 TIME_THRESHOLD = 2.0  # seconds, threshold for temporal distance
+MAX_TRACKS = 64  # Track slots, the stalest track is replaced when full
+TRACKER_MODE = 'nn'  # 'nn' (nearest neighbour + moving average) or 'kalman' (constant-velocity EKF)
+
+tracker = make_tracker(TRACKER_MODE, max_tracks=MAX_TRACKS, max_history=MAX_HISTORY,
+                       max_track_age=MAX_TRACK_AGE, spatial_threshold=SPATIAL_THRESHOLD,
+                       time_threshold=TIME_THRESHOLD)
 
 # Create legend area for track information
 legend_text = pg.TextItem(anchor=(0, 1))  # Anchor to top-right
 ra_plot.addItem(legend_text)
 legend_text.setPos(ranges_m[-100], 80)  # Position at top-right of plot
 
-# List of tracks, each track is a list of [range, angle, velocity, timestamp] pairs
-tracks = [[]]  # Start with one empty track
-track_lines = []  # List to store PlotDataItem for each track
-track_colors = []  # Store fixed colors for each track
-next_track_id = 0  # Global track ID counter
-
-# Color generation for tracks
-def generate_track_color(track_id):
-    """Generate distinct colors for different tracks using golden ratio"""
-    golden_ratio = 0.618033988749895
-    hue = (track_id * golden_ratio) % 1.0
-    rgb = colorsys.hsv_to_rgb(hue, 0.9, 0.9)
-    return [int(255*x) for x in rgb]
-
-def rgb_to_hex(rgb):
-    """Convert RGB values to hex color string"""
-    return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-
-# Create initial track line
-def create_track_line():
-    global next_track_id
-    color = generate_track_color(next_track_id)
-    next_track_id += 1
-    line = pg.PlotDataItem(pen=pg.mkPen(color, width=2), symbol='o', symbolSize=6)
-    ra_plot.addItem(line)
-    track_colors.append(color)
-    return line
-
-initial_line = create_track_line()
-track_lines.append(initial_line)
-
-def calculate_distance(point1, point2):
-    """Calculate spatial and temporal distances between two points in range-angle-time space"""
-    range1, angle1, _, time1 = point1  # Extract range, angle and timestamp
-    range2, angle2, _, time2 = point2
-    
-    # Convert angles to radians for distance calculation
-    angle1_rad = np.deg2rad(angle1)
-    angle2_rad = np.deg2rad(angle2)
-    
-    # Calculate x-y coordinates
-    x1 = range1 * np.cos(angle1_rad)
-    y1 = range1 * np.sin(angle1_rad)
-    x2 = range2 * np.cos(angle2_rad)
-    y2 = range2 * np.sin(angle2_rad)
-    
-    # Calculate spatial distance
-    spatial_dist = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-    
-    # Calculate temporal distance (in seconds)
-    time_dist = abs(time2 - time1)
-    
-    return spatial_dist, time_dist
+# Track lines and legend, redrawn only for tracks that changed
+LEGEND_INTERVAL_S = 0.5  # legend refresh period
+track_layer = TrackLayer(ra_plot, legend_text, smoothing_window=SMOOTHING_WINDOW,
+                         smooth=(TRACKER_MODE != 'kalman'), legend_interval_s=LEGEND_INTERVAL_S)
 
 # Create control panel
 control_proxy = QtWidgets.QGraphicsProxyWidget()
@@ -181,34 +164,31 @@ control_widget.setLayout(control_layout)
 
 # Add data acquisition control
 is_acquiring = False  # Global flag for acquisition state
-acquired_data = []    # List to store acquired data frames
+recorder = None       # StreamRecorder writing frames to disk while acquiring
+RECORDER_BUFFERS = 16 # frames queued for the writer thread before dropping
 
 def toggle_acquisition():
-    global is_acquiring
+    global is_acquiring, recorder
     is_acquiring = not is_acquiring
-    
+
     if is_acquiring:
-        # Start new acquisition
-        acquired_data.clear()
+        # Start new acquisition, streamed to disk by a background writer
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        recorder = StreamRecorder(
+            f"radar_data_{timestamp}",
+            frame_shape=(2, config.num_chirps, processor.good_ramp_samples),
+            metadata=config.to_dict(),
+            num_buffers=RECORDER_BUFFERS,
+        ).start()
         acq_toggle.setText("Stop Acquisition")
         acq_toggle.setStyleSheet("background-color: #ff6b6b")  # Red when recording
     else:
-        # Stop acquisition and save data
-        if acquired_data:
-            # Create timestamp for filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"radar_data_{timestamp}.npy"
-            
-            # Convert list of frames to numpy array
-            data_array = np.array(acquired_data)
-            
-            # Save the data
-            np.save(filename, data_array)
-            print(f"Saved {len(acquired_data)} frames to {filename}")
-            
-            # Clear the buffer
-            acquired_data.clear()
-        
+        # Stop acquisition and finalise the files
+        if recorder is not None:
+            recorder.close()
+            print(f"Saved {recorder.written} frames to {recorder.frames_path} ({recorder.dropped} dropped)")
+            recorder = None
+
         acq_toggle.setText("Start Acquisition")
         acq_toggle.setStyleSheet("")  # Reset button color
 
@@ -219,146 +199,22 @@ acq_toggle.setChecked(False)
 acq_toggle.clicked.connect(toggle_acquisition)
 control_layout.addWidget(acq_toggle)
 
+def toggle_perf_overlay(checked):
+    perf_text.setVisible(checked)
+    if checked:
+        perf_text.setText(metrics.overlay_text())
+
+perf_toggle = QtWidgets.QPushButton("Perf Overlay")
+perf_toggle.setCheckable(True)
+perf_toggle.setChecked(PERF_OVERLAY)
+perf_toggle.toggled.connect(toggle_perf_overlay)
+control_layout.addWidget(perf_toggle)
+
 # Add controls to plot
 win.nextRow()
 control_proxy.setWidget(control_widget)
 win.addItem(control_proxy, row=2, col=0, colspan=2)
 
-def smooth_track(track_array):
-    """Apply moving average smoothing to track data"""
-    if len(track_array) < SMOOTHING_WINDOW:
-        return track_array
-    
-    # Separate components
-    ranges = track_array[:, 0]
-    angles = track_array[:, 1]
-    velocities = track_array[:, 2]
-    timestamps = track_array[:, 3]
-    
-    # Apply moving average to each component
-    kernel = np.ones(SMOOTHING_WINDOW) / SMOOTHING_WINDOW
-    smooth_ranges = np.convolve(ranges, kernel, mode='valid')
-    smooth_angles = np.convolve(angles, kernel, mode='valid')
-    smooth_velocities = np.convolve(velocities, kernel, mode='valid')
-    
-    # Pad the smoothed data to match original length
-    pad_size = SMOOTHING_WINDOW - 1
-    smooth_ranges = np.pad(smooth_ranges, (pad_size, 0), mode='edge')
-    smooth_angles = np.pad(smooth_angles, (pad_size, 0), mode='edge')
-    smooth_velocities = np.pad(smooth_velocities, (pad_size, 0), mode='edge')
-    
-    return np.column_stack((smooth_ranges, smooth_angles, smooth_velocities, timestamps))
-
-def update_tracks(range_m, angle_deg, velocity_ms):
-    """Update tracks with new detection (range, angle, velocity)"""
-    global next_track_id
-
-    current_time = time.time()
-    new_point = [range_m, angle_deg, velocity_ms, current_time]
-    
-    # First, remove stale tracks
-    active_tracks = []
-    active_lines = []
-    active_colors = []
-    
-    for i, (track, line, color) in enumerate(zip(tracks, track_lines, track_colors)):
-        if track:  # Only check non-empty tracks
-            last_update_time = track[-1][3]
-            track_age = current_time - last_update_time
-            if track_age <= MAX_TRACK_AGE:
-                active_tracks.append(track)
-                active_lines.append(line)
-                active_colors.append(color)
-    
-    tracks[:] = active_tracks
-    track_lines[:] = active_lines
-    track_colors[:] = active_colors
-    
-    min_spatial_dist = float('inf')
-    best_track_idx = None
-
-    # Match detection to nearest active track (if any)
-    for i, track in enumerate(tracks):
-        if track:
-            last_point = track[-1]
-            spatial_dist, time_dist = calculate_distance(last_point, new_point)
-            if spatial_dist < SPATIAL_THRESHOLD and time_dist < TIME_THRESHOLD and spatial_dist < min_spatial_dist:
-                min_spatial_dist = spatial_dist
-                best_track_idx = i
-
-    if best_track_idx is not None:
-        # Append to matched track
-        tracks[best_track_idx].append(new_point)
-        if len(tracks[best_track_idx]) > MAX_HISTORY:
-            tracks[best_track_idx].pop(0)
-    else:
-        # Start new track
-        tracks.append([new_point])
-        new_line = create_track_line()
-        track_lines.append(new_line)
-        track_colors.append(generate_track_color(next_track_id - 1))
-
-def update_track_display():
-    """Update the display of all tracks"""
-    current_time = time.time()
-    
-    # First update track lines
-    active_tracks_info = []
-    for track, line, color in zip(tracks, track_lines, track_colors):
-        if track:  # If track has points
-            track_array = np.array(track)
-            
-            # Apply smoothing to track data
-            smoothed_track = smooth_track(track_array)
-            
-            # Calculate track statistics
-            track_age = current_time - smoothed_track[-1, 3]
-            avg_velocity = np.mean(np.abs(smoothed_track[:, 2]))
-            track_length = len(track)
-            
-            # Create color gradient based on velocity and age
-            alpha_values = np.linspace(0.2, 1.0, len(smoothed_track))
-            vel_colors = [pg.mkBrush(*color, int(a*255)) for a in alpha_values]
-            
-            # Update track with velocity-based coloring
-            line.setData(
-                x=smoothed_track[:, 0],
-                y=smoothed_track[:, 1],
-                pen=pg.mkPen(color, width=2),
-                symbolPen=None,
-                symbolBrush=vel_colors,
-                symbolSize=6
-            )
-            
-            # Store track info for legend
-            active_tracks_info.append({
-                'id': tracks.index(track) + 1,
-                'color': color,
-                'range': smoothed_track[-1, 0],
-                'angle': smoothed_track[-1, 1],
-                'velocity': avg_velocity,
-                'age': track_age,
-                'points': track_length
-            })
-    
-    # Update legend text
-    if active_tracks_info:
-        legend_html = '<div style="background-color: rgba(0, 0, 0, 0.7); padding: 10px; border-radius: 5px;">'
-        for track in active_tracks_info:
-            color_hex = rgb_to_hex(track['color'])
-            legend_html += (
-                f'<div style="color: {color_hex}; margin-bottom: 5px;">'
-                f'Track {track["id"]}: '
-                f'R={track["range"]:.1f}m, '
-                f'θ={track["angle"]:.1f}°, '
-                f'v={track["velocity"]:.1f}m/s'
-                f'</div>'
-            )
-        legend_html += '</div>'
-        legend_text.setHtml(legend_html)
-    else:
-        legend_text.setHtml('')
-
 # Items for Range-Doppler plot
 img_item = pg.ImageItem()
 rd_plot.addItem(img_item)
@@ -374,170 +230,199 @@ text_item = pg.TextItem(text='', color='y', anchor=(0, 1))
 rd_plot.addItem(text_item)
 text_item.setPos(ranges_m[-50], velocities_ms[-20])
 
+# Performance overlay (top-left of the RD plot)
+perf_text = pg.TextItem(text='', color='c', anchor=(0, 0), fill=pg.mkBrush(0, 0, 0, 160))
+rd_plot.addItem(perf_text)
+perf_text.setZValue(10)
+perf_text.setPos(ranges_m[0], velocities_ms[-1])
+perf_text.setVisible(PERF_OVERLAY)
+overlay_limiter = RateLimiter(PERF_OVERLAY_FPS)
+dump_limiter = RateLimiter(1.0 / METRICS_INTERVAL_S)
+
 # Color map
 lut = pg.colormap.get('inferno').getLookupTable(0.0, 1.0, 256)
 img_item.setLookupTable(lut)
 img_item.setLevels([-50, 0])
 
+# RD image drawn from preallocated buffers, redrawn at a capped rate
+DISPLAY_MAX_FPS = 20     # plot updates per second (0 = every processed frame)
+heatmap = RDHeatmap(img_item)
+heatmap.set_axes(ranges_m, velocities_ms)
+display_limiter = RateLimiter(DISPLAY_MAX_FPS)
+
+# Micro-Doppler spectrogram of the strongest target (bottom), one column per burst
+MICRO_DOPPLER = True
+MD_HISTORY = 256          # bursts shown in the scrolling spectrogram
+MD_RANGE_HALF_WIDTH = 10  # ±range bins averaged around the target (r_win in RadarReplayGUI.m)
+MD_ALPHA = 0.7            # smoothing of the followed range bin (alpha_idx in RadarReplayGUI.m)
+micro_doppler = None
+if MICRO_DOPPLER:
+    md_plot = win.addPlot(row=1, col=0, colspan=2, title="Micro-Doppler")
+    md_plot.setLabel('bottom', 'Bursts')
+    md_plot.setLabel('left', 'Velocity (m/s)')
+    md_img = pg.ImageItem()
+    md_plot.addItem(md_img)
+    md_img.setLookupTable(lut)
+    md_img.setLevels([0, 40])  # dB above the median noise floor
+
+def make_micro_doppler():
+    """Spectrogram state for the current radar parameters"""
+    if not MICRO_DOPPLER:
+        return None
+    md = MicroDoppler(config.num_chirps, len(ranges_m), config.ramp_s, config.wavelength,
+                      history=MD_HISTORY, pad_factor=config.doppler_pad_factor,
+                      r_win=MD_RANGE_HALF_WIDTH, alpha_idx=MD_ALPHA)
+    v = md.velocities_ms
+    md_img.setRect(pg.QtCore.QRectF(-MD_HISTORY, v[0], MD_HISTORY, v[-1] - v[0]))
+    return md
+
+micro_doppler = make_micro_doppler()
+
 # Timer
 timer = QtCore.QTimer()
 
-# Window functions
-range_window = np.hanning(good_ramp_samples)
-doppler_window = np.hanning(num_chirps)
-
-def detect_strongest_scatterer(bursts_ch1, bursts_ch2):
-    """
-    Process both channels and detect the strongest scatterer's angle
-    Returns: angle in degrees, RD1, RD2, peak_range_idx, peak_velocity_idx
-    """
-    # Apply range window
-    bursts_ch1 =apply_clutter_cancellation(bursts_ch1)
-    bursts_ch2 =apply_clutter_cancellation(bursts_ch2)
-
-    bursts_ch1_windowed =  bursts_ch1 * range_window[None, :]
-    bursts_ch2_windowed =  bursts_ch2 * range_window[None, :]
-    
-    # Range FFT with zero-padding for both channels
-    R1 = np.fft.fft(bursts_ch1_windowed, n=range_fft_size, axis=1)
-    R1 = R1[:, :range_fft_size//2]
-    R2 = np.fft.fft(bursts_ch2_windowed, n=range_fft_size, axis=1)
-    R2 = R2[:, :range_fft_size//2]
-
-    
-    # Apply Doppler window
-    R1_windowed = R1 * doppler_window[:, None]
-    R2_windowed = R2 * doppler_window[:, None]
-    
-    # Doppler FFT with zero-padding for both channels
-    RD1 = np.fft.fftshift(np.fft.fft(R1_windowed, n=doppler_fft_size, axis=0), axes=0)
-    RD2 = np.fft.fftshift(np.fft.fft(R2_windowed, n=doppler_fft_size, axis=0), axes=0)
-    
-    # Average magnitude to find strongest scatterer
-    mag1 = np.abs(RD1)
-    mag2 = np.abs(RD2)
-    mag_avg = (mag1 + mag2) / 2
-    
-    # Mask out the zero-Doppler region (additional clutter suppression)
-    center_doppler = doppler_fft_size // 2
-    mask_width = 2 * DOPPLER_PAD_FACTOR  # Adjust mask width for zero-padding
-    #mag_avg[center_doppler-mask_width:center_doppler+mask_width+1, :] *= 0.1
-    #mag_avg[:, :20] = 0
-    #mag_avg[:, 85:] = 0
-    #RD1[:, :20] = 0
-    #RD1[:, 85:] = 0
-
-    ## Threshold detector ##
-
-    # Parameters
-    guard_cells_range = 4
-    guard_cells_doppler = 4
-    training_cells_range = 8
-    training_cells_doppler = 8
-    threshold_factor = 2.5
-    
-    # Total kernel size
-    kr = training_cells_range + guard_cells_range
-    kd = training_cells_doppler + guard_cells_doppler
-    kernel_size = (2*kd + 1, 2*kr + 1)
-    
-    # Build kernel: ones everywhere except guard + cell-under-test (central region)
-    kernel = np.ones(kernel_size, dtype=np.float32)
-    kernel[kd - guard_cells_doppler : kd + guard_cells_doppler + 1,
-        kr - guard_cells_range : kr + guard_cells_range + 1] = 0
-    
-    # Count of training cells
-    n_training = np.sum(kernel)
-    
-    # Convolve with kernel to get local sums
-    local_sum = convolve2d(mag_avg, kernel, mode='same', boundary='symm')
-    noise_map = local_sum / n_training
-    
-    # Apply threshold (only where valid)
-    valid_mask = np.zeros_like(mag_avg, dtype=bool)
-    valid_mask[kd:-kd, kr:-kr] = True
-    detections = (mag_avg > threshold_factor * noise_map) & valid_mask
-    
-    # Keep only values that pass threshold
-    detection_map = np.zeros_like(mag_avg)
-    detection_map[detections] = mag_avg[detections]
-    
-    # Find the strongest detection
-    peak_velocity_idx, peak_range_idx = np.unravel_index(np.argmax(detection_map), detection_map.shape)
-    
-    # Extract phases at the strongest point
-    spanWindow = 2
-    phase1 = np.angle(RD1[peak_velocity_idx-spanWindow:peak_velocity_idx+spanWindow, peak_range_idx-spanWindow:peak_range_idx+spanWindow])
-    phase2 = np.angle(RD2[peak_velocity_idx-spanWindow:peak_velocity_idx+spanWindow, peak_range_idx-spanWindow:peak_range_idx+spanWindow])
-    
-    # Calculate phase difference
-    phase_diff = np.median(phase2 - phase1)
-    phase_diff = np.mod(phase_diff + np.pi, 2 * np.pi) - np.pi
-    
-    # Convert phase difference to angle
-    angle_rad = np.arcsin(phase_diff / (2 * np.pi * d))
-    angle_deg = np.degrees(angle_rad)
-    
-    return angle_deg, RD1, RD2, peak_range_idx, peak_velocity_idx
+def apply_header(header):
+    """Rebuild the processor and axes when the sender's radar parameters change"""
+    global config, processor, ranges_m, velocities_ms, is_acquiring, micro_doppler
+    if header is None:
+        return
+    params = header.radar_params()
+    if all(getattr(config, k) == v for k, v in params.items()):
+        return
 
-def update():
-    # receive raw IQ
-    msg = pull.recv()
-    
-    raw = np.frombuffer(msg, dtype=np.complex64).reshape(2, -1)
+    # A running recording has the old frame shape, finish it first
+    if is_acquiring:
+        acq_toggle.setChecked(False)
+        toggle_acquisition()
+
+    config = replace(config, **params)
+    processor = RadarProcessor(config)
+    ranges_m = processor.ranges_m
+    velocities_ms = processor.velocities_ms
+    rd_plot.setXRange(0, ranges_m[-1])
+    ra_plot.setXRange(0, ranges_m[-1])
+    legend_text.setPos(ranges_m[-100], 80)
+    text_item.setPos(ranges_m[-50], velocities_ms[-20])
+    perf_text.setPos(ranges_m[0], velocities_ms[-1])
+    heatmap.set_axes(ranges_m, velocities_ms)
+    micro_doppler = make_micro_doppler()
+    print(f"Radar parameters from sender: {params}")
+
+gaps_seen = 0  # frames dropped or lost when the slow-time buffer was last checked
+
+def publish_metrics(header):
+    """Receiver gauges, then the overlay and the metrics file when due"""
+    metrics.set('queue_depth', receiver.depth)
+    metrics.set('dropped', receiver.dropped)
+    metrics.set('lost', receiver.lost)
+    if processor.rd_background is not None:
+        metrics.set('clutter_suppressed', processor.rd_background.suppressed)
+    if header is not None and header.timestamp_ns:
+        # Capture-to-display latency; only meaningful with synchronised clocks
+        metrics.set('frame_age_ms', (time.time_ns() - header.timestamp_ns) / 1e6)
+    if perf_toggle.isChecked() and overlay_limiter.ready():
+        perf_text.setText(metrics.overlay_text())
+    if METRICS_FILE and dump_limiter.ready():
+        metrics.dump(METRICS_FILE)
 
-    # slice each chirp for both channels
-    bursts_ch1 = raw[0][idx]
-    bursts_ch2 = raw[1][idx]
+def update():
+    global raw
+
+    # take the oldest queued frame (the receiver thread owns the socket)
+    t0 = time.perf_counter()
+    frame = receiver.pop(out=raw, timeout=RX_WAIT_S)
+    if frame is None:
+        return
+    t = metrics.record('rx_pop', t0)
+    raw = frame
+    apply_header(receiver.header)
+
+    process_frame(t)
+    metrics.record('frame', t0)
+    metrics.frame()
+    publish_metrics(receiver.header)
+
+def process_frame(t):
+    """Process, track and (when due) draw the frame in `raw`; stage times go to `metrics` from stamp t"""
+    global gaps_seen
+
+    # slice each chirp for both channels (unless the Pi already did)
+    header = receiver.header
+    if header is not None and header.sliced:
+        bursts = raw
+    else:
+        bursts = processor.slice_chirps(raw)
 
     # Store raw data if acquiring
     if is_acquiring:
         # Store only the sliced data for each channel
-        frame_data = np.stack([bursts_ch1, bursts_ch2])
-        acquired_data.append(frame_data)
-
-    
-    # optional LPF for both channels
-    #bursts_ch1 = apply_lpf(bursts_ch1)
-    #bursts_ch2 = apply_lpf(bursts_ch2)
-    
-    # Detect strongest scatterer and its angle
-    angle_deg, RD1, RD2, peak_range_idx, peak_velocity_idx = detect_strongest_scatterer(bursts_ch1, bursts_ch2)
-    
-    # Get range and velocity of detection
-    range_m = ranges_m[peak_range_idx]
-    velocity_ms = velocities_ms[peak_velocity_idx]
-    
-    # Update tracks with new detection
-    update_tracks(range_m, angle_deg, velocity_ms)
-    update_track_display()
-    
+        recorder.write(bursts)
+
+    # Detect all targets and their angles
+    if processor.stateful:
+        # A missing frame breaks the slow-time continuity of the CPI window and clutter filter
+        gaps = receiver.dropped + receiver.lost
+        if gaps != gaps_seen:
+            gaps_seen = gaps
+            processor.reset_slow_time()
+    if processor.sliding:
+        cpi_detections, RD = processor.process_sliding(bursts)
+    else:
+        detections, RD = processor.process_bursts(bursts)
+        cpi_detections = [detections]
+    t = metrics.record('dsp', t)
+
+    # Micro-Doppler column from this burst's range FFT, following the strongest target
+    if micro_doppler is not None:
+        latest = cpi_detections[-1] if cpi_detections else ()
+        range_idx = int(latest['range_idx'][0]) if len(latest) else None
+        micro_doppler.update(processor.last_range_profiles, range_idx)
+        t = metrics.record('micro_doppler', t)
+
+    if RD is None:
+        return  # sliding CPI: slow-time buffer still filling
+
+    # Update tracks with new detections (every CPI, in order)
+    for detections in cpi_detections:
+        tracker.update_detections(detections)
+    t = metrics.record('tracking', t)
+
+    # Everything below only draws; skip it until the next display slot
+    if not display_limiter.ready():
+        return
+    track_layer.update(tracker)
+    t = metrics.record('draw_tracks', t)
+
     # Display RD map (using channel 1)
-    RD = RD1
-    RD = RD / np.max(np.abs(RD))
-    rd_db = 20 * np.log10(np.abs(RD) + 1e-12)
-    
-    # update image with proper scaling
-    img_item.setImage(rd_db.T, autoLevels=False)
-    
-    # Update the scale of the plot
-    img_item.setRect(pg.QtCore.QRectF(
-        ranges_m[0],                    # xmin
-        velocities_ms[0],               # ymin
-        ranges_m[-1] - ranges_m[0],     # width
-        velocities_ms[-1] - velocities_ms[0]  # height
-    ))
-    
-    # Update RD marker position
-    scatter.setData([range_m], [velocity_ms])
-    
-    # Update detection info text
-    info_text = f"Range: {range_m:.1f} m\nVelocity: {velocity_ms:.1f} m/s\nAngle: {angle_deg:.1f}°"
+    heatmap.update(RD[0])
+    if micro_doppler is not None:
+        md_img.setImage(micro_doppler.image(), autoLevels=False)
+    metrics.record('draw_rd', t)
+
+    # Update RD markers and range-angle detections
+    scatter.setData(detections['range_m'], detections['velocity_ms'])
+    ra_scatter.setData(detections['range_m'], detections['angle'])
+
+    if len(detections) == 0:
+        text_item.setText('')
+        return
+
+    # Update detection info text (strongest target)
+    det = detections[0]
+    info_text = (f"Targets: {len(detections)}\nRange: {det['range_m']:.1f} m\n"
+                 f"Velocity: {det['velocity_ms']:.1f} m/s\nAngle: {det['angle']:.1f}°")
     text_item.setText(info_text)
 
 timer.timeout.connect(update)
 timer.start(0)
 
 app.exec()
-pull.close()
-ctx.term()
\ No newline at end of file
+if recorder is not None:
+    recorder.close()
+receiver.stop()
+if metrics_server is not None:
+    metrics_server.stop()
+if METRICS_FILE:
+    metrics.dump(METRICS_FILE)
+print(f"Frames received: {receiver.received}, processed: {receiver.processed}, "
+      f"dropped: {receiver.dropped}, lost in transit: {receiver.lost}")
\ No newline at end of file
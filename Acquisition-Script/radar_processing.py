@@ -0,0 +1,448 @@
+from dataclasses import dataclass, asdict
+import numpy as np
+from scipy.signal import butter, lfilter
+from fft_backend import make_fft_backend
+from cfar import CFAR
+from clutter import STATEFUL_CLUTTER_METHODS, ClutterFilter, RDBackgroundMap
+from target_extraction import TARGET_DTYPE, extract_targets
+from angle_estimation import AngleEstimator
+from wire_protocol import BEGIN_OFFSET_FRAC, good_ramp_samples
+
+"""
+radar_processing.py
+-------------------
+Headless FMCW processing engine shared by the GUIs and offline tools.
+
+Everything that depends only on the radar configuration (chirp index matrix,
+windows, range/velocity axes, CFAR kernel) is computed once when the
+processor is built. `RadarProcessor.process()` then turns one raw
+`[2, total_samples]` frame into detections and range–Doppler maps without
+touching Qt or ZeroMQ, so it can be used for batch reprocessing, profiling
+and on machines without a display.
+
+By default every burst of `num_chirps` chirps is one coherent processing
+interval (CPI). With `cpi_chirps` / `cpi_hop` set, the processor keeps a
+slow-time ring buffer of range profiles across bursts instead: each new
+chirp is range-FFT'd once when it arrives, and the Doppler FFT runs over the
+last `cpi_chirps` chirps every `cpi_hop` new chirps. A longer window gives a
+finer velocity resolution, a hop shorter than a burst gives several RD maps
+per burst. The window assumes consecutive bursts are contiguous in slow
+time; call `reset_slow_time()` after frames were lost.
+
+Clutter suppression (`clutter_method`, see clutter.py) and the range window
+are applied in one pass while writing the range FFT input. The default
+'mean' is the original per-burst mean subtraction; the MTI, high-pass and
+background filters carry slow-time state across bursts, which
+`reset_slow_time()` clears as well. Optionally (`rd_background`), an
+adaptive per-cell background of the RD magnitude, learnt across CPIs, is
+used to drop CFAR hits on persistent clutter; it is cleared by
+`reset_slow_time()` too. A processor with any of this state (`stateful`)
+must see the frames in order, one processor per contiguous stream.
+"""
+
+C = 3e8  # Speed of light in m/s
+
+# Per-detection record returned by RadarProcessor.process()
+DETECTION_DTYPE = np.dtype(TARGET_DTYPE.descr + [
+    ('range_m', np.float64),
+    ('velocity_ms', np.float64),
+])
+
+
+@dataclass
+class RadarConfig:
+    """Radar, FFT and detector parameters for RadarProcessor"""
+    # Radar parameters
+    num_chirps: int = 64
+    ramp_time_us: float = 500          # µs
+    sample_rate: float = 0.6e6         # Hz
+    chirp_bw: float = 300e6            # Hz
+    center_freq: float = 10e9          # Hz
+    begin_offset_frac: float = BEGIN_OFFSET_FRAC  # fraction of the ramp skipped for linearity
+    ramp_samples: int = None           # samples per chirp when chirps are sliced on the Pi
+                                       # (overrides begin_offset_frac), see wire_protocol.py
+
+    # FFT parameters
+    range_pad_factor: int = 2          # zero-padding for range FFT
+    doppler_pad_factor: int = 2        # zero-padding for Doppler FFT
+
+    # Clutter suppression along slow time (see clutter.py)
+    clutter_method: str = 'mean'       # 'none', 'mean', 'mti2', 'mti3', 'hpf' or 'background'
+    clutter_cutoff_ms: float = 0.5     # 'hpf': velocity below which returns are suppressed
+    clutter_hpf_order: int = 2         # 'hpf': Butterworth order
+    clutter_alpha: float = 0.1         # 'background': forgetting factor per burst
+    rd_background: str = None          # RD clutter map gating CFAR hits: None, 'subtract' or 'mask'
+    rd_background_alpha: float = 0.05  # forgetting factor per CPI
+    rd_background_k: float = 3.0       # 'mask': hits must exceed the cell mean + k * std
+    rd_background_warmup: int = 20     # CPIs learnt before the map is applied
+
+    # Sliding CPI (None: every burst is processed as one CPI)
+    cpi_chirps: int = None             # chirps in the Doppler FFT window, may span several bursts
+    cpi_hop: int = None                # new chirps between successive CPIs (default num_chirps)
+
+    # Array parameters
+    element_spacing: float = 2         # spacing between antennas in wavelengths
+
+    # CFAR parameters
+    guard_cells_range: int = 4
+    guard_cells_doppler: int = 4
+    training_cells_range: int = 8
+    training_cells_doppler: int = 8
+    threshold_factor: float = 2.5
+    cfar_method: str = 'ca'            # 'ca', 'go', 'so' or 'os', see cfar.py
+    cfar_os_rank: int = None           # OS-CFAR order statistic (default 3/4 of training cells)
+    cfar_os_prescreen: float = 0.5     # OS-CFAR only tests cells above this fraction of the CA threshold
+                                       # (0: full rank filter, exact but ~300 ms per map, offline only)
+
+    # Target extraction (see target_extraction.py)
+    max_targets: int = 10
+    area_min: int = 1                  # minimum 8-connected region size in cells
+    min_snr_db: float = None           # SNR check of the max_targets strongest peaks (None: off),
+                                       # 10 dB in extract_targets.m
+    blank_width: int = 10              # ±cells around a peak with no stronger peak
+
+    # Angle estimation (see angle_estimation.py)
+    phase_span: int = 2                # half-size of the phase patch around a peak
+    angle_method: str = 'phase'        # 'phase', 'bartlett', 'capon' or 'music'
+    scan_angle_deg: float = 0.0        # analog steering of the sub-arrays, resolves the ambiguity
+    angle_grid_size: int = 256         # sinθ grid of the spectral estimators
+
+    # FFT backend ('numpy', 'scipy', 'pyfftw' or 'auto', see fft_backend.py)
+    fft_backend: str = 'numpy'
+    fft_workers: int = 1
+    fft_wisdom_path: str = None
+
+    # ─── Derived quantities ──────────────────────────────────────
+    @property
+    def ramp_s(self):
+        return self.ramp_time_us * 1e-6
+
+    @property
+    def slope(self):
+        return self.chirp_bw / self.ramp_s
+
+    @property
+    def wavelength(self):
+        return C / self.center_freq
+
+    @property
+    def begin_offset_s(self):
+        return self.begin_offset_frac * self.ramp_s
+
+    @property
+    def good_ramp_samples(self):
+        if self.ramp_samples:
+            return self.ramp_samples
+        return good_ramp_samples(self.ramp_s, self.sample_rate, self.begin_offset_frac)
+
+    @property
+    def range_fft_size(self):
+        return self.good_ramp_samples * self.range_pad_factor
+
+    @property
+    def cpi_length(self):
+        return self.cpi_chirps or self.num_chirps
+
+    @property
+    def cpi_hop_chirps(self):
+        return self.cpi_hop or self.num_chirps
+
+    @property
+    def sliding_cpi(self):
+        return self.cpi_length != self.num_chirps or self.cpi_hop_chirps != self.num_chirps
+
+    @property
+    def doppler_fft_size(self):
+        return self.cpi_length * self.doppler_pad_factor
+
+    @property
+    def stateful(self):
+        """Detections depend on earlier frames (sliding CPI, clutter filter or RD background state)"""
+        return self.sliding_cpi or self.clutter_method in STATEFUL_CLUTTER_METHODS or bool(self.rd_background)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def apply_clutter_cancellation(data):
+    """Remove the static (zero-Doppler) component along the slow-time axis"""
+    return data - np.mean(data, axis=-2, keepdims=True)
+
+
+class RadarProcessor:
+    """Range–Doppler, CFAR and phase-difference angle estimation for one radar frame"""
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else RadarConfig()
+        cfg = self.config
+
+        self.good_ramp_samples = cfg.good_ramp_samples
+        self.range_fft_size = cfg.range_fft_size
+        self.doppler_fft_size = cfg.doppler_fft_size
+
+        # Range axis with zero-padding
+        beat_freqs = np.fft.fftfreq(self.range_fft_size, 1/cfg.sample_rate)[:self.range_fft_size//2]
+        self.ranges_m = beat_freqs * C / (2 * cfg.slope)
+
+        # Velocity axis with zero-padding
+        doppler_freqs = np.fft.fftshift(np.fft.fftfreq(self.doppler_fft_size, cfg.ramp_s))
+        self.velocities_ms = doppler_freqs * cfg.wavelength / 2
+
+        # Chirp index matrix: step between burst starts, then one row per chirp
+        step = int(np.floor(cfg.ramp_s * cfg.sample_rate))
+        n = np.arange(cfg.num_chirps)
+        starts = (cfg.begin_offset_s * cfg.sample_rate + n * step).astype(int)
+        cols = np.arange(self.good_ramp_samples)
+        self.idx = starts[:, None] + cols[None, :]
+
+        # Window functions
+        self.range_window = np.hanning(self.good_ramp_samples).astype(np.float32)
+        self.doppler_window = np.hanning(cfg.cpi_length).astype(np.float32)
+
+        # For an even Doppler FFT size, fftshift(FFT(x)) == FFT(x * (-1)^n), so the
+        # shift is folded into the slow-time window instead of copying the output
+        self._shift_in_window = self.doppler_fft_size % 2 == 0
+        self._doppler_window_col = self.doppler_window[:, None].copy()
+        if self._shift_in_window:
+            self._doppler_window_col[1::2] *= -1
+
+        # Clutter filter fused with the range window
+        self.clutter = ClutterFilter(
+            cfg.clutter_method,
+            (2, cfg.num_chirps, self.good_ramp_samples),
+            self.range_window,
+            chirp_period_s=cfg.ramp_s,
+            wavelength=cfg.wavelength,
+            cutoff_ms=cfg.clutter_cutoff_ms,
+            hpf_order=cfg.clutter_hpf_order,
+            alpha=cfg.clutter_alpha,
+        )
+
+        # FFT plans and buffers for both channels at once
+        self.fft = make_fft_backend(
+            cfg.fft_backend,
+            (2, cfg.num_chirps, self.range_fft_size),
+            (2, self.doppler_fft_size, self.range_fft_size//2),
+            workers=cfg.fft_workers,
+            wisdom_path=cfg.fft_wisdom_path,
+        )
+
+        # Sliding CPI: ring buffer of range profiles [2, cpi_length, range bins]
+        self.sliding = cfg.sliding_cpi
+        self.cpi_length = cfg.cpi_length
+        self.cpi_hop = cfg.cpi_hop_chirps
+        if self.sliding:
+            self._slow_time = np.zeros((2, self.cpi_length, self.range_fft_size//2),
+                                       dtype=self.fft.range_output.dtype)
+        self.last_range_profiles = None   # range FFT of the latest burst (e.g. for micro_doppler.py)
+
+        # Low-pass filter design (optional)
+        nyq = cfg.sample_rate / 2
+        self.b_lpf, self.a_lpf = butter(4, 100e3/nyq, btype='low')
+
+        # CFAR detector and magnitude buffers for the RD map
+        rd_shape = (self.doppler_fft_size, self.range_fft_size//2)
+        self.cfar_detector = CFAR(
+            rd_shape,
+            guard_cells_range=cfg.guard_cells_range,
+            guard_cells_doppler=cfg.guard_cells_doppler,
+            training_cells_range=cfg.training_cells_range,
+            training_cells_doppler=cfg.training_cells_doppler,
+            threshold_factor=cfg.threshold_factor,
+            method=cfg.cfar_method,
+            os_rank=cfg.cfar_os_rank,
+            os_prescreen=cfg.cfar_os_prescreen,
+        )
+        self._mag = np.empty(rd_shape, dtype=np.float32)
+        self._mag_tmp = np.empty(rd_shape, dtype=np.float32)
+
+        # Adaptive RD background map (None: CFAR only)
+        self.rd_background = None
+        if cfg.rd_background:
+            self.rd_background = RDBackgroundMap(
+                rd_shape,
+                mode=cfg.rd_background,
+                alpha=cfg.rd_background_alpha,
+                k_sigma=cfg.rd_background_k,
+                warmup=cfg.rd_background_warmup,
+            )
+        self.stateful = cfg.stateful   # needs reset_slow_time() after gaps
+        self.reset_slow_time()
+
+        # Angle estimator (None: median phase difference in target_extraction.py)
+        self.angle_estimator = None
+        if cfg.angle_method != 'phase' or cfg.scan_angle_deg:
+            self.angle_estimator = AngleEstimator(
+                cfg.angle_method,
+                element_spacing=cfg.element_spacing,
+                grid_size=cfg.angle_grid_size,
+                scan_angle_deg=cfg.scan_angle_deg,
+            )
+
+    def apply_lpf(self, x):
+        return lfilter(self.b_lpf, self.a_lpf, x)
+
+    def slice_chirps(self, raw):
+        """Slice a raw [2, total_samples] frame into [2, num_chirps, good_ramp_samples]"""
+        return raw[:, self.idx]
+
+    def range_profiles(self, bursts):
+        """
+        Clutter cancellation, range window and range FFT of [2, num_chirps, good_ramp_samples] bursts
+        Returns: [2, num_chirps, range_fft_size//2], a view of the FFT backend's output buffer
+        """
+        # Clutter suppression and range window, written straight into the
+        # zero-padded range FFT input
+        self.clutter.apply(bursts, self.fft.range_input[..., :self.good_ramp_samples])
+
+        # Range FFT (positive beat frequencies only)
+        self.last_range_profiles = self.fft.execute_range()[..., :self.range_fft_size//2]
+        return self.last_range_profiles
+
+    def _execute_doppler(self):
+        RD = self.fft.execute_doppler()
+        if not self._shift_in_window:
+            RD = np.fft.fftshift(RD, axes=-2)
+        return RD
+
+    def range_doppler(self, bursts):
+        """
+        Clutter cancellation, windowing and range/Doppler FFTs for both channels
+        Returns: complex RD maps, shape [2, doppler_fft_size, range_fft_size//2].
+        The array is the FFT backend's output buffer and is reused by the next call.
+        """
+        R = self.range_profiles(bursts)
+
+        # Doppler window, then Doppler FFT with zero-padding
+        np.multiply(R, self._doppler_window_col, out=self.fft.doppler_input[:, :self.cpi_length, :])
+        return self._execute_doppler()
+
+    # ─── Sliding CPI ─────────────────────────────────────────────
+    def reset_slow_time(self):
+        """
+        Forget the buffered chirps, clutter filter state and RD background
+        (slow time is no longer contiguous, e.g. after lost frames)
+        """
+        self.clutter.reset()
+        if self.rd_background is not None:
+            self.rd_background.reset()
+        self._head = 0        # next write position in the ring buffer
+        self._filled = 0      # valid chirps in the ring buffer
+        self._since_cpi = 0   # chirps pushed since the last CPI
+
+    def _push_chirps(self, R):
+        """Append range profiles [2, n, range bins] to the slow-time ring buffer"""
+        L = self.cpi_length
+        n = R.shape[1]
+        if n >= L:
+            self._slow_time[:] = R[:, n - L:]
+            self._head = 0
+        else:
+            first = min(n, L - self._head)
+            self._slow_time[:, self._head:self._head + first] = R[:, :first]
+            self._slow_time[:, :n - first] = R[:, first:]
+            self._head = (self._head + n) % L
+        self._filled = min(self._filled + n, L)
+        self._since_cpi += n
+
+    def _sliding_doppler(self):
+        """Windowed Doppler FFT over the ring buffer, oldest chirp first"""
+        L, h = self.cpi_length, self._head
+        window = self._doppler_window_col
+        doppler_in = self.fft.doppler_input
+        np.multiply(self._slow_time[:, h:], window[:L - h], out=doppler_in[:, :L - h])
+        np.multiply(self._slow_time[:, :h], window[L - h:], out=doppler_in[:, L - h:L])
+        return self._execute_doppler()
+
+    def process_sliding(self, bursts):
+        """
+        Range-FFT one burst into the slow-time buffer and process every CPI it completes
+        Returns: list of detections (one array per completed CPI, oldest first) and
+        the RD maps of the last one (None while the buffer is still filling)
+        """
+        R = self.range_profiles(bursts)
+        cpi_detections, RD = [], None
+        start, n = 0, R.shape[1]
+        while start < n:
+            # Push up to the next CPI boundary
+            need = max(self.cpi_hop - self._since_cpi, self.cpi_length - self._filled)
+            take = min(n - start, need)
+            self._push_chirps(R[:, start:start + take])
+            start += take
+            if self._since_cpi >= self.cpi_hop and self._filled == self.cpi_length:
+                self._since_cpi = 0
+                RD = self._sliding_doppler()
+                cpi_detections.append(self.detect_targets(RD))
+        return cpi_detections, RD
+
+    def magnitude(self, RD):
+        """Channel-averaged magnitude of the RD maps (buffer reused across calls)"""
+        mag = np.abs(RD[0], out=self._mag)
+        mag += np.abs(RD[1], out=self._mag_tmp)
+        mag *= 0.5
+        return mag
+
+    def cfar(self, mag):
+        """CFAR detection on a magnitude map. Returns: boolean detection mask"""
+        return self.cfar_detector.detect(mag)
+
+    def detect(self, mag):
+        """
+        CFAR, with hits on learnt clutter dropped by the RD background map (which
+        is then updated with this CPI). Returns: boolean detection mask
+        """
+        hits = self.cfar(mag)
+        background = self.rd_background
+        if background is not None:
+            background.mask(hits, mag, self.cfar_detector.noise, self.cfar_detector.threshold_factor)
+            background.update(mag, hits)
+        return hits
+
+    def detect_targets(self, RD):
+        """
+        CFAR on the channel-averaged magnitude, then multi-target extraction
+        Returns: detections (DETECTION_DTYPE), strongest first
+        """
+        mag_avg = self.magnitude(RD)
+        return self.extract(RD, mag_avg, self.detect(mag_avg))
+
+    def extract(self, RD, mag_avg, hits):
+        """Multi-target extraction and angle estimation on the CFAR hits. Returns: detections"""
+        cfg = self.config
+        if not hits.any():
+            return np.empty(0, dtype=DETECTION_DTYPE)
+
+        targets = extract_targets(
+            np.where(hits, mag_avg, 0), self.cfar_detector.noise, RD[0], RD[1],
+            cfg.element_spacing, max_targets=cfg.max_targets, area_min=cfg.area_min,
+            min_snr_db=cfg.min_snr_db, blank_width=cfg.blank_width, span=cfg.phase_span,
+            angle_estimator=self.angle_estimator,
+        )
+
+        detections = np.empty(len(targets), dtype=DETECTION_DTYPE)
+        for name in TARGET_DTYPE.names:
+            detections[name] = targets[name]
+        detections['range_m'] = self.ranges_m[targets['range_idx']]
+        detections['velocity_ms'] = self.velocities_ms[targets['doppler_idx']]
+        return detections
+
+    def process_bursts(self, bursts):
+        """
+        Process already-sliced [2, num_chirps, good_ramp_samples] bursts
+        With a sliding CPI: detections and RD maps of the last CPI completed by
+        these chirps (no detections and RD None while the buffer is filling)
+        """
+        if self.sliding:
+            cpi_detections, RD = self.process_sliding(bursts)
+            if not cpi_detections:
+                return np.empty(0, dtype=DETECTION_DTYPE), None
+            return cpi_detections[-1], RD
+        RD = self.range_doppler(bursts)
+        return self.detect_targets(RD), RD
+
+    def process(self, frame):
+        """
+        Process one raw [2, total_samples] frame
+        Returns: detections, RD maps [2, doppler_fft_size, range_fft_size//2]
+        """
+        return self.process_bursts(self.slice_chirps(frame))
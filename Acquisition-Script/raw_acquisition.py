@@ -4,6 +4,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import zmq
 from matplotlib.animation import FuncAnimation
+from wire_protocol import (FrameHeader, send_frame, encode_iq, good_ramp_samples as ramp_samples,
+                           WIRE_FORMATS, FLAG_SLICED, BEGIN_OFFSET_FRAC)
+from acquisition_pipeline import AcquisitionPipeline
 
 """
 raw_acquisition.py
@@ -11,7 +14,17 @@ raw_acquisition.py
 Acquires continuous raw IQ chirp bursts from PlutoSDR + CN0566
 and streams them via a ZeroMQ PUSH socket (`tcp://*:5555`).
 
-Output: byte stream of complex64 IQ samples, shape [2, total_samples].
+Output: framed messages (see wire_protocol.py), a header with sequence number,
+capture timestamp and radar parameters followed by the IQ samples, sent
+without copying:
+- SLICE_ON_PI = False: the whole receive buffer, shape [2, total_samples]
+- SLICE_ON_PI = True:  only the good part of each chirp, [2, num_chirps, good_ramp_samples],
+  sized like the host's slicing (wire_protocol.BEGIN_OFFSET_FRAC)
+WIRE_FORMAT selects complex64, or int16 / float16 I/Q pairs (2-4x fewer bytes).
+int16 is the default: Pluto samples are integers, so it is lossless.
+
+Capture and sending run in separate threads (see acquisition_pipeline.py),
+so the next burst is triggered while the previous frame is being sent.
 """
 
 import adi
@@ -28,6 +41,10 @@ num_chirps=64
 ramp_time = 500      # ramp time in us
 num_slices = 50     # this sets how much time will be displayed on the waterfall plot
 plot_freq = 0    # x-axis freq range to plot
+SLICE_ON_PI = False      # send only the good ramp samples instead of the whole buffer
+NUM_BUFFERS = 4          # frame buffers shared by the capture and send threads
+REPORT_INTERVAL = 5.0    # seconds between stage timing reports
+WIRE_FORMAT = 'int16'    # 'complex64', 'int16' (native Pluto IQ) or 'float16'
 
 S = default_chirp_bw/(ramp_time*1e-6)
 f_offset = 1.5*2*S/3e8 #1.5 meters are required to correct range bias
@@ -145,9 +162,9 @@ print(num_samples_frame)
 # For best freq linearity, stay away from the start of the ramps
 ramp_time = int(my_phaser.freq_dev_time)
 ramp_time_s = ramp_time / 1e6
-begin_offset_time = 0.3 * ramp_time_s   # time in seconds
+begin_offset_time = BEGIN_OFFSET_FRAC * ramp_time_s   # time in seconds, same as the host
 print("actual freq dev time = ", ramp_time)
-good_ramp_samples = int((ramp_time_s-begin_offset_time) * sample_rate)
+good_ramp_samples = ramp_samples(ramp_time_s, sample_rate)
 print('Good ramp samples',good_ramp_samples)
 start_offset_time = tdd.channel[0].on_ms/1e3 + begin_offset_time
 start_offset_samples = int(start_offset_time * sample_rate)
@@ -193,6 +210,24 @@ ctx    = zmq.Context()
 push   = ctx.socket(zmq.PUSH)
 push.bind("tcp://*:5555")
 
+# Frame header, filled once; send_frame sets dtype/shape/timestamp per frame
+header = FrameHeader(
+    sample_rate=sample_rate,
+    center_freq=output_freq,
+    chirp_bw=default_chirp_bw,
+    ramp_time_us=ramp_time,
+    num_chirps=num_chirps,
+    good_ramp_samples=good_ramp_samples,
+    start_offset_samples=start_offset_samples,
+    num_samples_frame=num_samples_frame,
+    flags=FLAG_SLICED if SLICE_ON_PI else 0,
+)
+wire_code = WIRE_FORMATS[WIRE_FORMAT]
+frame_samples = num_chirps * good_ramp_samples if SLICE_ON_PI else buffer_size
+bytes_per_sample = 8 if WIRE_FORMAT == 'complex64' else 4   # per complex sample
+print(f"Payload per frame: {2 * frame_samples * bytes_per_sample / 1e3:.1f} kB "
+      f"(full complex64 buffer: {2 * buffer_size * 8 / 1e3:.1f} kB)")
+
 #Nulling
 frequency = output_freq  # Operating frequency in Hz (should match output_freq)
 num_elements = 8
@@ -214,17 +249,36 @@ else:
     for i in range(num_elements):
         my_phaser.set_chan_phase(i, 0)
 
+frame_shape = (2, num_chirps, good_ramp_samples) if SLICE_ON_PI else (2, buffer_size)
 
-while True:
+
+def capture(out):
+    """Capture thread: trigger a burst and read it into `out`"""
     # 1) Trigger a burst
-    my_phaser._gpios.gpio_burst = 0
-    my_phaser._gpios.gpio_burst = 1
-    my_phaser._gpios.gpio_burst = 0
+    with pipeline.timers.stage('trigger'):
+        my_phaser._gpios.gpio_burst = 0
+        my_phaser._gpios.gpio_burst = 1
+        my_phaser._gpios.gpio_burst = 0
 
     # 2) Grab entire RX buffer for both channels
-    data = my_sdr.rx()           # shape (2, total_samples)
-    buf  = np.ascontiguousarray(data, dtype=np.complex64).tobytes()
-    push.send(buf)
-    # 3) Send raw IQ bytes directly
+    with pipeline.timers.stage('rx'):
+        data = my_sdr.rx()           # shape (2, total_samples)
+    timestamp_ns = time.time_ns()
+
+    # 3) Keep only the good ramp samples of each chirp, shape (2, num_chirps, good_ramp_samples)
+    with pipeline.timers.stage('slice'):
+        for ch in range(2):
+            out[ch] = data[ch][idx] if SLICE_ON_PI else data[ch]
+    return timestamp_ns
+
+
+def send(frame, timestamp_ns):
+    """Send thread: header + IQ in the wire format (payload is not copied)"""
+    payload, header.scale = encode_iq(frame, wire_code)
+    tracker = send_frame(push, payload, header, timestamp_ns, track=True)
+    header.seq += 1
+    return tracker
+
 
-    #push.send(data.tobytes())
+pipeline = AcquisitionPipeline(capture, send, frame_shape, num_buffers=NUM_BUFFERS)
+pipeline.run(REPORT_INTERVAL)
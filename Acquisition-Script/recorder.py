@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+
+"""
+recorder.py
+-----------
+Streaming recorder for radar frames.
+
+Frames are copied into a small pool of preallocated buffers and written to
+disk by a background thread, so recording uses constant RAM however long it
+runs and never blocks the display loop. If the writer falls behind, frames
+are dropped (and counted) instead of growing memory.
+
+A recording `<base>` consists of:
+- `<base>.npy`             frames, shape [num_frames, *frame_shape]
+- `<base>_timestamps.npy`  per-frame acquisition timestamps (float64, s)
+- `<base>.json`            header: radar parameters, frame shape/dtype, counts
+
+The `.npy` files are ordinary NumPy files that grow by appending. Their
+header is reserved at a fixed size and rewritten with the current frame
+count, so they can be opened with `np.load(path, mmap_mode='r')`, even while
+recording or after a crash (up to the last header update).
+"""
+
+NPY_HEADER_SIZE = 256      # bytes reserved for the .npy header
+HEADER_UPDATE_FRAMES = 100  # rewrite the frame count every N frames
+
+
+def npy_header(shape, dtype, size=NPY_HEADER_SIZE):
+    """Version 1.0 .npy header padded to a fixed size, so it can be rewritten in place"""
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(int(n) for n in shape),
+    })
+    padding = size - 10 - len(header) - 1
+    if padding < 0:
+        raise ValueError("Array shape does not fit in the reserved .npy header")
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', size - 10) + (header + ' ' * padding + '\n').encode('latin1')
+
+
+class NpyAppender:
+    """Append fixed-shape records to a .npy file on disk"""
+
+    def __init__(self, path, record_shape, dtype):
+        self.path = path
+        self.record_shape = tuple(record_shape)
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(npy_header((self.count,) + self.record_shape, self.dtype))
+        self._file.seek(0, os.SEEK_END)
+
+    def append(self, record):
+        record = np.ascontiguousarray(record, dtype=self.dtype)
+        self._file.write(memoryview(record).cast('B'))
+        self.count += 1
+
+    def flush(self):
+        """Update the header with the current record count"""
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class StreamRecorder:
+    """Background-thread recorder writing frames to disk as they arrive"""
+
+    def __init__(self, base_path, frame_shape, dtype=np.complex64, metadata=None, num_buffers=8):
+        self.base_path = base_path
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.metadata = dict(metadata or {})
+
+        self.frames_path = base_path + '.npy'
+        self.timestamps_path = base_path + '_timestamps.npy'
+        self.header_path = base_path + '.json'
+
+        # Preallocated frame pool: free buffer indices <-> queued (index, timestamp)
+        self._buffers = np.empty((num_buffers,) + self.frame_shape, dtype=self.dtype)
+        self._free = queue.Queue()
+        for i in range(num_buffers):
+            self._free.put(i)
+        self._pending = queue.Queue()
+
+        self.written = 0
+        self.dropped = 0
+        self.start_time = None
+        self._thread = None
+
+    # ─── Producer side (display loop) ────────────────────────────
+    def start(self):
+        self.start_time = time.time()
+        self._frames = NpyAppender(self.frames_path, self.frame_shape, self.dtype)
+        self._timestamps = NpyAppender(self.timestamps_path, (), np.float64)
+        self._write_json()
+        self._thread = threading.Thread(target=self._run, name="StreamRecorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, frame, timestamp=None):
+        """Queue one frame for writing. Returns: False if it was dropped"""
+        try:
+            i = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        np.copyto(self._buffers[i], frame)
+        self._pending.put((i, time.time() if timestamp is None else timestamp))
+        return True
+
+    def close(self):
+        """Flush queued frames, finalise headers and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._pending.put(None)
+        self._thread.join()
+        self._thread = None
+        self._frames.close()
+        self._timestamps.close()
+        self._write_json()
+
+    # ─── Writer thread ───────────────────────────────────────────
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            i, timestamp = item
+            self._frames.append(self._buffers[i])
+            self._timestamps.append(timestamp)
+            self._free.put(i)
+            self.written += 1
+            if self.written % HEADER_UPDATE_FRAMES == 0:
+                self._frames.flush()
+                self._timestamps.flush()
+
+    def _write_json(self):
+        header = {
+            'frames_file': os.path.basename(self.frames_path),
+            'timestamps_file': os.path.basename(self.timestamps_path),
+            'frame_shape': list(self.frame_shape),
+            'dtype': self.dtype.str,
+            'start_time': self.start_time,
+            'num_frames': self.written,
+            'dropped_frames': self.dropped,
+            'radar': self.metadata,
+        }
+        with open(self.header_path, 'w') as f:
+            json.dump(header, f, indent=2)
+
+
+def load_recording(base_path, mmap_mode='r'):
+    """
+    Open a recording written by StreamRecorder (or a plain .npy of frames)
+    Returns: frames, timestamps (or None), header dict (or {})
+    """
+    if base_path.endswith('.npy'):
+        base_path = base_path[:-4]
+    frames = np.load(base_path + '.npy', mmap_mode=mmap_mode)
+    timestamps, header = None, {}
+    if os.path.exists(base_path + '_timestamps.npy'):
+        timestamps = np.load(base_path + '_timestamps.npy', mmap_mode=mmap_mode)
+    if os.path.exists(base_path + '.json'):
+        with open(base_path + '.json') as f:
+            header = json.load(f)
+    return frames, timestamps, header
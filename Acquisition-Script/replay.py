@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from radar_processing import RadarConfig, RadarProcessor, DETECTION_DTYPE
+from recorder import load_recording
+from tracking import make_tracker
+from clutter import CLUTTER_METHODS, RD_BACKGROUND_MODES, STATEFUL_CLUTTER_METHODS
+
+"""
+replay.py
+---------
+Offline replay and batch reprocessing of recorded sessions.
+
+Opens a recording memory-mapped (a `radar_data_*.npy` from radar_gui.py,
+with its `_timestamps.npy` / `.json` header when present), runs the
+processing engine over every frame and writes all detections with their
+track IDs to a compact output file (.npz, .csv or .parquet). Frames are
+read one at a time from the memory map, so memory stays flat regardless of
+recording size.
+
+Usage:
+    python3 replay.py radar_data_20250915_120000.npy
+    python3 replay.py session.npy --threshold 3.0 --tracker kalman -o out.csv
+    python3 replay.py session.npy --realtime
+    python3 replay.py session.npy --workers 16   # shard frames across processes
+"""
+
+# One row per detection in the replay output
+REPLAY_DTYPE = np.dtype([
+    ('frame', np.int64),
+    ('timestamp', np.float64),
+    ('track_id', np.int64),
+] + DETECTION_DTYPE.descr)
+
+DEFAULT_FPS = 10.0  # frame rate assumed when a recording has no timestamps
+
+
+def config_from_header(header, **overrides):
+    """RadarConfig from a recording header, with non-None overrides applied"""
+    params = dict(header.get('radar', {}))
+    known = RadarConfig.__dataclass_fields__
+    params = {k: v for k, v in params.items() if k in known}
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    return RadarConfig(**params)
+
+
+def frame_timestamps(timestamps, num_frames, fps=DEFAULT_FPS):
+    """Recorded timestamps, or a uniform timeline at `fps` if there are none"""
+    if timestamps is not None and len(timestamps) >= num_frames:
+        return np.asarray(timestamps[:num_frames], dtype=np.float64)
+    return np.arange(num_frames) / fps
+
+
+def detect_frames(processor, frames, timestamps, start=0, stop=None, pace=False):
+    """
+    Run the processor over frames[start:stop]
+    Returns: REPLAY_DTYPE array of detections (track_id = -1)
+    """
+    stop = len(frames) if stop is None else stop
+    sliced = frames.ndim == 4   # [n, 2, chirps, samples] recordings, else raw [n, 2, total_samples]
+    results = []
+    t_wall = time.perf_counter()
+    for i in range(start, stop):
+        if pace and i > start:
+            # Real-time pacing: wait until this frame's offset in the recording
+            delay = (timestamps[i] - timestamps[start]) - (time.perf_counter() - t_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = frames[i]
+        if sliced:
+            detections, _ = processor.process_bursts(frame)
+        else:
+            detections, _ = processor.process(frame)
+        if len(detections) == 0:
+            continue
+
+        out = np.empty(len(detections), dtype=REPLAY_DTYPE)
+        for name in DETECTION_DTYPE.names:
+            out[name] = detections[name]
+        out['frame'] = i
+        out['timestamp'] = timestamps[i]
+        out['track_id'] = -1
+        results.append(out)
+
+    if not results:
+        return np.empty(0, dtype=REPLAY_DTYPE)
+    return np.concatenate(results)
+
+
+def run_tracker(detections, tracker):
+    """Assign track IDs to detections frame by frame (in place)"""
+    if len(detections) == 0:
+        return detections
+    # Detections are grouped by frame in ascending order
+    bounds = np.flatnonzero(np.diff(detections['frame'])) + 1
+    for chunk in np.split(np.arange(len(detections)), bounds):
+        frame_dets = detections[chunk]
+        detections['track_id'][chunk] = tracker.update_detections(frame_dets, frame_dets['timestamp'][0])
+    return detections
+
+
+def save_detections(path, detections, config, source):
+    """Write detections to .npz (default), .csv or .parquet, chosen by extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        np.savetxt(path, detections, delimiter=',', header=','.join(detections.dtype.names),
+                   comments='', fmt=['%d', '%.6f', '%d'] + ['%.6g'] * (len(detections.dtype.names) - 3))
+    elif ext == '.parquet':
+        import pandas as pd  # optional, only needed for Parquet output
+        pd.DataFrame(detections).to_parquet(path)
+    else:
+        np.savez_compressed(path, detections=detections, source=source,
+                            config=json.dumps(config.to_dict()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and reprocess recorded radar sessions")
+    parser.add_argument('recording', help="recording .npy (as written by radar_gui.py)")
+    parser.add_argument('-o', '--output', help="output file (.npz, .csv or .parquet), default <recording>_detections.npz")
+    parser.add_argument('--realtime', action='store_true', help="pace frames at the recorded rate instead of as fast as possible")
+    parser.add_argument('--fps', type=float, default=DEFAULT_FPS, help="frame rate for recordings without timestamps")
+    parser.add_argument('--start', type=int, default=0, help="first frame")
+    parser.add_argument('--stop', type=int, default=None, help="stop before this frame")
+    parser.add_argument('--tracker', choices=['nn', 'kalman'], default='nn')
+    parser.add_argument('--threshold', type=float, help="CFAR threshold factor")
+    parser.add_argument('--cfar-method', choices=['ca', 'go', 'so', 'os'])
+    parser.add_argument('--min-snr-db', type=float,
+                        help="drop peaks below this SNR (off by default, 10 in extract_targets.m)")
+    parser.add_argument('--max-targets', type=int)
+    parser.add_argument('--angle-method', choices=['phase', 'bartlett', 'capon', 'music'])
+    parser.add_argument('--clutter', choices=CLUTTER_METHODS, help="slow-time clutter filter (see clutter.py)")
+    parser.add_argument('--rd-background', choices=RD_BACKGROUND_MODES, help="adaptive RD background map")
+    parser.add_argument('--fft-backend', default='auto')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes for detection (tracking stays sequential), 0 = all cores")
+    args = parser.parse_args()
+
+    frames, timestamps, header = load_recording(args.recording)
+    config = config_from_header(
+        header,
+        threshold_factor=args.threshold,
+        cfar_method=args.cfar_method,
+        min_snr_db=args.min_snr_db,
+        max_targets=args.max_targets,
+        angle_method=args.angle_method,
+        clutter_method=args.clutter,
+        rd_background=args.rd_background,
+        fft_backend=args.fft_backend,
+    )
+    parallel = args.workers != 1 and not args.realtime
+    if parallel and config.stateful:
+        state = [name for name, on in (('sliding CPI', config.sliding_cpi),
+                                       (f'clutter filter {config.clutter_method!r}',
+                                        config.clutter_method in STATEFUL_CLUTTER_METHODS),
+                                       (f'RD background {config.rd_background!r}', bool(config.rd_background)))
+                 if on]
+        parser.error(f"--workers needs independent frames, but {', '.join(state)} keeps state across frames; "
+                     "use --workers 1")
+    # Parallel workers build their own processors (FFT plans, wisdom) from the config
+    processor = None if parallel else RadarProcessor(config)
+    timestamps = frame_timestamps(timestamps, len(frames), args.fps)
+    stop = len(frames) if args.stop is None else min(args.stop, len(frames))
+
+    t0 = time.perf_counter()
+    if parallel:
+        from batch_processing import detect_recording_parallel
+        detections = detect_recording_parallel(args.recording, config, timestamps, args.start, stop,
+                                               workers=args.workers or None)
+    else:
+        detections = detect_frames(processor, frames, timestamps, args.start, stop, pace=args.realtime)
+    run_tracker(detections, make_tracker(args.tracker))
+    elapsed = time.perf_counter() - t0
+
+    output = args.output or os.path.splitext(args.recording)[0] + '_detections.npz'
+    save_detections(output, detections, config, args.recording)
+    num_frames = max(stop - args.start, 0)
+    print(f"Processed {num_frames} frames in {elapsed:.2f} s ({num_frames / max(elapsed, 1e-9):.1f} frames/s)")
+    print(f"{len(detections)} detections, {len(np.unique(detections['track_id']))} tracks -> {output}")
+
+
+if __name__ == '__main__':
+    main()
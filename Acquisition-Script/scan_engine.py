@@ -0,0 +1,142 @@
+import numpy as np
+
+"""
+scan_engine.py
+--------------
+Azimuth scan engine for the CN0566 (Raspberry Pi side).
+
+The phase state of all 8 elements is computed once per scan angle
+(steering phase + phase calibration + optional 180° flips, wrapped to
+[0, 360) and quantised to the ADAR1000 phase step). Steering to an angle then
+writes only the elements whose quantised phase differs from the current
+state through `phaser.elements[n].rx_phase`, followed by a single
+`latch_rx_settings()`. The naive loop of `set_chan_phase` calls instead
+writes and latches every element on every angle.
+
+The CN0566 does not map channel i to element i + 1 (the channels are spread
+over its two ADAR1000s), and `set_chan_phase` adds the phase calibration
+itself. Rather than guessing either, the scanner asks the driver once at
+start-up: each channel is set to 0° and 180° with `set_chan_phase`, the
+element that follows is the one the channel drives, and the phase it reads
+at 0° is the calibration the driver applies. A channel that does not move
+exactly one element raises RuntimeError instead of steering a mirrored beam.
+
+Scan orders:
+- 'linear':         -limit ... +limit
+- 'interleaved':    even angle indices, then odd ones (a coarse picture every half sweep)
+- 'coarse_to_fine': every Nth angle first, then halving the stride down to 1
+
+Only numpy is needed, so this runs on the Pi.
+"""
+
+PHASE_STEP_DEG = 360 / 128   # ADAR1000 phase resolution (7-bit)
+
+SCAN_ORDERS = ('linear', 'interleaved', 'coarse_to_fine')
+
+
+def steering_phases(angles_deg, num_elements, element_spacing, wavelength,
+                    phase_cal=None, flip_elements=()):
+    """
+    Per-angle element phases for a uniform linear array
+    Returns: [num_angles, num_elements] phases in degrees, wrapped and quantised
+    """
+    n = np.arange(num_elements)
+    angles_rad = np.deg2rad(np.asarray(angles_deg, dtype=np.float64))
+    phases = np.rad2deg(2 * np.pi * element_spacing * n[None, :] * np.sin(angles_rad)[:, None] / wavelength)
+    if phase_cal is not None:
+        phases += np.asarray(phase_cal, dtype=np.float64)[:num_elements]
+    for i in flip_elements:
+        phases[:, i] += 180
+    phases = np.round(phases / PHASE_STEP_DEG) * PHASE_STEP_DEG
+    return np.mod(phases, 360.0)
+
+
+def scan_order(num_angles, order='linear', coarse_stride=4):
+    """Returns: angle indices in the order they are visited in one sweep"""
+    if order == 'linear':
+        return np.arange(num_angles)
+    if order == 'interleaved':
+        return np.concatenate([np.arange(0, num_angles, 2), np.arange(1, num_angles, 2)])
+    if order == 'coarse_to_fine':
+        visited = np.zeros(num_angles, dtype=bool)
+        indices = []
+        stride = max(int(coarse_stride), 1)
+        while True:
+            new = np.arange(0, num_angles, stride)
+            new = new[~visited[new]]
+            visited[new] = True
+            indices.append(new)
+            if stride == 1:
+                break
+            stride //= 2
+        return np.concatenate(indices)
+    raise ValueError(f"Unknown scan order: {order} (expected one of {SCAN_ORDERS})")
+
+
+class AzimuthScanner:
+    """Steers the CN0566 through precomputed phase states with minimal register writes"""
+
+    def __init__(self, phaser, angles_deg, element_spacing, wavelength, num_elements=8,
+                 order='linear', coarse_stride=4, flip_elements=(), apply_cal=True):
+        self.phaser = phaser
+        self.angles_deg = np.asarray(angles_deg, dtype=np.float64)
+        self.num_elements = num_elements
+        self.element_ids, phase_cal = self._probe_channels(apply_cal)
+        self.states = steering_phases(self.angles_deg, num_elements, element_spacing, wavelength,
+                                      phase_cal=phase_cal, flip_elements=flip_elements)
+        self.order = scan_order(len(self.angles_deg), order, coarse_stride)
+        self._current = None    # phase state last written (None = unknown)
+
+        # Counters
+        self.element_writes = 0
+        self.latches = 0
+
+    def __len__(self):
+        return len(self.angles_deg)
+
+    def _read_phases(self, ids):
+        return np.array([self.phaser.elements.get(n).rx_phase for n in ids], dtype=np.float64)
+
+    def _probe_channels(self, apply_cal):
+        """
+        Element driven by each channel and the phase offset set_chan_phase adds to it
+        Returns: element ids [num_elements], phase offsets in degrees [num_elements]
+        """
+        ids = sorted(self.phaser.elements)
+        element_ids = np.empty(self.num_elements, dtype=int)
+        offsets = np.empty(self.num_elements)
+        for chan in range(self.num_elements):
+            self.phaser.set_chan_phase(chan, 0.0, apply_cal=apply_cal)
+            at_zero = self._read_phases(ids)
+            self.phaser.set_chan_phase(chan, 180.0, apply_cal=apply_cal)
+            moved = np.abs(np.mod(self._read_phases(ids) - at_zero + 180, 360) - 180)
+            # Only the driven element changes, by 180° give or take the phase step
+            followed = np.flatnonzero(moved > 90)
+            if followed.size != 1 or abs(moved[followed[0]] - 180) > 1.5 * PHASE_STEP_DEG:
+                raise RuntimeError(f"Cannot map channel {chan} to one element: "
+                                   f"set_chan_phase moved elements {[ids[k] for k in followed]}")
+            element_ids[chan] = ids[followed[0]]
+            offsets[chan] = at_zero[followed[0]]
+        if len(set(element_ids)) != self.num_elements:
+            raise RuntimeError(f"Channels share elements: {element_ids.tolist()}")
+        return element_ids, offsets
+
+    def steer(self, angle_index):
+        """Write the elements that differ from the current state, then latch once. Returns: elements written"""
+        target = self.states[angle_index]
+        if self._current is None:
+            changed = np.arange(self.num_elements)
+        else:
+            changed = np.flatnonzero(target != self._current)
+        for i in changed:
+            self.phaser.elements.get(int(self.element_ids[i])).rx_phase = float(target[i])
+        if changed.size:
+            self.phaser.latch_rx_settings()
+            self.latches += 1
+            self.element_writes += changed.size
+        self._current = target
+        return changed.size
+
+    def invalidate(self):
+        """Forget the current state (e.g. after phases were set elsewhere)"""
+        self._current = None
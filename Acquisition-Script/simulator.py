@@ -0,0 +1,387 @@
+import argparse
+import time
+from dataclasses import dataclass, asdict, replace
+import numpy as np
+import zmq
+from wire_protocol import FrameHeader, send_frame, encode_iq, WIRE_FORMATS, FLAG_SLICED
+from acquisition_pipeline import AcquisitionPipeline
+from scan_engine import scan_order, SCAN_ORDERS
+
+"""
+simulator.py
+------------
+Synthetic FMCW radar standing in for the PlutoSDR + CN0566 acquisition
+scripts, for testing and load-testing the host side without hardware.
+
+Generates the beat signal of point targets (range, radial velocity, angle,
+RCS) plus static clutter and complex Gaussian noise for both Rx channels
+(the two 4-element halves of the array), and publishes it on a ZeroMQ PUSH
+socket with the same framing (wire_protocol.py) and layouts as the real
+scripts:
+- raw:     [2, total_samples] complex64 receive buffers as raw_acquisition.py
+           (or [2, num_chirps, good_ramp_samples] with --sliced, and int16 /
+           float16 payloads with --wire-format)
+- angular: [samples, 2] slices per steering angle, or whole
+           [numAngles, samples, 2] cubes with --cubes, as angular_acquisition.py
+
+Every frame is one matrix product: per scatterer a fast-time beat tone
+[K, samples] and a slow-time term [K, 2 * num_chirps] (Doppler, carrier
+phase, amplitude and channel gain), multiplied into [2 * num_chirps,
+samples]. Noise comes from a pregenerated bank read at a random offset.
+Frames are produced by AcquisitionPipeline like the real scripts, so
+--fps 0 drives the GUIs as fast as the host can take them.
+
+Usage:
+    python3 simulator.py                                # raw stream at the real burst rate
+    python3 simulator.py --fps 0 --sliced --wire-format int16
+    python3 simulator.py --mode angular --fps 50
+    python3 simulator.py --target 8,1.5,20,1 --target 15,-2,-10,5
+Then point RX_ADDRESS of radar_gui.py / angular_gui.py at tcp://localhost:5555.
+"""
+
+C = 3e8  # Speed of light in m/s
+
+
+@dataclass
+class Target:
+    """Point scatterer; moves radially at velocity_ms between frames"""
+    range_m: float
+    velocity_ms: float = 0.0   # positive = receding
+    angle_deg: float = 0.0
+    rcs: float = 1.0           # m², amplitude ∝ sqrt(rcs) / range²
+
+
+@dataclass
+class SimConfig:
+    """Radar, array and channel parameters of the simulated acquisition"""
+    # Radar parameters (defaults of raw_acquisition.py)
+    sample_rate: float = 0.6e6         # Hz
+    center_freq: float = 10.2e9        # Hz
+    chirp_bw: float = 0.4e9            # Hz
+    ramp_time_us: float = 500          # µs, also the chirp period
+    num_chirps: int = 64
+    begin_offset_frac: float = 0.3     # start of the good ramp samples
+
+    # Array (the two channels are the halves of the CN0566)
+    element_spacing_m: float = 0.014
+    elements_per_channel: int = 4
+
+    # Azimuth scan (angular mode)
+    scan_limit_deg: float = 45
+    num_scan: int = 20
+    scan_order: str = 'linear'
+
+    # Channel
+    noise_std: float = 2.0             # ADC counts per I/Q component
+    clutter_ranges_m: tuple = (2.0, 6.0)   # static scatterers at 0°
+    clutter_rcs: float = 0.01
+    ref_range_m: float = 5.0           # a 1 m² target here has amplitude ref_amplitude
+    ref_amplitude: float = 200.0       # ADC counts (the Pluto delivers 12-bit samples)
+    min_range_m: float = 1.0           # moving targets turn around at these ranges
+    max_range_m: float = 40.0
+
+    @property
+    def ramp_s(self):
+        return self.ramp_time_us * 1e-6
+
+    @property
+    def slope(self):
+        return self.chirp_bw / self.ramp_s
+
+    @property
+    def wavelength(self):
+        return C / self.center_freq
+
+    @property
+    def num_samples_frame(self):
+        """Samples per chirp period"""
+        return int(self.ramp_s * self.sample_rate)
+
+    @property
+    def start_offset_samples(self):
+        return int(self.begin_offset_frac * self.ramp_s * self.sample_rate)
+
+    @property
+    def good_ramp_samples(self):
+        return int((1 - self.begin_offset_frac) * self.ramp_s * self.sample_rate)
+
+    @property
+    def buffer_size(self):
+        """Pluto receive buffer: the next power of two holding all chirps"""
+        return 1 << max(int(np.ceil(np.log2(self.num_chirps * self.num_samples_frame))), 0)
+
+    @property
+    def scan_angles_deg(self):
+        return np.linspace(-self.scan_limit_deg, self.scan_limit_deg, self.num_scan)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# Radar parameters of angular_acquisition.py
+ANGULAR_DEFAULTS = dict(sample_rate=5e6, center_freq=10e9, chirp_bw=500e6, ramp_time_us=50,
+                        num_chirps=1, begin_offset_frac=0.2)
+
+DEFAULT_TARGETS = (
+    Target(5.0, 1.0, -20.0, 1.0),
+    Target(12.0, -2.0, 10.0, 3.0),
+    Target(20.0, 0.5, 30.0, 10.0),
+)
+
+
+class FMCWSimulator:
+    """Vectorized beat-signal generator for point targets seen by both array halves"""
+
+    def __init__(self, config=None, targets=DEFAULT_TARGETS, seed=None, noise_frames=4):
+        self.config = config if config is not None else SimConfig()
+        cfg = self.config
+        self.rng = np.random.default_rng(seed)
+        self.targets = [replace(t) for t in targets]
+
+        # Element positions of each channel half, in wavelengths
+        n = np.arange(2 * cfg.elements_per_channel)
+        self._element_wl = (cfg.element_spacing_m * n / cfg.wavelength).reshape(2, -1)
+        self._chirp_times = np.arange(cfg.num_chirps) * cfg.ramp_s
+        self._chirps = None   # whole chirps for raw_frame(), allocated on first use
+
+        # Noise bank, read at a random offset per frame
+        frame_size = 2 * max(cfg.buffer_size, cfg.num_scan * cfg.good_ramp_samples)
+        bank = cfg.noise_std * (self.rng.standard_normal(noise_frames * frame_size)
+                                + 1j * self.rng.standard_normal(noise_frames * frame_size))
+        self._noise = bank.astype(np.complex64)
+
+    # ─── Scene ───────────────────────────────────────────────────
+    def step(self, dt):
+        """Move the targets by dt seconds, turning around at the range limits"""
+        cfg = self.config
+        for t in self.targets:
+            t.range_m += t.velocity_ms * dt
+            if not cfg.min_range_m <= t.range_m <= cfg.max_range_m:
+                t.range_m = float(np.clip(t.range_m, cfg.min_range_m, cfg.max_range_m))
+                t.velocity_ms = -t.velocity_ms
+
+    def scatterers(self):
+        """Targets and static clutter as arrays: range, velocity, sin(angle), amplitude"""
+        cfg = self.config
+        clutter = [Target(r, 0.0, 0.0, cfg.clutter_rcs) for r in cfg.clutter_ranges_m]
+        scene = self.targets + clutter
+        ranges = np.array([t.range_m for t in scene], dtype=np.float64)
+        velocities = np.array([t.velocity_ms for t in scene], dtype=np.float64)
+        sines = np.sin(np.deg2rad([t.angle_deg for t in scene]))
+        rcs = np.array([t.rcs for t in scene], dtype=np.float64)
+        amplitudes = cfg.ref_amplitude * np.sqrt(rcs) * (cfg.ref_range_m / np.maximum(ranges, 0.1)) ** 2
+        return ranges, velocities, sines, amplitudes
+
+    def channel_gains(self, sines, steer_sines):
+        """Summed response of each channel half. Returns: [num_steer, K, 2]"""
+        delta = sines[None, :] - np.asarray(steer_sines, dtype=np.float64)[:, None]   # [S, K]
+        phases = 2 * np.pi * delta[:, :, None, None] * self._element_wl[None, None]   # [S, K, 2, E]
+        return np.exp(1j * phases).sum(axis=-1) / self._element_wl.shape[1]
+
+    def _beat(self, ranges, start, length):
+        """Fast-time beat tones [K, length] from sample `start` of each chirp"""
+        cfg = self.config
+        tau = (start + np.arange(length)) / cfg.sample_rate
+        beat_freqs = 2 * cfg.slope * ranges / C
+        return np.exp(2j * np.pi * beat_freqs[:, None] * tau[None, :]).astype(np.complex64)
+
+    def _add_noise(self, out):
+        flat = out.reshape(-1)
+        offset = self.rng.integers(0, len(self._noise) - flat.size + 1)
+        flat += self._noise[offset:offset + flat.size]
+        return out
+
+    # ─── Frames ──────────────────────────────────────────────────
+    def bursts(self, out=None, start=None, length=None, noise=True):
+        """
+        Samples start..start+length of every chirp for both channels
+        Returns: [2, num_chirps, length] complex64 (good ramp samples by default)
+        """
+        cfg = self.config
+        start = cfg.start_offset_samples if start is None else start
+        length = cfg.good_ramp_samples if length is None else length
+        if out is None:
+            out = np.empty((2, cfg.num_chirps, length), dtype=np.complex64)
+
+        ranges, velocities, sines, amplitudes = self.scatterers()
+        gains = self.channel_gains(sines, [0.0])[0]                          # [K, 2]
+        doppler = 2 * velocities / cfg.wavelength
+        carrier = 4 * np.pi * ranges / cfg.wavelength
+        slow = amplitudes[:, None] * np.exp(1j * (2 * np.pi * doppler[:, None] * self._chirp_times[None, :]
+                                                  + carrier[:, None]))       # [K, num_chirps]
+        # Explicit shape: a scene without scatterers (K = 0) gives noise only
+        weights = (gains[:, :, None] * slow[:, None, :]).reshape(len(ranges), 2 * cfg.num_chirps)
+        np.matmul(weights.T.astype(np.complex64), self._beat(ranges, start, length),
+                  out=out.reshape(2 * cfg.num_chirps, length))
+        return self._add_noise(out) if noise else out
+
+    def raw_frame(self, out=None):
+        """Whole receive buffer [2, buffer_size] as raw_acquisition.py sends it"""
+        cfg = self.config
+        if out is None:
+            out = np.empty((2, cfg.buffer_size), dtype=np.complex64)
+        if self._chirps is None:
+            self._chirps = np.empty((2, cfg.num_chirps, cfg.num_samples_frame), dtype=np.complex64)
+        self.bursts(self._chirps, start=0, length=cfg.num_samples_frame, noise=False)
+        used = cfg.num_chirps * cfg.num_samples_frame
+        out[:, :used] = self._chirps.reshape(2, used)
+        out[:, used:] = 0
+        return self._add_noise(out)
+
+    def cube(self, out=None, angle_indices=None):
+        """
+        Chirp-averaged samples [len(angle_indices), good_ramp_samples, 2] of the
+        scan angles (all by default), as angular_acquisition.py captures them
+        """
+        cfg = self.config
+        if angle_indices is None:
+            angle_indices = np.arange(cfg.num_scan)
+        steer = np.sin(np.deg2rad(cfg.scan_angles_deg[angle_indices]))
+        if out is None:
+            out = np.empty((len(steer), cfg.good_ramp_samples, 2), dtype=np.complex64)
+
+        ranges, _, sines, amplitudes = self.scatterers()
+        carrier = np.exp(4j * np.pi * ranges / cfg.wavelength)
+        gains = self.channel_gains(sines, steer) * (amplitudes * carrier)[None, :, None]  # [A, K, 2]
+        beat = self._beat(ranges, cfg.start_offset_samples, cfg.good_ramp_samples)        # [K, S]
+        np.matmul(beat.T[None], gains.astype(np.complex64), out=out)
+        return self._add_noise(out)
+
+    def header(self, flags=0):
+        """Frame header with the simulated radar parameters"""
+        cfg = self.config
+        return FrameHeader(
+            sample_rate=cfg.sample_rate,
+            center_freq=cfg.center_freq,
+            chirp_bw=cfg.chirp_bw,
+            ramp_time_us=cfg.ramp_time_us,
+            num_chirps=cfg.num_chirps,
+            good_ramp_samples=cfg.good_ramp_samples,
+            start_offset_samples=cfg.start_offset_samples,
+            num_samples_frame=cfg.num_samples_frame,
+            flags=flags,
+        )
+
+
+def parse_target(text):
+    """'range,velocity,angle,rcs' (trailing fields optional) -> Target"""
+    values = [float(v) for v in text.split(',')]
+    if not 1 <= len(values) <= 4:
+        raise argparse.ArgumentTypeError(f"Expected range[,velocity[,angle[,rcs]]], got {text!r}")
+    return Target(*values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic FMCW radar stream for radar_gui.py / angular_gui.py")
+    parser.add_argument('--mode', choices=['raw', 'angular'], default='raw')
+    parser.add_argument('--bind', default='tcp://*:5555', help="ZeroMQ PUSH endpoint")
+    parser.add_argument('--fps', type=float, default=None,
+                        help="frames (raw) or slices (angular) per second, 0 = as fast as possible "
+                             "(default: the real burst / ramp rate)")
+    parser.add_argument('--target', type=parse_target, action='append',
+                        help="range,velocity,angle,rcs (repeatable, default: three moving targets)")
+    parser.add_argument('--num-chirps', type=int, help="chirps per burst (raw mode)")
+    parser.add_argument('--noise', type=float, help="noise std per I/Q component (ADC counts)")
+    parser.add_argument('--no-clutter', action='store_true', help="no static clutter")
+    parser.add_argument('--no-targets', action='store_true',
+                        help="no moving targets (with --no-clutter: noise only, for false-alarm tests)")
+    parser.add_argument('--sliced', action='store_true', help="send [2, num_chirps, good_ramp_samples] (raw mode)")
+    parser.add_argument('--wire-format', choices=sorted(WIRE_FORMATS), default='complex64')
+    parser.add_argument('--cubes', action='store_true', help="send whole sweeps instead of slices (angular mode)")
+    parser.add_argument('--scan', type=int, help="steering angles per sweep (angular mode)")
+    parser.add_argument('--scan-order', choices=SCAN_ORDERS, default='linear')
+    parser.add_argument('--buffers', type=int, default=4, help="frame buffers of the capture/send pipeline")
+    parser.add_argument('--report', type=float, default=5.0, help="seconds between timing reports")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    params = dict(ANGULAR_DEFAULTS) if args.mode == 'angular' else {}
+    overrides = {'num_chirps': args.num_chirps, 'noise_std': args.noise, 'num_scan': args.scan}
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    params['scan_order'] = args.scan_order
+    if args.no_clutter:
+        params['clutter_ranges_m'] = ()
+    config = SimConfig(**params)
+    targets = [] if args.no_targets else (args.target or DEFAULT_TARGETS)
+    sim = FMCWSimulator(config, targets, seed=args.seed)
+
+    ctx = zmq.Context()
+    push = ctx.socket(zmq.PUSH)
+    push.bind(args.bind)
+
+    wire_code = WIRE_FORMATS[args.wire_format]
+    header = sim.header(FLAG_SLICED if args.sliced and args.mode == 'raw' else 0)
+    scan_angles = config.scan_angles_deg
+
+    # Pacing: the real rate is one burst (raw) or one ramp per angle (angular)
+    if args.fps is None:
+        period = config.num_chirps * config.ramp_s if args.mode == 'raw' else config.ramp_s
+    else:
+        period = 1.0 / args.fps if args.fps > 0 else 0.0
+    clock = {'next': time.perf_counter(), 'last': time.perf_counter()}
+
+    def pace():
+        """Wait for the next frame slot and advance the scene by the elapsed time"""
+        if period:
+            delay = clock['next'] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            clock['next'] = max(clock['next'] + period, time.perf_counter() - period)
+        now = time.perf_counter()
+        sim.step(now - clock['last'])
+        clock['last'] = now
+        return time.time_ns()
+
+    if args.mode == 'raw':
+        if args.sliced:
+            frame_shape = (2, config.num_chirps, config.good_ramp_samples)
+            generate = sim.bursts
+        else:
+            frame_shape = (2, config.buffer_size)
+            generate = sim.raw_frame
+
+        def capture(out):
+            timestamp_ns = pace()
+            with pipeline.timers.stage('generate'):
+                generate(out)
+            return timestamp_ns, -1
+    else:
+        header.num_scan = config.num_scan
+        if args.cubes:
+            frame_shape = (config.num_scan, config.good_ramp_samples, 2)
+
+            def capture(out):
+                timestamp_ns = pace()
+                with pipeline.timers.stage('generate'):
+                    sim.cube(out)
+                return timestamp_ns, -1
+        else:
+            frame_shape = (config.good_ramp_samples, 2)
+            order = scan_order(config.num_scan, config.scan_order)
+            position = {'i': 0}
+
+            def capture(out):
+                timestamp_ns = pace()
+                angle_index = int(order[position['i']])
+                position['i'] = (position['i'] + 1) % len(order)
+                with pipeline.timers.stage('generate'):
+                    sim.cube(out[None], [angle_index])
+                return timestamp_ns, angle_index
+
+    def send(frame, meta):
+        timestamp_ns, angle_index = meta
+        header.scan_index = angle_index
+        header.scan_angle_deg = float(scan_angles[angle_index]) if angle_index >= 0 else 0.0
+        payload, header.scale = encode_iq(frame, wire_code)
+        tracker = send_frame(push, payload, header, timestamp_ns, track=True)
+        header.seq += 1
+        return tracker
+
+    print(f"Simulating {args.mode} stream on {args.bind}: frame {frame_shape}, "
+          f"{len(sim.targets)} targets, {'max' if not period else f'{1/period:.1f}'} frames/s")
+    pipeline = AcquisitionPipeline(capture, send, frame_shape, num_buffers=args.buffers)
+    pipeline.run(args.report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+import time
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.stats import chi2
+
+"""
+tracking.py
+-----------
+Track management for detections in range–angle space.
+
+Tracks live in a compact array-backed store: each slot holds a ring buffer
+of [range, angle, velocity, timestamp] points, and a stable integer track ID
+that displays use to keep per-track plot items and colours. Per frame, all
+detections are gated against all tracks at once (x–y distance and time
+since the last update) and assigned with global nearest neighbour
+(`linear_sum_assignment`). Unassigned detections start new tracks.
+"""
+
+RANGE, ANGLE, VELOCITY, TIMESTAMP = range(4)
+
+
+def to_xy(range_m, angle_deg):
+    """Range/angle (degrees) to Cartesian x-y coordinates"""
+    angle_rad = np.deg2rad(angle_deg)
+    return range_m * np.cos(angle_rad), range_m * np.sin(angle_rad)
+
+
+def smooth_track(track_array, window=5):
+    """Apply moving average smoothing to track data"""
+    if len(track_array) < window:
+        return track_array
+
+    # Apply moving average to range, angle and velocity
+    kernel = np.ones(window) / window
+    smoothed = [np.convolve(track_array[:, i], kernel, mode='valid') for i in range(3)]
+
+    # Pad the smoothed data to match original length
+    smoothed = [np.pad(s, (window - 1, 0), mode='edge') for s in smoothed]
+
+    return np.column_stack(smoothed + [track_array[:, 3]])
+
+
+class TrackStore:
+    """Array-backed track store with vectorized gating and global nearest-neighbour assignment"""
+
+    def __init__(self, max_tracks=64, max_history=100, max_track_age=100.0,
+                 spatial_threshold=2.0, time_threshold=2.0):
+        self.max_tracks = max_tracks
+        self.max_history = max_history
+        self.max_track_age = max_track_age          # seconds before a track is dropped
+        self.spatial_threshold = spatial_threshold  # meters
+        self.time_threshold = time_threshold        # seconds
+
+        # Per-slot ring buffers of [range, angle, velocity, timestamp]
+        self.history = np.zeros((max_tracks, max_history, 4))
+        self.lengths = np.zeros(max_tracks, dtype=np.int64)  # valid points per slot
+        self.heads = np.zeros(max_tracks, dtype=np.int64)    # next write position per slot
+        self.ids = np.full(max_tracks, -1, dtype=np.int64)   # track ID per slot, -1 = free
+        self.last = np.zeros((max_tracks, 4))                # latest point per slot
+        self.next_track_id = 0
+
+    # ─── Queries ─────────────────────────────────────────────────
+    @property
+    def active(self):
+        """Boolean mask of occupied slots"""
+        return self.ids >= 0
+
+    def track_ids(self):
+        """IDs of the active tracks, in slot order"""
+        return self.ids[self.active]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    def __contains__(self, track_id):
+        return bool(np.any(self.ids == track_id))
+
+    def slot_of(self, track_id):
+        slots = np.flatnonzero(self.ids == track_id)
+        if len(slots) == 0:
+            raise KeyError(track_id)
+        return slots[0]
+
+    def track(self, track_id):
+        """History of a track in chronological order, shape [n, 4]"""
+        slot = self.slot_of(track_id)
+        n = self.lengths[slot]
+        order = (self.heads[slot] - n + np.arange(n)) % self.max_history
+        return self.history[slot, order]
+
+    # ─── Updates ─────────────────────────────────────────────────
+    def prune(self, current_time):
+        """Remove stale tracks. Returns: array of removed track IDs"""
+        stale = self.active & (current_time - self.last[:, TIMESTAMP] > self.max_track_age)
+        removed = self.ids[stale].copy()
+        self.ids[stale] = -1
+        self.lengths[stale] = 0
+        self.heads[stale] = 0
+        return removed
+
+    def _append(self, slots, points):
+        """Append one point to each of the given slots"""
+        heads = self.heads[slots]
+        self.history[slots, heads] = points
+        self.heads[slots] = (heads + 1) % self.max_history
+        self.lengths[slots] = np.minimum(self.lengths[slots] + 1, self.max_history)
+        self.last[slots] = points
+
+    def _allocate_slots(self, count, busy):
+        """Free slots for new tracks, evicting the stalest tracks (except `busy`) if the store is full"""
+        free = np.flatnonzero(~self.active)
+        if len(free) < count:
+            occupied = np.setdiff1d(np.flatnonzero(self.active), busy)
+            stalest = occupied[np.argsort(self.last[occupied, TIMESTAMP])]
+            free = np.concatenate([free, stalest[:count - len(free)]])
+        return free[:count]
+
+    def update(self, points, timestamp=None):
+        """
+        Associate an [n, 3] array of (range, angle, velocity) detections with tracks
+        Returns: track ID assigned to each detection
+        """
+        current_time = time.time() if timestamp is None else timestamp
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.prune(current_time)
+
+        num_detections = len(points)
+        assigned = np.full(num_detections, -1, dtype=np.int64)
+        if num_detections == 0:
+            return assigned
+        new_points = np.column_stack([points, np.full(num_detections, current_time)])
+
+        # Gate every detection against every active track
+        slots = np.flatnonzero(self.active)
+        det_slots = np.full(num_detections, -1, dtype=np.int64)
+        if len(slots):
+            gated, cost = self._gate(slots, new_points, current_time)
+            if gated.any():
+                # Global nearest neighbour; gated-out pairs get a prohibitive cost
+                rows, cols = linear_sum_assignment(np.where(gated, cost, 1e9))
+                ok = gated[rows, cols]
+                det_slots[cols[ok]] = slots[rows[ok]]
+
+        matched = np.flatnonzero(det_slots >= 0)
+        track_points = new_points.copy()
+        track_points[matched] = self._correct(det_slots[matched], new_points[matched])
+
+        # Unassigned detections start new tracks
+        new = np.flatnonzero(det_slots < 0)
+        if len(new):
+            free = self._allocate_slots(len(new), det_slots[matched])
+            new = new[:len(free)]  # only when max_tracks < detections in one frame
+            self.ids[free] = self.next_track_id + np.arange(len(free))
+            self.next_track_id += len(free)
+            self.lengths[free] = 0
+            self.heads[free] = 0
+            det_slots[new] = free
+            track_points[new] = self._initiate(free, new_points[new])
+
+        ok = det_slots >= 0
+        self._append(det_slots[ok], track_points[ok])
+        assigned[ok] = self.ids[det_slots[ok]]
+        return assigned
+
+    # ─── Association hooks (overridden by KalmanTrackStore) ──────
+    def _gate(self, slots, points, current_time):
+        """
+        Gate detections against the given track slots
+        Returns: boolean gate matrix and assignment cost, both [len(slots), len(points)]
+        """
+        tx, ty = to_xy(self.last[slots, RANGE], self.last[slots, ANGLE])
+        dx, dy = to_xy(points[:, RANGE], points[:, ANGLE])
+        dist = np.hypot(tx[:, None] - dx[None, :], ty[:, None] - dy[None, :])
+        time_dist = np.abs(current_time - self.last[slots, TIMESTAMP])[:, None]
+        gated = (dist < self.spatial_threshold) & (time_dist < self.time_threshold)
+        return gated, dist
+
+    def _correct(self, slots, points):
+        """Update matched tracks with their detections. Returns: points to store"""
+        return points
+
+    def _initiate(self, slots, points):
+        """Initialise new tracks from their first detection. Returns: points to store"""
+        return points
+
+    def update_detections(self, detections, timestamp=None):
+        """Update tracks with every entry of a DETECTION_DTYPE array"""
+        points = np.column_stack([detections['range_m'], detections['angle'], detections['velocity_ms']])
+        return self.update(points, timestamp)
+
+
+class KalmanTrackStore(TrackStore):
+    """
+    TrackStore with a constant-velocity Kalman filter per track, batched over all tracks.
+
+    State per track is [x, y, vx, vy]. The measurement is the detection's x-y
+    position (converted from range/angle) plus its Doppler radial velocity,
+    linearised around the predicted state (extended Kalman filter). Gating
+    uses the Mahalanobis distance of the innovation, and the stored history
+    holds filtered points, so no smoothing pass is needed for display.
+    """
+
+    def __init__(self, max_tracks=64, max_history=100, max_track_age=100.0,
+                 time_threshold=2.0, range_std=0.3, angle_std_deg=3.0,
+                 velocity_std=0.3, accel_std=2.0, init_velocity_std=5.0,
+                 gate_probability=0.99, velocity_sign=1.0):
+        super().__init__(max_tracks, max_history, max_track_age,
+                         spatial_threshold=np.inf, time_threshold=time_threshold)
+        self.range_std = range_std                  # m
+        self.angle_std = np.deg2rad(angle_std_deg)  # rad
+        self.velocity_std = velocity_std            # m/s
+        self.accel_std = accel_std                  # m/s², white-acceleration process noise
+        self.init_velocity_std = init_velocity_std  # m/s, tangential velocity prior
+        self.velocity_sign = velocity_sign          # +1 if positive Doppler means increasing range
+        self.gate_threshold = chi2.ppf(gate_probability, df=3)
+
+        self.x = np.zeros((max_tracks, 4))         # [x, y, vx, vy]
+        self.P = np.zeros((max_tracks, 4, 4))
+        self.state_time = np.zeros(max_tracks)      # time the state refers to
+
+    # ─── Model ───────────────────────────────────────────────────
+    def _measurement_noise(self, points):
+        """Measurement covariance [n, 3, 3] from range/angle/velocity standard deviations"""
+        r = points[:, RANGE]
+        theta = np.deg2rad(points[:, ANGLE])
+        c, s = np.cos(theta), np.sin(theta)
+        var_r, var_t = self.range_std**2, (r * self.angle_std)**2
+        R = np.zeros((len(points), 3, 3))
+        R[:, 0, 0] = c*c*var_r + s*s*var_t
+        R[:, 1, 1] = s*s*var_r + c*c*var_t
+        R[:, 0, 1] = R[:, 1, 0] = c*s*(var_r - var_t)
+        R[:, 2, 2] = self.velocity_std**2
+        return R
+
+    def _measure(self, points):
+        """Detections as [x, y, radial velocity] measurement vectors"""
+        x, y = to_xy(points[:, RANGE], points[:, ANGLE])
+        return np.column_stack([x, y, points[:, VELOCITY]])
+
+    def _h(self, x):
+        """Predicted measurements [n, 3] and Jacobians [n, 3, 4] for states [n, 4]"""
+        px, py, vx, vy = x.T
+        r = np.maximum(np.hypot(px, py), 1e-3)
+        rdot = (px*vx + py*vy) / r
+        z = np.column_stack([px, py, self.velocity_sign * rdot])
+        H = np.zeros((len(x), 3, 4))
+        H[:, 0, 0] = H[:, 1, 1] = 1
+        H[:, 2, 0] = (vx - px*rdot/r) / r
+        H[:, 2, 1] = (vy - py*rdot/r) / r
+        H[:, 2, 2] = px / r
+        H[:, 2, 3] = py / r
+        H[:, 2] *= self.velocity_sign
+        return z, H
+
+    def _predict(self, slots, current_time):
+        """Propagate the given tracks to `current_time` (constant velocity)"""
+        dt = current_time - self.state_time[slots]
+        n = len(slots)
+        F = np.broadcast_to(np.eye(4), (n, 4, 4)).copy()
+        F[:, 0, 2] = F[:, 1, 3] = dt
+        q = self.accel_std**2
+        Q = np.zeros((n, 4, 4))
+        Q[:, 0, 0] = Q[:, 1, 1] = q * dt**4 / 4
+        Q[:, 2, 2] = Q[:, 3, 3] = q * dt**2
+        Q[:, 0, 2] = Q[:, 2, 0] = Q[:, 1, 3] = Q[:, 3, 1] = q * dt**3 / 2
+
+        self.x[slots] = np.einsum('nij,nj->ni', F, self.x[slots])
+        self.P[slots] = F @ self.P[slots] @ F.transpose(0, 2, 1) + Q
+        self.state_time[slots] = current_time
+
+    def _state_points(self, slots, timestamps):
+        """Filtered states as [range, angle, velocity, timestamp] points"""
+        z, _ = self._h(self.x[slots])
+        px, py = self.x[slots, 0], self.x[slots, 1]
+        return np.column_stack([np.hypot(px, py), np.degrees(np.arctan2(py, px)), z[:, 2], timestamps])
+
+    # ─── Association hooks ───────────────────────────────────────
+    def _gate(self, slots, points, current_time):
+        self._predict(slots, current_time)
+        z_pred, H = self._h(self.x[slots])
+        HPHt = H @ self.P[slots] @ H.transpose(0, 2, 1)                   # [k, 3, 3]
+        S = HPHt[:, None] + self._measurement_noise(points)[None, :]       # [k, m, 3, 3]
+        nu = self._measure(points)[None, :, :] - z_pred[:, None, :]        # [k, m, 3]
+        d2 = np.einsum('kmi,kmi->km', nu, np.linalg.solve(S, nu[..., None])[..., 0])
+
+        time_dist = np.abs(current_time - self.last[slots, TIMESTAMP])[:, None]
+        gated = (d2 < self.gate_threshold) & (time_dist < self.time_threshold)
+        return gated, d2
+
+    def _correct(self, slots, points):
+        if len(slots) == 0:
+            return points
+        x, P = self.x[slots], self.P[slots]
+        z_pred, H = self._h(x)
+        Ht = H.transpose(0, 2, 1)
+        S = H @ P @ Ht + self._measurement_noise(points)
+        K = P @ Ht @ np.linalg.inv(S)                                      # [n, 4, 3]
+        nu = self._measure(points) - z_pred
+        self.x[slots] = x + np.einsum('nij,nj->ni', K, nu)
+        self.P[slots] = (np.eye(4) - K @ H) @ P
+        return self._state_points(slots, points[:, TIMESTAMP])
+
+    def _initiate(self, slots, points):
+        z = self._measure(points)
+        theta = np.deg2rad(points[:, ANGLE])
+        c, s = np.cos(theta), np.sin(theta)
+        v = self.velocity_sign * z[:, 2]
+        self.x[slots] = np.column_stack([z[:, 0], z[:, 1], v*c, v*s])
+
+        # Position from the measurement noise; radial velocity is measured,
+        # tangential velocity gets a broad prior
+        R = self._measurement_noise(points)
+        var_radial, var_tangential = self.velocity_std**2, self.init_velocity_std**2
+        P = np.zeros((len(points), 4, 4))
+        P[:, :2, :2] = R[:, :2, :2]
+        P[:, 2, 2] = c*c*var_radial + s*s*var_tangential
+        P[:, 3, 3] = s*s*var_radial + c*c*var_tangential
+        P[:, 2, 3] = P[:, 3, 2] = c*s*(var_radial - var_tangential)
+        self.P[slots] = P
+        self.state_time[slots] = points[:, TIMESTAMP]
+        return points
+
+
+TRACKER_MODES = {
+    'nn': TrackStore,
+    'kalman': KalmanTrackStore,
+}
+
+
+def make_tracker(mode='nn', **kwargs):
+    """Create a tracker: 'nn' (gated nearest neighbour) or 'kalman' (constant-velocity EKF)"""
+    if mode not in TRACKER_MODES:
+        raise ValueError(f"Unknown tracker mode: {mode} (expected one of {', '.join(TRACKER_MODES)})")
+    if mode == 'kalman':
+        kwargs.pop('spatial_threshold', None)  # Mahalanobis gating replaces the fixed spatial gate
+    return TRACKER_MODES[mode](**kwargs)
@@ -0,0 +1,253 @@
+import struct
+import time
+from dataclasses import dataclass
+import numpy as np
+import zmq
+
+"""
+wire_protocol.py
+----------------
+Framed ZeroMQ messages between the acquisition scripts (Raspberry Pi) and
+the GUIs (host PC).
+
+Each frame is a two-part ZMQ message:
+1. a fixed-layout little-endian header (FrameHeader, HEADER_SIZE bytes)
+   with sequence number, capture timestamp, payload dtype/shape and the
+   radar parameters the GUI needs to build its axes
+2. the payload, sent with `copy=False` straight from the numpy buffer
+
+The receiver wraps the payload with `np.frombuffer` over the zero-copy ZMQ
+frame. Sequence numbers let the receiver count frames lost on the way.
+Single-part messages (bare complex64 bytes from older acquisition scripts)
+are still accepted and returned without a header.
+
+Payloads can be sent as complex64 or, to save bandwidth, as interleaved
+int16 / float16 I/Q pairs (last axis of size 2) with a dequantisation
+scale in the header; `encode_iq` / `decode_iq` convert between the two.
+With FLAG_SLICED the Pi has already cut the good part of each chirp out of
+the receive buffer, so only [2, num_chirps, good_ramp_samples] is sent; both
+sides size the chirp with `good_ramp_samples()` and BEGIN_OFFSET_FRAC.
+
+This module only needs numpy and pyzmq so it runs on the Pi as well.
+"""
+
+MAGIC = b'RDR1'
+VERSION = 1
+
+# Payload sample formats
+DTYPE_COMPLEX64 = 0   # native complex64
+DTYPE_INT16_IQ = 1    # interleaved int16 I/Q, last axis of size 2
+DTYPE_FLOAT16_IQ = 2  # interleaved float16 I/Q, last axis of size 2
+
+PAYLOAD_DTYPES = {
+    DTYPE_COMPLEX64: np.dtype(np.complex64),
+    DTYPE_INT16_IQ: np.dtype('<i2'),
+    DTYPE_FLOAT16_IQ: np.dtype('<f2'),
+}
+
+# Wire formats by name, as used in the acquisition script settings
+WIRE_FORMATS = {
+    'complex64': DTYPE_COMPLEX64,
+    'int16': DTYPE_INT16_IQ,
+    'float16': DTYPE_FLOAT16_IQ,
+}
+
+# Header flags
+FLAG_SLICED = 0x1     # payload holds sliced chirps [2, num_chirps, good_ramp_samples]
+
+# Fraction of each ramp skipped for frequency linearity, shared by the Pi-side
+# slicing and RadarConfig so sliced and raw frames give the same chirp length
+BEGIN_OFFSET_FRAC = 0.1
+
+
+def good_ramp_samples(ramp_s, sample_rate, begin_offset_frac=BEGIN_OFFSET_FRAC):
+    """Samples kept per chirp after skipping the start of the ramp"""
+    valid_window_s = ramp_s - begin_offset_frac * ramp_s
+    return int(valid_window_s * sample_rate) - 1
+
+MAX_DIMS = 4
+_HEADER_STRUCT = struct.Struct(
+    '<4sHH'   # magic, version, flags
+    'QQ'      # sequence number, capture timestamp (ns since epoch)
+    'BBh'     # payload dtype code, ndim, scan index (-1 = not a scan slice)
+    '4I'      # shape (padded with zeros)
+    'f'       # dequantisation scale
+    'ddddd'   # sample_rate, center_freq, chirp_bw, ramp_time_us, scan_angle_deg
+    'IIII'    # num_chirps, good_ramp_samples, start_offset_samples, num_samples_frame
+    'I'       # num_scan (angles per full sweep, 0 = not a scan)
+)
+HEADER_SIZE = _HEADER_STRUCT.size
+
+
+@dataclass
+class FrameHeader:
+    """Per-frame metadata sent ahead of each payload"""
+    seq: int = 0
+    timestamp_ns: int = 0
+    dtype_code: int = DTYPE_COMPLEX64
+    shape: tuple = ()
+    flags: int = 0
+    scale: float = 1.0
+    sample_rate: float = 0.0
+    center_freq: float = 0.0
+    chirp_bw: float = 0.0
+    ramp_time_us: float = 0.0
+    num_chirps: int = 0
+    good_ramp_samples: int = 0
+    start_offset_samples: int = 0
+    num_samples_frame: int = 0
+    scan_index: int = -1
+    scan_angle_deg: float = 0.0
+    num_scan: int = 0
+
+    @property
+    def sliced(self):
+        return bool(self.flags & FLAG_SLICED)
+
+    def pack(self):
+        if len(self.shape) > MAX_DIMS:
+            raise ValueError(f"Payload has more than {MAX_DIMS} dimensions")
+        shape = tuple(self.shape) + (0,) * (MAX_DIMS - len(self.shape))
+        return _HEADER_STRUCT.pack(
+            MAGIC, VERSION, self.flags,
+            self.seq, self.timestamp_ns,
+            self.dtype_code, len(self.shape), self.scan_index,
+            *shape,
+            self.scale,
+            self.sample_rate, self.center_freq, self.chirp_bw, self.ramp_time_us, self.scan_angle_deg,
+            self.num_chirps, self.good_ramp_samples, self.start_offset_samples, self.num_samples_frame,
+            self.num_scan,
+        )
+
+    @classmethod
+    def unpack(cls, buf):
+        if len(buf) != HEADER_SIZE:
+            raise ValueError(f"Bad header size {len(buf)} (expected {HEADER_SIZE})")
+        (magic, version, flags, seq, timestamp_ns, dtype_code, ndim, scan_index,
+         s0, s1, s2, s3, scale, sample_rate, center_freq, chirp_bw, ramp_time_us, scan_angle_deg,
+         num_chirps, good_ramp_samples, start_offset_samples, num_samples_frame,
+         num_scan) = _HEADER_STRUCT.unpack(buf)
+        if magic != MAGIC:
+            raise ValueError("Not a radar frame header")
+        if version != VERSION:
+            raise ValueError(f"Unsupported frame header version {version}")
+        return cls(
+            seq=seq, timestamp_ns=timestamp_ns, dtype_code=dtype_code,
+            shape=(s0, s1, s2, s3)[:ndim], flags=flags, scale=scale,
+            sample_rate=sample_rate, center_freq=center_freq, chirp_bw=chirp_bw,
+            ramp_time_us=ramp_time_us, num_chirps=num_chirps,
+            good_ramp_samples=good_ramp_samples, start_offset_samples=start_offset_samples,
+            num_samples_frame=num_samples_frame, scan_index=scan_index,
+            scan_angle_deg=scan_angle_deg, num_scan=num_scan,
+        )
+
+    def radar_params(self):
+        """Radar parameters as RadarConfig keyword arguments (unset fields skipped)"""
+        params = {
+            'sample_rate': self.sample_rate,
+            'center_freq': self.center_freq,
+            'chirp_bw': self.chirp_bw,
+            'ramp_time_us': self.ramp_time_us,
+            'num_chirps': self.num_chirps,
+        }
+        params = {k: v for k, v in params.items() if v}
+        # Sliced frames fix the samples per chirp; raw frames are sliced by the host
+        params['ramp_samples'] = self.good_ramp_samples if self.sliced else None
+        return params
+
+    @property
+    def frame_shape(self):
+        """Shape of the decoded complex64 frame"""
+        if self.dtype_code == DTYPE_COMPLEX64:
+            return tuple(self.shape)
+        return tuple(self.shape[:-1])
+
+
+def encode_iq(data, dtype_code):
+    """
+    Convert complex samples to a wire payload. int16/float16 payloads are
+    interleaved I/Q (last axis of size 2), scaled only if the peak would not fit.
+    Returns: payload array, dequantisation scale
+    """
+    data = np.ascontiguousarray(data)
+    if dtype_code == DTYPE_COMPLEX64:
+        return data.astype(np.complex64, copy=False), 1.0
+    dtype = PAYLOAD_DTYPES[dtype_code]
+    iq = data.view(data.real.dtype).reshape(data.shape + (2,))
+    peak = float(np.max(np.abs(iq))) if iq.size else 0.0
+    limit = float(np.iinfo(dtype).max if dtype.kind == 'i' else np.finfo(dtype).max)
+    scale = peak / limit if peak > limit else 1.0
+    if scale != 1.0:
+        iq = iq / scale
+    if dtype.kind == 'i':
+        iq = np.rint(iq)
+    return iq.astype(dtype), scale
+
+
+def decode_iq(header, data, out=None):
+    """
+    Convert a received payload to complex64 (into `out` if given)
+    Returns: complex64 array of shape header.frame_shape
+    """
+    if out is None:
+        out = np.empty(header.frame_shape, dtype=np.complex64)
+    if header.dtype_code == DTYPE_COMPLEX64:
+        np.copyto(out, data.reshape(out.shape))
+        return out
+    # View the complex output as interleaved float32 I/Q and scale in one pass
+    iq = out.view(np.float32).reshape(data.shape)
+    np.multiply(data, np.float32(header.scale), out=iq, casting='unsafe')
+    return out
+
+
+def send_frame(sock, data, header, timestamp_ns=None, flags=0, track=False):
+    """
+    Send `data` with `header` as a two-part message. The dtype, shape and
+    timestamp fields of `header` are filled in here (timestamp defaults to
+    now); the caller sets the sequence number.
+    Returns: a zmq.MessageTracker if `track`, telling when `data` may be reused
+    """
+    data = np.ascontiguousarray(data)
+    for code, dtype in PAYLOAD_DTYPES.items():
+        if data.dtype == dtype:
+            header.dtype_code = code
+            break
+    else:
+        raise ValueError(f"Unsupported payload dtype {data.dtype}")
+    header.shape = data.shape
+    header.timestamp_ns = time.time_ns() if timestamp_ns is None else timestamp_ns
+    sock.send(header.pack(), flags | zmq.SNDMORE)
+    return sock.send(data, flags, copy=False, track=track)
+
+
+def recv_frame(sock, flags=0):
+    """
+    Receive one frame without copying the payload
+    Returns: header (None for legacy single-part messages), payload array view
+    """
+    parts = sock.recv_multipart(flags, copy=False)
+    if len(parts) == 1:
+        return None, np.frombuffer(parts[0].buffer, dtype=np.complex64)
+    header = FrameHeader.unpack(parts[0].bytes)
+    if header.dtype_code not in PAYLOAD_DTYPES:
+        raise ValueError(f"Unknown payload dtype code {header.dtype_code}")
+    data = np.frombuffer(parts[1].buffer, dtype=PAYLOAD_DTYPES[header.dtype_code])
+    return header, data.reshape(header.shape)
+
+
+class SequenceTracker:
+    """Counts frames lost in transit from gaps in the header sequence numbers"""
+
+    def __init__(self):
+        self.last_seq = None
+        self.lost = 0
+
+    def update(self, seq):
+        """Returns: number of frames missing before `seq`"""
+        gap = 0
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            gap = seq - self.last_seq - 1
+        # A lower sequence number means the sender restarted
+        self.last_seq = seq
+        self.lost += gap
+        return gap